@@ -0,0 +1,77 @@
+"""Helpers to process Parquet objects with Arrow record batches."""
+
+import io
+import ipaddress
+from collections.abc import Iterator, Sequence
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+DEFAULT_PARQUET_BATCH_SIZE = 65536
+
+
+def iter_record_batches(content: bytes, batch_size: int = DEFAULT_PARQUET_BATCH_SIZE) -> Iterator[pa.RecordBatch]:
+    """
+    Iterate over the record batches of a Parquet file, row group by row group.
+
+    Args:
+        content: bytes: the content of the Parquet file
+        batch_size: int: the maximum number of rows per batch
+
+    Yields:
+        pa.RecordBatch:
+    """
+    parquet_file = pq.ParquetFile(io.BytesIO(content))
+
+    yield from parquet_file.iter_batches(batch_size=batch_size)
+
+
+def is_public_ip(value: Any) -> bool:
+    """
+    Check if the value is a public IP address.
+
+    Args:
+        value: Any
+
+    Returns:
+        bool: False if the value is not an IP address
+    """
+    try:
+        return not ipaddress.ip_address(value).is_private
+    except ValueError:  # if the value is not an IP then just omit it
+        return False
+
+
+def public_ip_mask(batch: pa.RecordBatch, names: Sequence[str]) -> pa.BooleanArray:
+    """
+    Compute which rows of the batch contain at least one public IP address in the given columns.
+
+    The IP addresses are only checked once per distinct value of a column,
+    the mask is then computed as a vectorised lookup on the whole column.
+
+    Args:
+        batch: pa.RecordBatch
+        names: Sequence[str]: the names of the columns holding IP addresses
+
+    Returns:
+        pa.BooleanArray:
+    """
+    mask = pa.repeat(False, batch.num_rows)
+
+    for name in names:
+        index = batch.schema.get_field_index(name)
+        if index < 0:
+            continue
+
+        column = batch.column(index)
+        if pa.types.is_dictionary(column.type):
+            column = column.dictionary_decode()
+
+        public_ips = [value for value in pc.unique(column).to_pylist() if value is not None and is_public_ip(value)]
+
+        if public_ips:
+            mask = pc.or_(mask, pc.is_in(column, value_set=pa.array(public_ips, type=column.type)))
+
+    return mask
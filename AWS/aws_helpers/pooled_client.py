@@ -0,0 +1,90 @@
+"""Aws client that keeps its aiobotocore clients alive between calls."""
+
+import asyncio
+from collections.abc import AsyncGenerator
+from contextlib import AsyncExitStack, asynccontextmanager
+from functools import cached_property
+from typing import Any, TypeVar
+
+from aiobotocore.config import AioConfig
+from aiobotocore.session import AioSession
+from loguru import logger
+from pydantic.v1 import Field
+from sekoia_automation.aio.helpers.aws.client import AwsClient, AwsConfiguration
+
+
+class PooledAwsConfiguration(AwsConfiguration):
+    """AWS configuration with the settings of the connection pool."""
+
+    max_pool_connections: int = Field(default=10, description="Maximum number of connections kept in the pool")
+    keepalive_timeout: float = Field(default=60, description="Time, in seconds, to keep idle connections alive")
+
+
+PooledAwsConfigurationT = TypeVar("PooledAwsConfigurationT", bound=PooledAwsConfiguration)
+
+
+class PooledAwsClient(AwsClient[PooledAwsConfigurationT]):
+    """
+    Aws client reusing the same aiobotocore clients for the whole lifetime of the wrapper.
+
+    Creating a client sets up a new session, TLS context and connection pool. Clients are created once per
+    service and region, and closed with `close()`.
+    """
+
+    def __init__(self, configuration: PooledAwsConfigurationT) -> None:
+        """
+        Initialize PooledAwsClient.
+
+        Args:
+            configuration: AWS configuration
+        """
+        super().__init__(configuration)
+
+        self._clients: dict[tuple[str, tuple[tuple[str, Any], ...]], Any] = {}
+        self._clients_stack = AsyncExitStack()
+        self._clients_lock = asyncio.Lock()
+
+    @cached_property
+    def get_session(self) -> AioSession:
+        """
+        Get the aiobotocore session, configured with the connection pool settings.
+
+        Returns:
+            AioSession:
+        """
+        session = AwsClient.get_session.func(self)
+        session.set_default_client_config(
+            AioConfig(
+                max_pool_connections=self._configuration.max_pool_connections,
+                connector_args={"keepalive_timeout": self._configuration.keepalive_timeout},
+            )
+        )
+
+        return session
+
+    @asynccontextmanager
+    async def get_client(self, client_name: str, **kwargs: Any) -> AsyncGenerator[Any, None]:
+        """
+        Get a long-lived client for the service.
+
+        Args:
+            client_name: str
+            kwargs: Any: forwarded to `AwsClient.get_client`
+
+        Yields:
+            Any: the aiobotocore client
+        """
+        key = (client_name, tuple(sorted(kwargs.items())))
+        async with self._clients_lock:
+            if key not in self._clients:
+                logger.info(f"Creating a pooled {client_name} client")
+                self._clients[key] = await self._clients_stack.enter_async_context(
+                    super().get_client(client_name, **kwargs)
+                )
+
+        yield self._clients[key]
+
+    async def close(self) -> None:
+        """Close all the clients and their connection pools."""
+        self._clients.clear()
+        await self._clients_stack.aclose()
@@ -1,27 +1,24 @@
 """Aws s3 wrapper."""
 
-import asyncio
-import gzip
-import io
+import time
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 
-from aiofiles.threadpool.binary import AsyncBufferedReader
 from loguru import logger
 from pydantic.v1 import Field
-from sekoia_automation.aio.helpers.aws.client import AwsClient, AwsConfiguration
 
-from aws_helpers.utils import is_gzip_compressed, async_gzip_open, AsyncReader
+from aws_helpers.pooled_client import PooledAwsClient, PooledAwsConfiguration
+from aws_helpers.utils import DEFAULT_READ_CHUNK_SIZE, AsyncStreamingReader
 
 
-class S3Configuration(AwsConfiguration):
+class S3Configuration(PooledAwsConfiguration):
     """AWS S3 wrapper configuration."""
 
     bucket: str | None = Field(default=None, description="AWS S3 bucket name")
 
 
 # mypy: ignore-errors
-class S3Wrapper(AwsClient[S3Configuration]):
+class S3Wrapper(PooledAwsClient[S3Configuration]):
     """Aws S3 wrapper."""
 
     def __init__(self, configuration: S3Configuration) -> None:
@@ -35,34 +32,35 @@ class S3Wrapper(AwsClient[S3Configuration]):
 
     @asynccontextmanager
     async def read_key(
-        self, key: str, bucket: str | None = None, loop: asyncio.AbstractEventLoop | None = None
-    ) -> AsyncGenerator[AsyncReader, None]:
+        self, key: str, bucket: str | None = None, chunk_size: int = DEFAULT_READ_CHUNK_SIZE
+    ) -> AsyncGenerator[AsyncStreamingReader, None]:
         """
-        Reads text file from S3 bucket.
+        Reads file from S3 bucket.
+
+        The object is streamed from S3 and decompressed on the fly if it is gzip compressed,
+        so it is never fully loaded in memory unless the whole content is read at once.
 
         Args:
             key: str
             bucket: str | None: if not provided, then use default bucket from configuration
+            chunk_size: int: the size of the chunks read from S3
 
         Yields:
-            str:
+            AsyncStreamingReader:
         """
         bucket = bucket or self._configuration.bucket
 
-        if loop is None:
-            loop = asyncio.get_running_loop()
-
         logger.info(f"Reading object {key} from bucket {bucket}")
 
         async with self.get_client("s3") as s3:
+            start = time.monotonic()
             response = await s3.get_object(Bucket=bucket, Key=key)
+            time_to_first_byte = time.monotonic() - start
+
             async with response["Body"] as stream:
-                with io.BytesIO(await stream.read()) as content:
-                    if is_gzip_compressed(content.getbuffer()):
-                        async_reader = await async_gzip_open(content, loop=loop)
-                    else:
-                        async_reader = AsyncBufferedReader(content, loop=loop, executor=None)
-                    try:
-                        yield async_reader
-                    finally:
-                        await async_reader.close()
+                reader = AsyncStreamingReader(stream, chunk_size=chunk_size)
+                reader.time_to_first_byte = time_to_first_byte
+                try:
+                    yield reader
+                finally:
+                    await reader.close()
@@ -1,24 +1,39 @@
 """Aws sqs client wrapper with its config class."""
 
+import asyncio
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
+from typing import Any
 
 from async_lru import alru_cache
 from loguru import logger
 from pydantic.v1 import Field
-from sekoia_automation.aio.helpers.aws.client import AwsClient, AwsConfiguration
 
+from aws_helpers.pooled_client import PooledAwsClient, PooledAwsConfiguration
 
-class SqsConfiguration(AwsConfiguration):
+
+class SqsConfiguration(PooledAwsConfiguration):
     """AWS SQS wrapper configuration."""
 
     frequency: int = Field(default=10, description="AWS SQS queue polling frequency in seconds")
     delete_consumed_messages: bool = Field(default=True, description="Delete consumed messages from queue")
     queue_name: str = Field(description="AWS SQS queue name")
     queue_url: str | None = Field(descripton="AWS SQS queue url")
+    visibility_timeout: int = Field(
+        default=60, description="Time, in seconds, received messages are hidden from other consumers"
+    )
+    visibility_heartbeat: float | None = Field(
+        default=None,
+        description="Interval, in seconds, to extend the visibility of messages still in process. "
+        "Defaults to half of the visibility timeout",
+    )
+
+
+# Maximum number of entries in a batch request to SQS
+SQS_MAX_BATCH_ENTRIES = 10
 
 
-class SqsWrapper(AwsClient[SqsConfiguration]):
+class SqsWrapper(PooledAwsClient[SqsConfiguration]):
     """Aws SQS wrapper."""
 
     def __init__(self, configuration: SqsConfiguration) -> None:
@@ -78,6 +93,7 @@ class SqsWrapper(AwsClient[SqsConfiguration]):
         """
         Receive SQS messages.
 
+        While the context is open, the visibility timeout of the messages is periodically extended.
         After processing messages they will be deleted from queue if delete_consumed_messages is True.
 
         Example of usage:
@@ -107,7 +123,7 @@ class SqsWrapper(AwsClient[SqsConfiguration]):
                     WaitTimeSeconds=frequency,
                     MessageAttributeNames=["All"],
                     MessageSystemAttributeNames=["All"],
-                    VisibilityTimeout=60,
+                    VisibilityTimeout=self._configuration.visibility_timeout,
                 )
 
             except Exception as e:  # pragma: no cover
@@ -116,17 +132,95 @@ class SqsWrapper(AwsClient[SqsConfiguration]):
                 raise e
 
             result = []
+            messages = response.get("Messages", [])
+
+            # Keep the messages hidden from other consumers while they are processed
+            heartbeat = asyncio.create_task(self._extend_visibility(sqs, queue_url, messages)) if messages else None
 
             try:
-                for message in response.get("Messages", []):
+                for message in messages:
                     result.append((message["Body"], int(message["Attributes"]["SentTimestamp"])))
 
                 logger.info(f"Received {len(result)} messages from sqs queue {self._configuration.queue_name}")
 
                 yield result
+            except asyncio.CancelledError:
+                # The messages were not processed, they will be received again
+                delete_consumed_messages = False
+                raise
             finally:
+                if heartbeat is not None:
+                    heartbeat.cancel()
+                    await asyncio.gather(heartbeat, return_exceptions=True)
+
                 # We should delete messages from queue after releasing context manager if it is configured
-                if delete_consumed_messages and response.get("Messages", []):
+                if delete_consumed_messages and messages:
                     logger.info("Deleting consumed messages from sqs")
-                    for message in response.get("Messages", []):
-                        await sqs.delete_message(QueueUrl=queue_url, ReceiptHandle=message["ReceiptHandle"])
+                    await self._delete_messages(sqs, queue_url, messages)
+
+    @staticmethod
+    def _batch_entries(messages: list[dict[str, Any]], **extra: Any) -> list[list[dict[str, Any]]]:
+        """
+        Build the entries of batch requests for the messages.
+
+        Args:
+            messages: list[dict[str, Any]]
+            extra: Any: additional fields for each entry
+
+        Returns:
+            list[list[dict[str, Any]]]: entries grouped by batches of SQS_MAX_BATCH_ENTRIES
+        """
+        entries = [
+            {"Id": str(index), "ReceiptHandle": message["ReceiptHandle"], **extra}
+            for index, message in enumerate(messages)
+        ]
+
+        return [entries[i : i + SQS_MAX_BATCH_ENTRIES] for i in range(0, len(entries), SQS_MAX_BATCH_ENTRIES)]
+
+    async def _delete_messages(self, sqs: Any, queue_url: str, messages: list[dict[str, Any]]) -> None:
+        """
+        Delete the messages from the queue with batch requests.
+
+        Args:
+            sqs: Any: the SQS client
+            queue_url: str
+            messages: list[dict[str, Any]]
+        """
+        for entries in self._batch_entries(messages):
+            response = await sqs.delete_message_batch(QueueUrl=queue_url, Entries=entries)
+
+            for failure in response.get("Failed", []):
+                logger.warning(
+                    "Failed to delete message {id} from sqs: {message}",
+                    id=failure.get("Id"),
+                    message=failure.get("Message"),
+                )
+
+    async def _extend_visibility(self, sqs: Any, queue_url: str, messages: list[dict[str, Any]]) -> None:
+        """
+        Periodically extend the visibility timeout of the messages until cancelled.
+
+        Args:
+            sqs: Any: the SQS client
+            queue_url: str
+            messages: list[dict[str, Any]]
+        """
+        visibility_timeout = self._configuration.visibility_timeout
+        interval = self._configuration.visibility_heartbeat or visibility_timeout / 2
+
+        while True:
+            await asyncio.sleep(interval)
+
+            for entries in self._batch_entries(messages, VisibilityTimeout=visibility_timeout):
+                try:
+                    response = await sqs.change_message_visibility_batch(QueueUrl=queue_url, Entries=entries)
+                except Exception as e:
+                    logger.warning(f"Failed to extend the visibility of messages from sqs: {e}")
+                    continue
+
+                for failure in response.get("Failed", []):
+                    logger.warning(
+                        "Failed to extend the visibility of message {id} from sqs: {message}",
+                        id=failure.get("Id"),
+                        message=failure.get("Message"),
+                    )
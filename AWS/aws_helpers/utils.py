@@ -1,7 +1,10 @@
 import asyncio
 import io
 import gzip
+import time
+import zlib
 from abc import abstractmethod
+from collections.abc import AsyncGenerator
 from concurrent.futures import Executor
 from functools import partial
 from typing import Any, BinaryIO, Protocol
@@ -55,6 +58,12 @@ def normalize_s3_key(key: str) -> str:
     return unquote(key)
 
 
+DEFAULT_READ_CHUNK_SIZE = 1024 * 1024
+
+# wbits value to make zlib expect a gzip header and trailer
+GZIP_WBITS = zlib.MAX_WBITS | 16
+
+
 class AsyncReader(Protocol):
 
     @abstractmethod
@@ -62,6 +71,205 @@ class AsyncReader(Protocol):
         return NotImplemented
 
 
+class AsyncStreamingReader:
+    """
+    Read an async byte stream chunk by chunk, decompressing it on the fly if it is gzip compressed.
+
+    The memory used is bounded by the chunk size, unless the whole content is requested with `read()`.
+    """
+
+    def __init__(self, stream: AsyncReader, chunk_size: int = DEFAULT_READ_CHUNK_SIZE) -> None:
+        """
+        Initialize AsyncStreamingReader.
+
+        Args:
+            stream: AsyncReader: the raw stream, such as the body of a S3 object
+            chunk_size: int: the size of the chunks read from the raw stream
+        """
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._decompressor: Any = None
+        self._pending = b""
+        self._started = False
+        self._in_member = False
+        self._eof = False
+
+        # statistics about the stream
+        self.time_to_first_byte: float | None = None
+        self.raw_bytes = 0
+        self.read_duration = 0.0
+        self.decompress_duration = 0.0
+
+    @property
+    def is_compressed(self) -> bool:
+        """
+        Whether the stream is gzip compressed. Only relevant once the first chunk has been read.
+
+        Returns:
+            bool:
+        """
+        return self._decompressor is not None
+
+    async def _read_raw(self) -> bytes:
+        """
+        Read the next raw chunk from the stream.
+
+        Returns:
+            bytes: empty bytes at the end of the stream
+        """
+        start = time.monotonic()
+        data: bytes = await self._stream.read(self._chunk_size)
+
+        if not self._started:
+            # make sure to have enough bytes to check the magic number
+            while 0 < len(data) < 2:
+                more: bytes = await self._stream.read(self._chunk_size)
+                if not more:
+                    break
+
+                data += more
+
+        self.read_duration += time.monotonic() - start
+        self.raw_bytes += len(data)
+
+        if not self._started:
+            self._started = True
+            if is_gzip_compressed(data):
+                self._decompressor = zlib.decompressobj(GZIP_WBITS)
+
+        return data
+
+    def _decompress(self, data: bytes) -> bytes:
+        """
+        Decompress a raw chunk, handling concatenated gzip members.
+
+        Args:
+            data: bytes
+
+        Returns:
+            bytes:
+        """
+        result = []
+        while data:
+            if not self._in_member:
+                # a gzip file can contain several members, possibly followed by null padding
+                data = data.lstrip(b"\x00")
+                if not data:
+                    break
+
+                self._in_member = True
+
+            result.append(self._decompressor.decompress(data))
+            data = b""
+
+            if self._decompressor.eof:
+                data = self._decompressor.unused_data
+                self._decompressor = zlib.decompressobj(GZIP_WBITS)
+                self._in_member = False
+
+        return b"".join(result)
+
+    async def read_chunk(self) -> bytes:
+        """
+        Read the next decompressed chunk.
+
+        Returns:
+            bytes: empty bytes at the end of the stream
+        """
+        if self._pending:
+            chunk, self._pending = self._pending, b""
+            return chunk
+
+        while not self._eof:
+            data = await self._read_raw()
+            if not data:
+                self._eof = True
+                return self._decompressor.flush() if self._decompressor is not None else b""
+
+            if self._decompressor is not None:
+                start = time.monotonic()
+                chunk = self._decompress(data)
+                self.decompress_duration += time.monotonic() - start
+            else:
+                chunk = data
+
+            if chunk:
+                return chunk
+
+        return b""
+
+    async def read(self, size: int = -1, /) -> bytes:
+        """
+        Read decompressed content.
+
+        Args:
+            size: int: the maximum number of bytes to read. If negative, read until the end of the stream.
+
+        Returns:
+            bytes:
+        """
+        chunks = []
+        length = 0
+        while size < 0 or length < size:
+            chunk = await self.read_chunk()
+            if not chunk:
+                break
+
+            chunks.append(chunk)
+            length += len(chunk)
+
+        content = b"".join(chunks)
+        if 0 <= size < len(content):
+            content, self._pending = content[:size], content[size:]
+
+        return content
+
+    async def iter_chunks(self) -> AsyncGenerator[bytes, None]:
+        """
+        Iterate over the decompressed chunks of the stream.
+
+        Yields:
+            bytes:
+        """
+        while chunk := await self.read_chunk():
+            yield chunk
+
+    async def close(self) -> None:
+        """Release the decompression state."""
+        self._decompressor = None
+        self._pending = b""
+        self._eof = True
+
+
+async def async_split_records(
+    stream: AsyncReader, separator: bytes = b"\n", chunk_size: int = DEFAULT_READ_CHUNK_SIZE
+) -> AsyncGenerator[bytes, None]:
+    """
+    Split the content of the stream on the separator, as it is read.
+
+    Empty records are skipped.
+
+    Args:
+        stream: AsyncReader
+        separator: bytes
+        chunk_size: int
+
+    Yields:
+        bytes:
+    """
+    remainder = b""
+    while chunk := await stream.read(chunk_size):
+        records = (remainder + chunk).split(separator)
+        remainder = records.pop()
+
+        for record in records:
+            if record:
+                yield record
+
+    if remainder:
+        yield remainder
+
+
 # mypy: ignore-errors
 async def async_gzip_open(
     file: BinaryIO,
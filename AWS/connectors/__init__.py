@@ -70,6 +70,13 @@ class AbstractAwsConnector(AsyncConnector, metaclass=ABCMeta):
         """
         raise NotImplementedError("next_batch method must be implemented")
 
+    async def close_clients(self) -> None:
+        """
+        Close the long-lived AWS clients used by the connector.
+
+        Called once the connector stops running.
+        """
+
     def run(self) -> None:  # pragma: no cover
         """Run the connector."""
         while self.running:
@@ -120,6 +127,8 @@ class AbstractAwsConnector(AsyncConnector, metaclass=ABCMeta):
             except Exception as e:
                 self.log_exception(e)
 
+        asyncio.get_event_loop().run_until_complete(self.close_clients())
+
     def stop(self, *args: Any, **kwargs: Optional[Any]) -> None:  # pragma: no cover
         """
         Stop the connector
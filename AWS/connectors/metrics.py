@@ -48,3 +48,54 @@ DISCARDED_EVENTS = Counter(
     namespace=prom_aws_namespace,
     labelnames=["intake_key"],
 )
+
+# Per-stage metrics of the S3 pipeline
+SQS_RECEIVE_DURATION = Histogram(
+    name="sqs_receive_duration",
+    documentation="Time spent, in seconds, waiting for messages from SQS",
+    namespace=prom_aws_namespace,
+    labelnames=["connector", "intake_key"],
+)
+
+S3_TIME_TO_FIRST_BYTE = Histogram(
+    name="s3_time_to_first_byte",
+    documentation="Time, in seconds, until the response of a S3 GetObject request is received",
+    namespace=prom_aws_namespace,
+    labelnames=["connector", "intake_key"],
+)
+
+S3_DOWNLOADED_BYTES = Counter(
+    name="s3_downloaded_bytes",
+    documentation="Number of bytes downloaded from S3",
+    namespace=prom_aws_namespace,
+    labelnames=["connector", "intake_key"],
+)
+
+S3_DOWNLOAD_SPEED = Histogram(
+    name="s3_download_speed",
+    documentation="Download speed of S3 objects, in bytes per second",
+    namespace=prom_aws_namespace,
+    labelnames=["connector", "intake_key"],
+    buckets=(1e4, 1e5, 1e6, 5e6, 1e7, 5e7, 1e8, 5e8, 1e9, float("inf")),
+)
+
+S3_DECOMPRESS_DURATION = Histogram(
+    name="s3_decompress_duration",
+    documentation="Time spent, in seconds, decompressing a S3 object",
+    namespace=prom_aws_namespace,
+    labelnames=["connector", "intake_key"],
+)
+
+S3_PARSE_DURATION = Histogram(
+    name="s3_parse_duration",
+    documentation="Time spent, in seconds, parsing a S3 object, excluding its download and decompression",
+    namespace=prom_aws_namespace,
+    labelnames=["connector", "intake_key"],
+)
+
+PUSH_DURATION = Histogram(
+    name="push_duration",
+    documentation="Time spent, in seconds, pushing a chunk of events to the intake",
+    namespace=prom_aws_namespace,
+    labelnames=["connector", "intake_key"],
+)
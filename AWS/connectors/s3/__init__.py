@@ -1,8 +1,10 @@
 """Package for all s3 connectors impl."""
 
+import asyncio
 import os
+import time
 from abc import ABCMeta
-from asyncio import BoundedSemaphore
+from asyncio import BoundedSemaphore, Queue
 from collections.abc import AsyncGenerator
 from functools import cached_property
 from typing import Any, BinaryIO, Optional
@@ -11,9 +13,18 @@ import orjson
 
 from aws_helpers.s3_wrapper import S3Configuration, S3Wrapper
 from aws_helpers.sqs_wrapper import SqsConfiguration, SqsWrapper
-from aws_helpers.utils import normalize_s3_key, AsyncReader
+from aws_helpers.utils import AsyncReader, AsyncStreamingReader, normalize_s3_key
 from connectors import AbstractAwsConnector, AbstractAwsConnectorConfiguration
-from connectors.metrics import INCOMING_EVENTS
+from connectors.metrics import (
+    INCOMING_EVENTS,
+    PUSH_DURATION,
+    S3_DECOMPRESS_DURATION,
+    S3_DOWNLOAD_SPEED,
+    S3_DOWNLOADED_BYTES,
+    S3_PARSE_DURATION,
+    S3_TIME_TO_FIRST_BYTE,
+    SQS_RECEIVE_DURATION,
+)
 
 
 class AwsS3QueuedConfiguration(AbstractAwsConnectorConfiguration):
@@ -36,8 +47,13 @@ class AbstractAwsS3QueuedConnector(AbstractAwsConnector, metaclass=ABCMeta):
         super().__init__(*args, **kwargs)
         self.limit_of_events_to_push = int(os.getenv("AWS_BATCH_SIZE", 10000))
         self.sqs_max_messages = int(os.getenv("AWS_SQS_MAX_MESSAGES", 10))
+        self.sqs_consumers = max(int(os.getenv("AWS_SQS_CONSUMERS", 1)), 1)
         self.s3_max_fetch_concurrency = int(os.getenv("AWS_S3_MAX_CONCURRENCY_FETCH", 10000))
         self.s3_fetch_concurrency_sem = BoundedSemaphore(self.s3_max_fetch_concurrency)
+        self.s3_events_queue_size = int(os.getenv("AWS_S3_EVENTS_QUEUE_SIZE", self.limit_of_events_to_push))
+        self.max_pool_connections = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", 50))
+        self.keepalive_timeout = float(os.getenv("AWS_KEEPALIVE_TIMEOUT", 60))
+        self.sqs_visibility_timeout = int(os.getenv("AWS_SQS_VISIBILITY_TIMEOUT", 60))
 
     @cached_property
     def s3_wrapper(self) -> S3Wrapper:
@@ -51,6 +67,8 @@ class AbstractAwsS3QueuedConnector(AbstractAwsConnector, metaclass=ABCMeta):
             aws_access_key_id=self.module.configuration.aws_access_key,
             aws_secret_access_key=self.module.configuration.aws_secret_access_key,
             aws_region=self.module.configuration.aws_region_name,
+            max_pool_connections=self.max_pool_connections,
+            keepalive_timeout=self.keepalive_timeout,
         )
 
         return S3Wrapper(config)
@@ -70,10 +88,18 @@ class AbstractAwsS3QueuedConnector(AbstractAwsConnector, metaclass=ABCMeta):
             aws_access_key_id=self.module.configuration.aws_access_key,
             aws_secret_access_key=self.module.configuration.aws_secret_access_key,
             aws_region=self.module.configuration.aws_region_name,
+            max_pool_connections=self.max_pool_connections,
+            keepalive_timeout=self.keepalive_timeout,
+            visibility_timeout=self.sqs_visibility_timeout,
         )
 
         return SqsWrapper(config)
 
+    async def close_clients(self) -> None:
+        """Close the pooled clients of the S3 and SQS wrappers."""
+        await self.s3_wrapper.close()
+        await self.sqs_wrapper.close()
+
     def _parse_content(self, stream: AsyncReader) -> AsyncGenerator[str, None]:  # pragma: no cover
         """
         Parse the content of the S3 object and return the records as a generator.
@@ -100,31 +126,139 @@ class AbstractAwsS3QueuedConnector(AbstractAwsConnector, metaclass=ABCMeta):
             "object", {}
         ).get("key")
 
-    async def next_batch(self, previous_processing_end: float | None = None) -> tuple[int, list[int]]:
+    def _observe_object_metrics(self, stream: AsyncReader, processing_duration: float) -> None:
         """
-        Get next batch of messages.
+        Report the metrics of the stages of the processing of an object.
 
-        Contains main logic of the connector.
+        Args:
+            stream: AsyncReader: the stream of the object
+            processing_duration: float: the time spent reading, decompressing and parsing the object
+        """
+        labels = {"connector": self.name, "intake_key": self.configuration.intake_key}
+        parse_duration = processing_duration
+
+        if isinstance(stream, AsyncStreamingReader):
+            if stream.time_to_first_byte is not None:
+                S3_TIME_TO_FIRST_BYTE.labels(**labels).observe(stream.time_to_first_byte)
+
+            S3_DOWNLOADED_BYTES.labels(**labels).inc(stream.raw_bytes)
+            if stream.read_duration > 0:
+                S3_DOWNLOAD_SPEED.labels(**labels).observe(stream.raw_bytes / stream.read_duration)
+
+            if stream.is_compressed:
+                S3_DECOMPRESS_DURATION.labels(**labels).observe(stream.decompress_duration)
+
+            parse_duration -= stream.read_duration + stream.decompress_duration
+
+        S3_PARSE_DURATION.labels(**labels).observe(max(parse_duration, 0.0))
+
+    async def _push_events(self, events: list[str]) -> int:
+        """
+        Push a chunk of events to the intake.
 
         Args:
-            previous_processing_end: float | None
+            events: list[str]
 
         Returns:
-            tuple[int, list[int]]:
+            int: the number of pushed events
         """
-        records = []
-        result = 0
-        timestamps_to_log: list[int] = []
+        start = time.monotonic()
+        result = len(await self.push_data_to_intakes(events=events))
+        PUSH_DURATION.labels(connector=self.name, intake_key=self.configuration.intake_key).observe(
+            time.monotonic() - start
+        )
+
+        return result
+
+    async def _fetch_notification(self, notification: dict[str, Any], events: Queue[str | None]) -> int:
+        """
+        Download and parse the S3 object referenced by the notification.
+
+        Parsed events are put in the shared queue. Failures are logged and do not interrupt the other fetches.
+
+        Args:
+            notification: dict[str, Any]
+            events: Queue[str | None]
+
+        Returns:
+            int: the number of events put in the queue
+        """
+        count = 0
+        try:
+            s3_bucket, s3_key = self._get_object_from_notification(notification)
+
+            if s3_bucket is None:
+                raise ValueError("Bucket is undefined", notification)
+
+            if s3_key is None:
+                raise ValueError("Key is undefined", notification)
+
+            normalized_key = normalize_s3_key(s3_key)
+
+            async with (
+                self.s3_fetch_concurrency_sem,
+                self.s3_wrapper.read_key(bucket=s3_bucket, key=normalized_key) as stream,
+            ):
+                start = time.monotonic()
+                waiting_duration = 0.0
 
-        continue_receiving = True
+                async for event in self._parse_content(stream):
+                    put_start = time.monotonic()
+                    await events.put(event)
+                    waiting_duration += time.monotonic() - put_start
+                    count += 1
 
-        while continue_receiving:
+                self._observe_object_metrics(stream, time.monotonic() - start - waiting_duration)
+
+        except Exception as e:
+            self.log(
+                message=f"Failed to fetch content of {notification}: {str(e)}",
+                level="warning",
+            )
+
+        return count
+
+    async def _fetch_notifications(self, notifications: list[dict[str, Any]], events: Queue[str | None]) -> int:
+        """
+        Fetch all the S3 objects referenced by the notifications concurrently.
+
+        The concurrency is bounded by `s3_fetch_concurrency_sem`.
+
+        Args:
+            notifications: list[dict[str, Any]]
+            events: Queue[str | None]
+
+        Returns:
+            int: the number of events put in the queue
+        """
+        counts = await asyncio.gather(
+            *(self._fetch_notification(notification, events) for notification in notifications)
+        )
+
+        return sum(counts)
+
+    async def _consume_queue(
+        self, events: Queue[str | None], timestamps_to_log: list[int], stop_receiving: asyncio.Event
+    ) -> None:
+        """
+        Long-poll the SQS queue and fetch the objects of the received notifications.
+
+        The messages are deleted from the queue once all their objects are parsed.
+        Stops when the queue is drained or when `stop_receiving` is set.
+
+        Args:
+            events: Queue[str | None]
+            timestamps_to_log: list[int]
+            stop_receiving: asyncio.Event
+        """
+        while not stop_receiving.is_set():
+            receive_start = time.monotonic()
             async with self.sqs_wrapper.receive_messages(max_messages=self.sqs_max_messages) as messages:
+                SQS_RECEIVE_DURATION.labels(connector=self.name, intake_key=self.configuration.intake_key).observe(
+                    time.monotonic() - receive_start
+                )
                 message_records = []
 
-                if not messages:
-                    continue_receiving = False
-
                 for message_data in messages:
                     message, message_timestamp = message_data
 
@@ -135,44 +269,87 @@ class AbstractAwsS3QueuedConnector(AbstractAwsConnector, metaclass=ABCMeta):
                     except ValueError as e:
                         self.log_exception(e, message=f"Invalid JSON in message.\nInvalid message is: {message}")
 
+                INCOMING_EVENTS.labels(intake_key=self.configuration.intake_key).inc(len(message_records))
+
                 if not message_records:
-                    continue_receiving = False
+                    return
 
-                INCOMING_EVENTS.labels(intake_key=self.configuration.intake_key).inc(len(message_records))
-                for record in message_records:
-                    try:
-                        s3_bucket, s3_key = self._get_object_from_notification(record)
+                if await self._fetch_notifications(message_records, events) == 0:
+                    return
 
-                        if s3_bucket is None:
-                            raise ValueError("Bucket is undefined", record)
+    async def _consume_queues(
+        self, events: Queue[str | None], timestamps_to_log: list[int], stop_receiving: asyncio.Event
+    ) -> None:
+        """
+        Run the SQS consumers concurrently.
 
-                        if s3_key is None:
-                            raise ValueError("Key is undefined", record)
+        A `None` is put in the events queue once all consumers are over.
+        When a consumer fails, the other ones are cancelled: their messages are left in the queue.
 
-                        normalized_key = normalize_s3_key(s3_key)
+        Args:
+            events: Queue[str | None]
+            timestamps_to_log: list[int]
+            stop_receiving: asyncio.Event
+        """
+        consumers = [
+            asyncio.create_task(self._consume_queue(events, timestamps_to_log, stop_receiving))
+            for _ in range(self.sqs_consumers)
+        ]
+
+        try:
+            await asyncio.gather(*consumers)
+        except BaseException:
+            for consumer in consumers:
+                consumer.cancel()
+
+            await asyncio.gather(*consumers, return_exceptions=True)
+            raise
+        finally:
+            await events.put(None)
 
-                        async with (
-                            self.s3_fetch_concurrency_sem,
-                            self.s3_wrapper.read_key(bucket=s3_bucket, key=normalized_key) as stream,
-                        ):
-                            async for event in self._parse_content(stream):
-                                records.append(event)
+    async def next_batch(self, previous_processing_end: float | None = None) -> tuple[int, list[int]]:
+        """
+        Get next batch of messages.
 
-                                if len(records) >= self.limit_of_events_to_push:
-                                    continue_receiving = False
-                                    result += len(await self.push_data_to_intakes(events=records))
-                                    records = []
+        Contains main logic of the connector.
 
-                    except Exception as e:
-                        self.log(
-                            message=f"Failed to fetch content of {record}: {str(e)}",
-                            level="warning",
-                        )
+        `sqs_consumers` consumers receive SQS messages and fetch the S3 objects concurrently.
+        Their events are gathered in a bounded queue and pushed to the intake by chunks.
 
-            if not records:
-                continue_receiving = False
+        Args:
+            previous_processing_end: float | None
+
+        Returns:
+            tuple[int, list[int]]:
+        """
+        records = []
+        result = 0
+        timestamps_to_log: list[int] = []
 
-        if records:
-            result += len(await self.push_data_to_intakes(events=records))
+        events: Queue[str | None] = Queue(maxsize=self.s3_events_queue_size)
+        stop_receiving = asyncio.Event()
+        consumers = asyncio.create_task(self._consume_queues(events, timestamps_to_log, stop_receiving))
+
+        try:
+            while (event := await events.get()) is not None:
+                records.append(event)
+
+                if len(records) >= self.limit_of_events_to_push:
+                    # Stop receiving new messages once a chunk is full, the pending fetches are completed
+                    stop_receiving.set()
+                    result += await self._push_events(records)
+                    records = []
+        except BaseException:
+            consumers.cancel()
+            await asyncio.gather(consumers, return_exceptions=True)
+            raise
+
+        try:
+            # raise the errors of the consumers, if any
+            await consumers
+        finally:
+            # push the events of the messages already consumed
+            if records:
+                result += await self._push_events(records)
 
         return result, timestamps_to_log
@@ -2,8 +2,9 @@
 
 import time
 from abc import ABCMeta, abstractmethod
-from collections.abc import Generator, Sequence
+from collections.abc import Generator, Iterator
 from functools import cached_property
+from itertools import islice
 from pathlib import Path
 from threading import Event, Thread
 from typing import Any, Optional
@@ -16,6 +17,9 @@ from sekoia_automation.storage import PersistentJSON, get_data_path
 from aws_helpers.base import AWSConnector
 from aws_helpers.utils import get_content
 
+# Number of levels of the date partitions in the keys (year, month and day)
+DATE_PARTITION_DEPTH = 3
+
 
 class AwsS3Worker(Thread, metaclass=ABCMeta):  # pragma: no cover
     """Implements logic for AwsS3Worker."""
@@ -92,7 +96,7 @@ class AwsS3Worker(Thread, metaclass=ABCMeta):  # pragma: no cover
             with self.context as variables:
                 variables["marker"] = self.marker
 
-    def _list_of_objects(self, marker: str | None = None) -> Paginator:
+    def _list_of_objects(self, marker: str | None = None, prefix: str | None = None) -> Paginator:
         kwargs = {
             "Bucket": self.bucket_name,
         }
@@ -100,20 +104,69 @@ class AwsS3Worker(Thread, metaclass=ABCMeta):  # pragma: no cover
         if marker:
             kwargs["StartAfter"] = marker
 
-        if self.prefix:
-            kwargs["Prefix"] = self.prefix
+        prefix = prefix or self.prefix
+        if prefix:
+            kwargs["Prefix"] = prefix
 
         paginator = self.client.get_paginator("list_objects_v2")
 
         return paginator.paginate(**kwargs)
 
-    def get_last_key(self, marker: str | None) -> str | None:
+    def _list_partitions(self, prefix: str) -> list[str]:
         """
-        Return the last known key in the bucket
+        List the date partitions directly under the prefix, the newest first.
+
+        Args:
+            prefix: str
+
+        Returns:
+            list[str]: the prefixes of the partitions
         """
-        pages = self._list_of_objects(marker)
-        last_key = self.marker
-        for response in pages:
+        paginator = self.client.get_paginator("list_objects_v2")
+        partitions = [
+            common_prefix["Prefix"]
+            for response in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix, Delimiter="/")
+            for common_prefix in response.get("CommonPrefixes", [])
+        ]
+
+        # only keep the partitions of the date layout (e.g. `.../YYYY/`, `.../MM/` or `.../DD/`)
+        return sorted(
+            (partition for partition in partitions if partition[len(prefix) :].rstrip("/").isdigit()),
+            reverse=True,
+        )
+
+    def _iter_latest_partitions(self, prefix: str, depth: int = DATE_PARTITION_DEPTH) -> Generator[str, None, None]:
+        """
+        Iterate over the day partitions under the prefix, the newest first.
+
+        Only the partitions needed are listed: the older ones are listed only if the newest ones are empty.
+
+        Args:
+            prefix: str
+            depth: int: the number of partition levels (year, month and day)
+
+        Yields:
+            str:
+        """
+        for partition in self._list_partitions(prefix):
+            if depth <= 1:
+                yield partition
+            else:
+                yield from self._iter_latest_partitions(partition, depth - 1)
+
+    def _get_last_key_in(self, prefix: str | None, marker: str | None) -> str | None:
+        """
+        Return the greatest key of the non-empty objects under the prefix.
+
+        Args:
+            prefix: str | None
+            marker: str | None: if defined, only the keys after the marker are listed
+
+        Returns:
+            str | None:
+        """
+        last_key = marker
+        for response in self._list_of_objects(marker, prefix):
             keys = (obj["Key"] for obj in response.get("Contents", []) if obj["Size"] > 0)
             for key in keys:
                 if last_key is None or key > last_key:
@@ -121,6 +174,22 @@ class AwsS3Worker(Thread, metaclass=ABCMeta):  # pragma: no cover
 
         return last_key
 
+    def get_last_key(self, marker: str | None) -> str | None:
+        """
+        Return the last known key in the bucket
+
+        With a marker, from a previous run, only the objects after the marker are listed.
+        Otherwise, for prefixes following the `.../YYYY/MM/DD/` layout of CloudTrail and flow logs,
+        only the newest partitions are listed instead of the whole prefix.
+        """
+        if marker is None and self.prefix and self.prefix.endswith("/"):
+            for partition in self._iter_latest_partitions(self.prefix):
+                last_key = self._get_last_key_in(partition, None)
+                if last_key is not None:
+                    return last_key
+
+        return self._get_last_key_in(self.prefix, marker)
+
     def _read_object(self, bucket: str, key: str) -> bytes:
         """
         Read the remote object
@@ -138,83 +207,70 @@ class AwsS3Worker(Thread, metaclass=ABCMeta):  # pragma: no cover
             list_of_objects = [obj["Key"] for obj in response.get("Contents", []) if obj["Size"] > 0]
             yield from list_of_objects
 
-    def _fetch_events(self, bucket_name: str, objects: Generator[str, None, None]) -> Generator[Any, None, None]:
+    def _send_chunk(self, records: list[Any]) -> None:
         """
-        Fetch events from the list of objects as a generator
+        Forward a chunk of records.
 
         Args:
-            bucket_name: str
-            objects: Generator[str, None, None]
-
-        Yields:
-            Any:
+            records: list[Any]
         """
-        for key in objects:
-            content = self._read_object(bucket_name, key)
-
-            yield from self._parse_content(content)
-
-    def _move_marker(self, objects: Generator[str, None, None]) -> Generator[str, None, None]:
-        """
-        Move the marker according the objects fetched
-
-        Args:
-            objects: Generator[str, None, None]
+        self.log(message=f"forwarding {len(records)} records", level="info")
+        self.send_records(
+            records=records,
+            event_name=f"{self.trigger.name.lower().replace(' ', '-')}_{str(time.time())}",
+        )
 
-        Yields:
-            str:
+    def forward_events(self) -> None:
         """
-        for key in objects:
-            # move the marker to the next object
-            self.marker = key
+        Forward the events of the new objects, chunk by chunk.
 
-            # yield the key of the current object
-            yield key
-
-    @staticmethod
-    def _chunk_events(events: Sequence[Any], chunk_size: int) -> Generator[list[Any], None, None]:
+        Chunks are sent as soon as they are full,
+        so the memory is bounded by the chunk size and the size of one object.
+        The marker is committed only once all the events of the objects before it are sent.
+        The objects that can't be read or parsed are skipped.
         """
-        Group events by chunk
+        chunk_size = self.configuration.chunk_size or 10000
 
-        Args:
-            events: Sequence[Any]
-            chunk_size: int
+        # get next objects
+        objects: Iterator[str] = self._fetch_next_objects(self.marker)
+        if self.configuration.max_objects_per_cycle:
+            objects = islice(objects, self.configuration.max_objects_per_cycle)
 
-        Yields:
-            list[Any]:
-        """
+        # the last object whose events are all sent or in the current chunk
+        last_read_key: str | None = None
         chunk: list[Any] = []
 
-        # iter over the events
-        for event in events:
-            # if the chnuk is full
-            if len(chunk) >= chunk_size:
-                # yield the current chunk and create a new one
-                yield chunk
-                chunk = []
-
-            # add the event to the current chunk
-            chunk.append(event)
-
-        # if the last chunk is not empty
-        if len(chunk) > 0:
-            # yield the last chunk
-            yield chunk
-
-    def forward_events(self) -> None:
-        # get next objects
-        objects = self._fetch_next_objects(self.marker)
-
         # get and forward events
         try:
-            events = self._fetch_events(self.bucket_name, self._move_marker(objects))
-            chunks = self._chunk_events(list(events), self.configuration.chunk_size or 10000)
-            for records in chunks:
-                self.log(message=f"forwarding {len(records)} records", level="info")
-                self.send_records(
-                    records=list(records),
-                    event_name=f"{self.trigger.name.lower().replace(' ', '-')}_{str(time.time())}",
-                )
+            for key in objects:
+                try:
+                    events = self._parse_content(self._read_object(self.bucket_name, key))
+                except Exception as ex:
+                    # skip the object, otherwise it would block the next ones at every cycle
+                    self.log_exception(ex, message=f"Failed to read events from {key}")
+                    last_read_key = key
+                    continue
+
+                for event in events:
+                    chunk.append(event)
+
+                    if len(chunk) >= chunk_size:
+                        self._send_chunk(chunk)
+                        chunk = []
+
+                        # all the events of the previous objects are sent
+                        if last_read_key is not None:
+                            self.marker = last_read_key
+                            self.commit_marker()
+
+                last_read_key = key
+
+            if len(chunk) > 0:
+                self._send_chunk(chunk)
+
+            if last_read_key is not None:
+                self.marker = last_read_key
+                self.commit_marker()
         except Exception as ex:
             self.log_exception(ex, message=f"Failed to forward events from {self.bucket_name}")
 
@@ -249,6 +305,7 @@ class AwsS3Worker(Thread, metaclass=ABCMeta):  # pragma: no cover
 class AwsS3FetcherConfiguration(BaseModel):
     frequency: int = 60
     chunk_size: int = 10000
+    max_objects_per_cycle: int | None = None
     prefix: str | None = None
     bucket_name: str
 
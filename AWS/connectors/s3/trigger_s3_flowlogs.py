@@ -2,9 +2,8 @@
 
 import ipaddress
 from collections.abc import AsyncGenerator
-from itertools import islice
 
-from aws_helpers.utils import AsyncReader
+from aws_helpers.utils import AsyncReader, async_split_records
 from connectors.metrics import DISCARDED_EVENTS
 from connectors.s3 import AbstractAwsS3QueuedConnector, AwsS3QueuedConfiguration
 
@@ -53,18 +52,19 @@ class AwsS3FlowLogsTrigger(AbstractAwsS3QueuedConnector):
         Returns:
              Generator:
         """
-        content = await stream.read()
+        skipped = 0
+        async for raw_record in async_split_records(stream, self.configuration.separator.encode("utf-8")):
+            record = raw_record.decode("utf-8")
 
-        records: list[str] = []
-        for record in content.decode("utf-8").split(self.configuration.separator):
-            if len(record) > 0:
-                if not self.check_all_ips_are_private(record):
-                    records.append(record)
-                else:
-                    DISCARDED_EVENTS.labels(intake_key=self.configuration.intake_key).inc()
+            if self.check_all_ips_are_private(record):
+                DISCARDED_EVENTS.labels(intake_key=self.configuration.intake_key).inc()
+                continue
 
-        if self.configuration.ignore_comments:  # pragma: no cover
-            records = [record for record in records if not record.strip().startswith("#")]
+            if self.configuration.ignore_comments and record.strip().startswith("#"):  # pragma: no cover
+                continue
+
+            if skipped < self.configuration.skip_first:
+                skipped += 1
+                continue
 
-        for record in list(islice(records, self.configuration.skip_first, None)):
             yield record
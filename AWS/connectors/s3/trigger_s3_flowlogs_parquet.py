@@ -1,13 +1,10 @@
 """Contains AwsS3ParquetRecordsTrigger."""
 
-import io
-import ipaddress
-from collections.abc import AsyncGenerator, Sequence
-from typing import Any
+from collections.abc import AsyncGenerator
 
 import orjson
-import pandas
 
+from aws_helpers.parquet import iter_record_batches, public_ip_mask
 from aws_helpers.utils import AsyncReader
 from connectors.metrics import DISCARDED_EVENTS
 from connectors.s3 import AbstractAwsS3QueuedConnector
@@ -18,30 +15,13 @@ class AwsS3FlowLogsParquetRecordsTrigger(AbstractAwsS3QueuedConnector):
 
     name = "AWS S3 Parquet records"
 
-    def check_all_ips_are_private(self, record: dict[str, Any], names: Sequence[str]) -> bool:
-        """
-        Check if all IPs in a record are private
-
-        Args:
-            input_str: str
-
-        Returns:
-            bool:
-        """
-        ips = []
-        for name in names:
-            if name in record:
-                try:
-                    ips.append(ipaddress.ip_address(record[name]))
-                except ValueError:  # if substring is not IP then just omit it
-                    pass
-
-        return all([ip.is_private for ip in ips])
-
     async def _parse_content(self, stream: AsyncReader) -> AsyncGenerator[str, None]:
         """
         Parse content from S3 bucket.
 
+        The Parquet file is processed by record batches: the rows with only private IPs are filtered out
+        with vectorised operations and only the remaining rows are serialised.
+
         Args:
             stream: AsyncReader
 
@@ -52,12 +32,13 @@ class AwsS3FlowLogsParquetRecordsTrigger(AbstractAwsS3QueuedConnector):
         if len(content) == 0:
             return
 
-        reader = io.BytesIO(content)
-        df = pandas.read_parquet(reader)
+        for batch in iter_record_batches(content):
+            mask = public_ip_mask(batch, ("srcaddr", "dstaddr"))
+            kept = batch.filter(mask)
+
+            discarded = batch.num_rows - kept.num_rows
+            if discarded > 0:
+                DISCARDED_EVENTS.labels(intake_key=self.configuration.intake_key).inc(discarded)
 
-        for record in df.to_dict(orient="records"):
-            if len(record) > 0:
-                if not self.check_all_ips_are_private(record, ("srcaddr", "dstaddr")):
-                    yield orjson.dumps(record).decode("utf-8")
-                else:
-                    DISCARDED_EVENTS.labels(intake_key=self.configuration.intake_key).inc()
+            for record in kept.to_pylist():
+                yield orjson.dumps(record).decode("utf-8")
@@ -1,9 +1,8 @@
 """Contains AwsS3LogsTrigger."""
 
 from collections.abc import AsyncGenerator
-from itertools import islice
 
-from aws_helpers.utils import AsyncReader
+from aws_helpers.utils import AsyncReader, async_split_records
 from connectors.s3 import AbstractAwsS3QueuedConnector, AwsS3QueuedConfiguration
 
 
@@ -31,12 +30,15 @@ class AwsS3LogsTrigger(AbstractAwsS3QueuedConnector):
         Returns:
              Generator:
         """
-        content = await stream.read()
+        skipped = 0
+        async for raw_record in async_split_records(stream, self.configuration.separator.encode("utf-8")):
+            record = raw_record.decode("utf-8")
 
-        records = [record for record in content.decode("utf-8").split(self.configuration.separator) if len(record) > 0]
+            if self.configuration.ignore_comments and record.strip().startswith("#"):
+                continue
 
-        if self.configuration.ignore_comments:
-            records = [record for record in records if not record.strip().startswith("#")]
+            if skipped < self.configuration.skip_first:
+                skipped += 1
+                continue
 
-        for record in list(islice(records, self.configuration.skip_first, None)):
             yield record
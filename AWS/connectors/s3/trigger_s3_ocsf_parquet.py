@@ -1,12 +1,11 @@
 """Contains AwsS3ParquetRecordsTrigger."""
 
-import io
 from collections.abc import AsyncGenerator
 from typing import Any
 
 import orjson
-import pandas
 
+from aws_helpers.parquet import iter_record_batches
 from aws_helpers.utils import AsyncReader
 from connectors.s3 import AbstractAwsS3QueuedConnector
 
@@ -45,10 +44,10 @@ class AwsS3OcsfTrigger(AbstractAwsS3QueuedConnector):
         if len(content) == 0:
             return
 
-        reader = io.BytesIO(content)
-        df = pandas.read_parquet(reader)
-        records = orjson.loads(df.to_json(orient="records"))
+        # Convert the file batch by batch to keep the memory bounded
+        for batch in iter_record_batches(content):
+            records = orjson.loads(batch.to_pandas().to_json(orient="records"))
 
-        for record in records:
-            if len(record) > 0:
-                yield orjson.dumps(record).decode("utf-8")
+            for record in records:
+                if len(record) > 0:
+                    yield orjson.dumps(record).decode("utf-8")
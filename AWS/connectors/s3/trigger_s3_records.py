@@ -1,17 +1,120 @@
 """Contains AwsS3RecordsTrigger."""
 
+import re
 from collections.abc import AsyncGenerator
+from functools import cache, cached_property
 from typing import Any
 
 import orjson
 
 from aws_helpers.utils import AsyncReader
-from connectors.s3 import AbstractAwsS3QueuedConnector
+from connectors.s3 import AbstractAwsS3QueuedConnector, AwsS3QueuedConfiguration
+
+
+class EventsFilter:
+    """
+    Filter CloudTrail records on their event source and event name.
+
+    For each event source, the supported and unsupported prefixes of event names are compiled into single regexes.
+    As the number of distinct event names is small, the decisions are memoized.
+    """
+
+    DEFAULT_SOURCE = "default"
+    MAX_CACHED_DECISIONS = 100000
+
+    def __init__(self, events_prefixes: dict[str, dict[str, list[str]]]) -> None:
+        """
+        Initialize EventsFilter.
+
+        Args:
+            events_prefixes: dict[str, dict[str, list[str]]]: the supported and unsupported prefixes per event source
+        """
+        self._rules = {
+            source: (
+                self._compile(prefixes.get("supported", [])),
+                self._compile(prefixes.get("unsupported", [])),
+                len(prefixes.get("supported", [])) == 0 and len(prefixes.get("unsupported", [])) != 0,
+            )
+            for source, prefixes in events_prefixes.items()
+        }
+        self._decisions: dict[tuple[str, str], bool] = {}
+
+    @staticmethod
+    def _compile(prefixes: list[str]) -> re.Pattern[str] | None:
+        """
+        Compile the prefixes into a single regex.
+
+        Args:
+            prefixes: list[str]
+
+        Returns:
+            re.Pattern[str] | None:
+        """
+        if not prefixes:
+            return None
+
+        return re.compile("|".join(re.escape(prefix) for prefix in prefixes))
+
+    def _evaluate(self, event_source: str, event_name: str) -> bool:
+        """
+        Evaluate the rules for the event.
+
+        Args:
+            event_source: str
+            event_name: str
+
+        Returns:
+            bool:
+        """
+        rules = self._rules.get(event_source) or self._rules.get(self.DEFAULT_SOURCE)
+        if rules is None:
+            return True
+
+        supported, unsupported, fallback = rules
+
+        if unsupported is not None and unsupported.match(event_name):
+            return False
+
+        if supported is not None and supported.match(event_name):
+            return True
+
+        return fallback
+
+    def is_valid(self, event_source: str, event_name: str) -> bool:
+        """
+        Check if the event should be collected.
+
+        Args:
+            event_source: str
+            event_name: str
+
+        Returns:
+            bool:
+        """
+        key = (event_source, event_name)
+        decision = self._decisions.get(key)
+
+        if decision is None:
+            decision = self._evaluate(event_source, event_name)
+
+            if len(self._decisions) >= self.MAX_CACHED_DECISIONS:
+                self._decisions.clear()
+
+            self._decisions[key] = decision
+
+        return decision
+
+
+class AwsS3RecordsConfiguration(AwsS3QueuedConfiguration):
+    """AwsS3RecordsTrigger configuration."""
+
+    events_filters: dict[str, dict[str, list[str]]] | None = None
 
 
 class AwsS3RecordsTrigger(AbstractAwsS3QueuedConnector):
     """Implementation of AwsS3RecordsTrigger."""
 
+    configuration: AwsS3RecordsConfiguration
     name = "AWS S3 Records"
 
     _events_prefixes = {
@@ -51,10 +154,21 @@ class AwsS3RecordsTrigger(AbstractAwsS3QueuedConnector):
         "default": {"unsupported": ["List", "Describe", "GetRecords"]},
     }
 
+    @classmethod
+    @cache
+    def default_events_filter(cls) -> EventsFilter:
+        """
+        Get the filter built from the default prefixes.
+
+        Returns:
+            EventsFilter:
+        """
+        return EventsFilter(cls._events_prefixes)
+
     @classmethod
     def is_valid_payload(cls, payload: dict[str, Any]) -> bool:
         """
-        Check if the payload is valid.
+        Check if the payload is valid, according to the default filters.
 
         Args:
             payload: dict[str, Any]
@@ -62,23 +176,21 @@ class AwsS3RecordsTrigger(AbstractAwsS3QueuedConnector):
         Returns:
             bool:
         """
-        event_source = payload.get("eventSource", "")
-        event_name = payload.get("eventName", "")
-        if event_source not in cls._events_prefixes.keys():
-            event_source = "default"
-
-        supported = cls._events_prefixes[event_source].get("supported", [])
-        unsupported = cls._events_prefixes[event_source].get("unsupported", [])
+        return cls.default_events_filter().is_valid(payload.get("eventSource", ""), payload.get("eventName", ""))
 
-        for prefix in unsupported:
-            if event_name.startswith(prefix):
-                return False
+    @cached_property
+    def events_filter(self) -> EventsFilter:
+        """
+        Get the filter of the records, built from the configuration if custom filters are defined.
 
-        for prefix in supported:
-            if event_name.startswith(prefix):
-                return True
+        Returns:
+            EventsFilter:
+        """
+        events_filters = getattr(self.configuration, "events_filters", None)
+        if events_filters:
+            return EventsFilter(events_filters)
 
-        return len(supported) == 0 and len(unsupported) != 0
+        return self.default_events_filter()
 
     async def _parse_content(self, stream: AsyncReader) -> AsyncGenerator[str, None]:
         """
@@ -95,9 +207,10 @@ class AwsS3RecordsTrigger(AbstractAwsS3QueuedConnector):
         if len(content) == 0:
             return
 
+        events_filter = self.events_filter
         for data in orjson.loads(content).get("Records", []):
             # https://docs.aws.amazon.com/awscloudtrail/latest/userguide/cloudtrail-log-file-examples.html
             # Go through each element in list and add to result_data if it is a valid payload based on this
             # https://github.com/SEKOIA-IO/automation-library/issues/346
-            if len(data) > 0 and self.is_valid_payload(data):
+            if len(data) > 0 and events_filter.is_valid(data.get("eventSource", ""), data.get("eventName", "")):
                 yield orjson.dumps(data).decode("utf-8")
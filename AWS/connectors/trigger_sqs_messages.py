@@ -1,5 +1,6 @@
 """Contains AwsSqsMessagesTrigger."""
 
+import asyncio
 import os
 from functools import cached_property
 from typing import Any, Optional
@@ -31,6 +32,9 @@ class AwsSqsMessagesTrigger(AbstractAwsConnector):
         super().__init__(*args, **kwargs)
         self.limit_of_events_to_push = int(os.getenv("AWS_BATCH_SIZE", 10000))
         self.sqs_max_messages = int(os.getenv("AWS_SQS_MAX_MESSAGES", 10))
+        self.sqs_consumers = max(int(os.getenv("AWS_SQS_CONSUMERS", 1)), 1)
+        self.max_pool_connections = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", 50))
+        self.keepalive_timeout = float(os.getenv("AWS_KEEPALIVE_TIMEOUT", 60))
 
     @cached_property
     def sqs_wrapper(self) -> SqsWrapper:
@@ -47,10 +51,16 @@ class AwsSqsMessagesTrigger(AbstractAwsConnector):
             aws_access_key_id=self.module.configuration.aws_access_key,
             aws_secret_access_key=self.module.configuration.aws_secret_access_key,
             aws_region=self.module.configuration.aws_region_name,
+            max_pool_connections=self.max_pool_connections,
+            keepalive_timeout=self.keepalive_timeout,
         )
 
         return SqsWrapper(config)
 
+    async def close_clients(self) -> None:
+        """Close the pooled clients of the SQS wrapper."""
+        await self.sqs_wrapper.close()
+
     def is_aws_notification(self, message: Any) -> bool:
         """
         Check if message is AWS notification.
@@ -62,24 +72,16 @@ class AwsSqsMessagesTrigger(AbstractAwsConnector):
         """
         return isinstance(message, dict) and "Records" in message and isinstance(message["Records"], list)
 
-    async def next_batch(self) -> tuple[int, list[int]]:
+    async def _consume_queue(self, records: list[Any], timestamps_to_log: list[int]) -> None:
         """
-        Get next batch of messages.
+        Long-poll the SQS queue until enough records are collected or the queue is drained.
 
-        Contains main logic of the connector.
-
-        Returns:
-            tuple[list[str], list[int]]:
+        Args:
+            records: list[Any]: the records shared between the consumers
+            timestamps_to_log: list[int]
         """
-        records = []
-        timestamps_to_log: list[int] = []
-
-        continue_receiving = True
-        while continue_receiving:
+        while len(records) < self.limit_of_events_to_push:
             async with self.sqs_wrapper.receive_messages(max_messages=self.sqs_max_messages) as messages:
-                if not messages:
-                    continue_receiving = False
-
                 for data in messages:
                     message, message_timestamp = data
 
@@ -95,8 +97,23 @@ class AwsSqsMessagesTrigger(AbstractAwsConnector):
                     except ValueError as e:
                         self.log_exception(e, message=f"Invalid JSON in message.\nInvalid message is: {message}")
 
-            if len(records) >= self.limit_of_events_to_push or not records:
-                continue_receiving = False
+            if not messages or not records:
+                return
+
+    async def next_batch(self) -> tuple[int, list[int]]:
+        """
+        Get next batch of messages.
+
+        Contains main logic of the connector.
+        `sqs_consumers` consumers long-poll the queue concurrently.
+
+        Returns:
+            tuple[list[str], list[int]]:
+        """
+        records: list[Any] = []
+        timestamps_to_log: list[int] = []
+
+        await asyncio.gather(*(self._consume_queue(records, timestamps_to_log) for _ in range(self.sqs_consumers)))
 
         self.log(message=f"Forwarding {len(records)} messages", level="info")
 
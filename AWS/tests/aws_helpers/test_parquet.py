@@ -0,0 +1,42 @@
+"""Test parquet module."""
+
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from aws_helpers.parquet import is_public_ip, iter_record_batches, public_ip_mask
+
+
+def test_is_public_ip():
+    """Test is_public_ip function."""
+    assert is_public_ip("64.62.197.99") is True
+    assert is_public_ip("172.31.17.39") is False
+    assert is_public_ip("-") is False
+    assert is_public_ip(None) is False
+
+
+def test_public_ip_mask():
+    """Test public_ip_mask function."""
+    batch = pa.RecordBatch.from_pydict(
+        {
+            "srcaddr": ["64.62.197.99", "172.31.17.39", "10.0.0.1", None, "-"],
+            "dstaddr": ["172.31.17.39", "78.197.123.35", "10.0.0.2", "10.0.0.3", "-"],
+            "action": ["REJECT", "ACCEPT", "ACCEPT", "ACCEPT", "NODATA"],
+        }
+    )
+
+    assert public_ip_mask(batch, ("srcaddr", "dstaddr")).to_pylist() == [True, True, False, False, False]
+    assert public_ip_mask(batch, ("unknown",)).to_pylist() == [False] * 5
+
+
+def test_iter_record_batches():
+    """Test iter_record_batches function."""
+    table = pa.table({"value": list(range(10))})
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, row_group_size=4)
+
+    batches = list(iter_record_batches(buffer.getvalue(), batch_size=3))
+
+    assert all(batch.num_rows <= 3 for batch in batches)
+    assert [value for batch in batches for value in batch.column(0).to_pylist()] == list(range(10))
@@ -0,0 +1,97 @@
+"""Test the PooledAwsClient class."""
+
+from contextlib import asynccontextmanager
+from unittest.mock import MagicMock, patch
+
+import pytest
+from aiobotocore.session import AioSession
+from faker import Faker
+from sekoia_automation.aio.helpers.aws.client import AwsClient
+
+from aws_helpers.pooled_client import PooledAwsClient, PooledAwsConfiguration
+
+
+@pytest.fixture
+def pooled_client(session_faker: Faker) -> PooledAwsClient:
+    """
+    Create PooledAwsClient instance.
+
+    Args:
+        session_faker: Faker
+
+    Returns:
+        PooledAwsClient:
+    """
+    configuration = PooledAwsConfiguration(
+        aws_access_key_id=session_faker.word(),
+        aws_secret_access_key=session_faker.word(),
+        aws_region=session_faker.word(),
+        max_pool_connections=42,
+    )
+
+    return PooledAwsClient(configuration)
+
+
+@pytest.mark.asyncio
+async def test_get_client_reuses_clients(pooled_client: PooledAwsClient):
+    """
+    Test the clients are created once per service and closed with the wrapper.
+
+    Args:
+        pooled_client: PooledAwsClient
+    """
+    created = []
+    closed = []
+
+    @asynccontextmanager
+    async def get_client(self, client_name: str, **kwargs):
+        client = MagicMock(name=client_name)
+        created.append(client_name)
+        try:
+            yield client
+        finally:
+            closed.append(client_name)
+
+    with patch("aws_helpers.pooled_client.AwsClient.get_client", get_client):
+        async with pooled_client.get_client("s3") as first_s3:
+            pass
+
+        async with pooled_client.get_client("s3") as second_s3:
+            pass
+
+        async with pooled_client.get_client("sqs"):
+            pass
+
+        assert first_s3 is second_s3
+        assert created == ["s3", "sqs"]
+        assert closed == []
+
+        await pooled_client.close()
+
+        assert sorted(closed) == ["s3", "sqs"]
+
+
+def test_get_session_configures_pool(pooled_client: PooledAwsClient):
+    """
+    Test the session is configured with the connection pool settings.
+
+    Args:
+        pooled_client: PooledAwsClient
+    """
+    session = pooled_client.get_session
+
+    assert session.get_default_client_config().max_pool_connections == 42
+
+
+def test_get_client_uses_pooled_session(pooled_client: PooledAwsClient):
+    """
+    Test the aiobotocore clients are created from the configured session.
+
+    Args:
+        pooled_client: PooledAwsClient
+    """
+    with patch.object(AioSession, "create_client") as create_client:
+        AwsClient.get_client(pooled_client, "s3")
+
+    create_client.assert_called_once()
+    assert pooled_client.get_session.get_default_client_config().max_pool_connections == 42
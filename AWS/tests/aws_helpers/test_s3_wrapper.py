@@ -38,12 +38,14 @@ async def test_read_key(session_faker: Faker):
 
         s3_response = {"Body": AsyncMock()}
         s3_response["Body"].__aenter__.return_value = s3_response["Body"]
-        s3_response["Body"].read = AsyncMock(return_value=text.encode("utf-8"))
+        s3_response["Body"].read = AsyncMock(side_effect=[text.encode("utf-8"), b""])
 
         mock_s3.get_object.return_value = s3_response
 
         async with s3.read_key(key) as stream:
             assert await stream.read() == text.encode("utf-8")
+            assert stream.time_to_first_byte is not None
+            assert stream.raw_bytes == len(text.encode("utf-8"))
 
         # Assert that the S3 client methods were called with the correct arguments
         mock_client.assert_called_once_with("s3")
@@ -79,7 +81,7 @@ async def test_read_compressed_encoding_key(session_faker: Faker):
 
         s3_response = {"Body": AsyncMock(), "ContentEncoding": "gzip"}
         s3_response["Body"].__aenter__.return_value = s3_response["Body"]
-        s3_response["Body"].read = AsyncMock(return_value=gzip.compress(text.encode("utf-8")))
+        s3_response["Body"].read = AsyncMock(side_effect=[gzip.compress(text.encode("utf-8")), b""])
 
         mock_s3.get_object.return_value = s3_response
 
@@ -121,7 +123,7 @@ async def test_read_compressed_content_key(session_faker: Faker, content_type: s
 
         s3_response = {"Body": AsyncMock(), "ContentType": content_type}
         s3_response["Body"].__aenter__.return_value = s3_response["Body"]
-        s3_response["Body"].read = AsyncMock(return_value=gzip.compress(text.encode("utf-8")))
+        s3_response["Body"].read = AsyncMock(side_effect=[gzip.compress(text.encode("utf-8")), b""])
 
         mock_s3.get_object.return_value = s3_response
 
@@ -1,5 +1,6 @@
 """Test the SqsWrapper class."""
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, call, patch
 
 import pytest
@@ -155,8 +156,8 @@ async def test_receive_messages(sqs_wrapper, sqs_wrapper_configuration, session_
         mock_sqs.receive_message = AsyncMock()
         mock_sqs.receive_message.return_value = expected_response
 
-        mock_sqs.delete_message = AsyncMock()
-        mock_sqs.delete_message.return_value = {}
+        mock_sqs.delete_message_batch = AsyncMock()
+        mock_sqs.delete_message_batch.return_value = {"Successful": [{"Id": "0"}, {"Id": "1"}], "Failed": []}
 
         mock_sqs.get_queue_url = AsyncMock()
         mock_sqs.get_queue_url.return_value = {"QueueUrl": queue_url}
@@ -176,5 +177,94 @@ async def test_receive_messages(sqs_wrapper, sqs_wrapper_configuration, session_
             VisibilityTimeout=60,
         )
 
-        mock_sqs.delete_message.assert_any_call(QueueUrl=queue_url, ReceiptHandle=receipt_handle_1)
-        mock_sqs.delete_message.assert_any_call(QueueUrl=queue_url, ReceiptHandle=receipt_handle_2)
+        mock_sqs.delete_message_batch.assert_called_once_with(
+            QueueUrl=queue_url,
+            Entries=[
+                {"Id": "0", "ReceiptHandle": receipt_handle_1},
+                {"Id": "1", "ReceiptHandle": receipt_handle_2},
+            ],
+        )
+
+
+@pytest.mark.asyncio
+async def test_receive_messages_extends_visibility(sqs_wrapper_configuration, session_faker):
+    """
+    Test receive_messages extends the visibility of the messages in process and deletes them by batches.
+
+    Args:
+        sqs_wrapper_configuration: SqsConfiguration
+        session_faker: Faker
+    """
+    sqs_wrapper = SqsWrapper(
+        sqs_wrapper_configuration.copy(update={"visibility_timeout": 30, "visibility_heartbeat": 0.01})
+    )
+    queue_url = session_faker.url()
+    messages = [
+        {
+            "Body": session_faker.sentence(),
+            "ReceiptHandle": f"handle-{index}",
+            "Attributes": {"SentTimestamp": session_faker.pyint(min_value=1, max_value=1000)},
+        }
+        for index in range(12)
+    ]
+
+    with patch("aws_helpers.sqs_wrapper.SqsWrapper.get_client") as mock_client:
+        mock_sqs = MagicMock()
+        mock_sqs.receive_message = AsyncMock(return_value={"Messages": messages})
+        mock_sqs.change_message_visibility_batch = AsyncMock(return_value={"Failed": []})
+        mock_sqs.delete_message_batch = AsyncMock(return_value={"Failed": [{"Id": "11", "Message": "error"}]})
+        mock_sqs.get_queue_url = AsyncMock(return_value={"QueueUrl": queue_url})
+
+        mock_client.return_value.__aenter__.return_value = mock_sqs
+
+        async with sqs_wrapper.receive_messages(max_messages=10) as result:
+            assert len(result) == 12
+            await asyncio.sleep(0.05)
+
+        assert mock_sqs.receive_message.call_args.kwargs["VisibilityTimeout"] == 30
+
+        first_extension = mock_sqs.change_message_visibility_batch.call_args_list[0].kwargs
+        assert first_extension["QueueUrl"] == queue_url
+        assert first_extension["Entries"][0] == {"Id": "0", "ReceiptHandle": "handle-0", "VisibilityTimeout": 30}
+        assert len(first_extension["Entries"]) == 10
+
+        assert mock_sqs.delete_message_batch.call_count == 2
+        assert [len(c.kwargs["Entries"]) for c in mock_sqs.delete_message_batch.call_args_list] == [10, 2]
+
+
+@pytest.mark.asyncio
+async def test_receive_messages_cancelled_keeps_messages(sqs_wrapper, session_faker):
+    """
+    Test receive_messages doesn't delete the messages when their processing is cancelled.
+
+    Args:
+        sqs_wrapper: SqsWrapper
+        session_faker: Faker
+    """
+    message = {
+        "Body": session_faker.sentence(),
+        "ReceiptHandle": session_faker.word(),
+        "Attributes": {"SentTimestamp": session_faker.pyint(min_value=1, max_value=1000)},
+    }
+
+    with patch("aws_helpers.sqs_wrapper.SqsWrapper.get_client") as mock_client:
+        mock_sqs = MagicMock()
+        mock_sqs.receive_message = AsyncMock(return_value={"Messages": [message]})
+        mock_sqs.change_message_visibility_batch = AsyncMock(return_value={"Failed": []})
+        mock_sqs.delete_message_batch = AsyncMock(return_value={"Failed": []})
+        mock_sqs.get_queue_url = AsyncMock(return_value={"QueueUrl": session_faker.url()})
+
+        mock_client.return_value.__aenter__.return_value = mock_sqs
+
+        async def consume():
+            async with sqs_wrapper.receive_messages(max_messages=1):
+                await asyncio.Event().wait()
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0.01)
+        consumer.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await consumer
+
+        mock_sqs.delete_message_batch.assert_not_called()
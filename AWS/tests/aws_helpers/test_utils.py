@@ -8,7 +8,15 @@ import aiofiles
 import pytest
 from faker import Faker
 
-from aws_helpers.utils import async_gzip_open, get_content, is_gzip_compressed, normalize_s3_key
+from aws_helpers.utils import (
+    AsyncStreamingReader,
+    async_gzip_open,
+    async_split_records,
+    get_content,
+    is_gzip_compressed,
+    normalize_s3_key,
+)
+from tests.helpers import async_bytesIO, async_list
 
 
 def test_normalize_s3_key():
@@ -66,3 +74,39 @@ async def test_async_gzip_reader():
 
         reader = await async_gzip_open(io.BytesIO(await f.read()))
         assert await reader.read() == content
+
+
+@pytest.mark.asyncio
+async def test_async_streaming_reader_plain():
+    content = b"first line\nsecond line\nthird line"
+    reader = AsyncStreamingReader(await async_bytesIO(content), chunk_size=4)
+
+    assert await reader.read(5) == b"first"
+    assert await reader.read() == content[5:]
+    assert reader.is_compressed is False
+    assert await reader.read() == b""
+
+
+@pytest.mark.asyncio
+async def test_async_streaming_reader_gzip():
+    content = b"".join(f"line {i}\n".encode() for i in range(1000))
+    # concatenated gzip members are decompressed as a single stream
+    compressed = compress(content[:3000]) + compress(content[3000:])
+    reader = AsyncStreamingReader(await async_bytesIO(compressed), chunk_size=1)
+
+    chunks = await async_list(reader.iter_chunks())
+
+    assert reader.is_compressed is True
+    assert b"".join(chunks) == content
+    assert len(chunks) > 1
+    assert reader.raw_bytes == len(compressed)
+    assert reader.decompress_duration > 0
+
+
+@pytest.mark.asyncio
+async def test_async_split_records():
+    content = b"first line\n\nsecond line\nthird line"
+
+    records = await async_list(async_split_records(await async_bytesIO(content), b"\n", chunk_size=3))
+
+    assert records == [b"first line", b"second line", b"third line"]
@@ -11,7 +11,7 @@ from sekoia_automation.storage import PersistentJSON
 from connectors import AwsModule
 from connectors.s3.logs.trigger_cloudtrail_logs import CloudTrailLogsTrigger, CloudTrailLogsWorker
 
-from .base import read_file, s3_mock
+from .base import S3MockBase, read_file, s3_mock
 from .mock import mocked_client
 
 
@@ -453,3 +453,99 @@ def test_forward_events_integration(faker: Faker, aws_module: AwsModule, symphon
             for call in calls.values()
             for record in read_file(symphony_storage, call["directory"], call["event"]["records_path"])
         )
+
+
+def test_forward_events_by_chunks(prefix: str, worker: CloudTrailLogsWorker, symphony_storage: Path, aws_mock):
+    """
+    Test forward events sends the chunks as they fill and limits the number of objects per cycle.
+
+    Args:
+        prefix: str
+        worker: CloudTrailLogsWorker
+        symphony_storage: Path
+        aws_mock:
+    """
+    first_key, first_object = next(iter(S3Objects.items()))
+    expected_records = orjson.loads(first_object)["Records"]
+
+    worker.configuration.chunk_size = 1
+    worker.configuration.max_objects_per_cycle = 1
+    worker.send_records = Mock()
+
+    with mocked_client.handler_for("s3", S3Mock):
+        worker.forward_events()
+
+    assert [call.kwargs["records"] for call in worker.send_records.call_args_list] == [
+        [record] for record in expected_records
+    ]
+
+    context = PersistentJSON("context.json", data_path=symphony_storage.joinpath(prefix))
+    with context as variables:
+        assert variables.get("marker") == first_key
+
+
+def test_forward_events_skips_unreadable_objects(
+    prefix: str, worker: CloudTrailLogsWorker, symphony_storage: Path, aws_mock
+):
+    """
+    Test forward events skips the objects that can't be parsed and moves the marker past them.
+
+    Args:
+        prefix: str
+        worker: CloudTrailLogsWorker
+        symphony_storage: Path
+        aws_mock:
+    """
+    keys = list(S3Objects.keys())
+    objects = {keys[0]: b"corrupted content", **{key: S3Objects[key] for key in keys[1:]}}
+    worker.send_records = Mock()
+
+    with mocked_client.handler_for("s3", s3_mock(objects)):
+        worker.forward_events()
+
+    assert [record for call in worker.send_records.call_args_list for record in call.kwargs["records"]] == [
+        record for key in keys[1:] for record in orjson.loads(S3Objects[key])["Records"]
+    ]
+    worker.trigger.log_exception.assert_called_once()
+
+    context = PersistentJSON("context.json", data_path=symphony_storage.joinpath(prefix))
+    with context as variables:
+        assert variables.get("marker") == keys[-1]
+
+
+def test_get_last_key_lists_latest_partitions(worker: CloudTrailLogsWorker):
+    """
+    Test get last key only lists the newest date partitions of the prefix.
+
+    Args:
+        worker: CloudTrailLogsWorker
+    """
+    prefix = "AWSLogs/111111111111/CloudTrail/eu-west-2/"
+    keys = {
+        f"{prefix}2021/12/31/a.json.gz": 10,
+        f"{prefix}2022/02/20/a.json.gz": 10,
+        f"{prefix}2022/02/21/a.json.gz": 10,
+        f"{prefix}2022/02/21/b.json.gz": 10,
+        f"{prefix}2022/02/22/empty.json.gz": 0,
+    }
+    listed_prefixes = []
+
+    class PartitionedS3Mock(S3MockBase):
+        def list_objects_v2(self, Prefix: str = "", Delimiter: str | None = None, **kwargs):
+            listed_prefixes.append((Prefix, Delimiter))
+            matching = sorted(key for key in keys if key.startswith(Prefix))
+
+            if Delimiter:
+                common_prefixes = sorted(
+                    {Prefix + key[len(Prefix) :].split(Delimiter)[0] + Delimiter for key in matching}
+                )
+                return {"CommonPrefixes": [{"Prefix": common_prefix} for common_prefix in common_prefixes]}
+
+            return {"Contents": [{"Key": key, "Size": keys[key]} for key in matching]}
+
+    worker.prefix = prefix
+    worker.client = PartitionedS3Mock()
+
+    assert worker.get_last_key(None) == f"{prefix}2022/02/21/b.json.gz"
+    assert (f"{prefix}2021/", "/") not in listed_prefixes
+    assert (prefix, None) not in listed_prefixes
@@ -1,7 +1,9 @@
 """Contains tests for AbstractAwsS3QueuedConnector."""
 
+import asyncio
 import os
 from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import BinaryIO
 from unittest.mock import AsyncMock, MagicMock
@@ -293,3 +295,123 @@ async def test_abstract_aws_s3_queued_connector_next_batch_with_empty_data_in_s3
     result = await abstract_queued_connector.next_batch()
 
     assert result == (0, [message[1] for message in valid_messages])
+
+
+async def test_abstract_aws_s3_queued_connector_next_batch_fetches_objects_concurrently(
+    session_faker: Faker, abstract_queued_connector: AbstractAwsS3QueuedConnector, sqs_message: str
+):
+    """
+    Test AbstractAwsS3QueuedConnector next_batch method fetches the objects concurrently.
+
+    Args:
+        session_faker: Faker
+        abstract_queued_connector: AbstractAwsS3QueuedConnector
+        sqs_message: str
+    """
+    amount_of_messages = 10
+    sqs_messages = [(sqs_message, session_faker.pyint(min_value=5, max_value=100)) for _ in range(amount_of_messages)]
+    data_content = session_faker.word()
+
+    abstract_queued_connector.limit_of_events_to_push = 100
+    abstract_queued_connector.s3_fetch_concurrency_sem = asyncio.BoundedSemaphore(3)
+
+    in_flight = 0
+    max_in_flight = 0
+
+    @asynccontextmanager
+    async def read_key(bucket: str, key: str):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            yield await async_bytesIO(data_content.encode("utf-8"))
+        finally:
+            in_flight -= 1
+
+    abstract_queued_connector.sqs_wrapper = MagicMock()
+    abstract_queued_connector.sqs_wrapper.receive_messages = MagicMock()
+    abstract_queued_connector.sqs_wrapper.receive_messages.return_value.__aenter__.side_effect = [sqs_messages, []]
+
+    abstract_queued_connector.s3_wrapper = MagicMock()
+    abstract_queued_connector.s3_wrapper.read_key = read_key
+
+    result = await abstract_queued_connector.next_batch()
+
+    assert result == (amount_of_messages, [message[1] for message in sqs_messages])
+    assert max_in_flight == 3
+    abstract_queued_connector.push_data_to_intakes.assert_awaited_once_with(
+        events=[data_content for _ in range(amount_of_messages)]
+    )
+
+
+async def test_abstract_aws_s3_queued_connector_next_batch_with_concurrent_consumers(
+    session_faker: Faker, abstract_queued_connector: AbstractAwsS3QueuedConnector, sqs_message: str
+):
+    """
+    Test AbstractAwsS3QueuedConnector next_batch method with several consumers polling the queue.
+
+    Args:
+        session_faker: Faker
+        abstract_queued_connector: AbstractAwsS3QueuedConnector
+        sqs_message: str
+    """
+    batches = [[(sqs_message, session_faker.pyint(min_value=5, max_value=100)) for _ in range(10)] for _ in range(4)]
+    data_content = session_faker.word()
+
+    async def read_key():
+        return await async_bytesIO(data_content.encode("utf-8"))
+
+    abstract_queued_connector.sqs_consumers = 2
+    abstract_queued_connector.limit_of_events_to_push = 1000
+
+    abstract_queued_connector.sqs_wrapper = MagicMock()
+    abstract_queued_connector.sqs_wrapper.receive_messages = MagicMock()
+    abstract_queued_connector.sqs_wrapper.receive_messages.return_value.__aenter__.side_effect = batches + [[], []]
+
+    abstract_queued_connector.s3_wrapper = MagicMock()
+    abstract_queued_connector.s3_wrapper.read_key = MagicMock()
+    abstract_queued_connector.s3_wrapper.read_key.return_value.__aenter__.side_effect = read_key
+
+    result = await abstract_queued_connector.next_batch()
+
+    assert result[0] == 40
+    assert sorted(result[1]) == sorted(timestamp for batch in batches for _, timestamp in batch)
+    assert abstract_queued_connector.sqs_wrapper.receive_messages.call_count == 6
+
+
+@pytest.mark.asyncio
+async def test_abstract_aws_s3_queued_connector_next_batch_cancels_consumers_on_failure(
+    abstract_queued_connector: AbstractAwsS3QueuedConnector,
+):
+    """
+    Test AbstractAwsS3QueuedConnector next_batch method cancels the other consumers when one of them fails.
+
+    Args:
+        abstract_queued_connector: AbstractAwsS3QueuedConnector
+    """
+    polling = asyncio.Event()
+    cancelled_consumers = []
+
+    @asynccontextmanager
+    async def receive_messages(max_messages: int) -> AsyncGenerator[list[tuple[str, int]], None]:
+        if not polling.is_set():
+            # the first consumer long-polls the queue
+            polling.set()
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled_consumers.append(max_messages)
+                raise
+
+        raise RuntimeError("Failed to receive messages")
+        yield []
+
+    abstract_queued_connector.sqs_consumers = 2
+    abstract_queued_connector.sqs_wrapper = MagicMock()
+    abstract_queued_connector.sqs_wrapper.receive_messages = MagicMock(side_effect=receive_messages)
+
+    with pytest.raises(RuntimeError):
+        await abstract_queued_connector.next_batch()
+
+    assert len(cancelled_consumers) == 1
@@ -8,7 +8,7 @@ from faker import Faker
 
 from connectors import AwsModule
 from connectors.s3 import AwsS3QueuedConfiguration
-from connectors.s3.trigger_s3_records import AwsS3RecordsTrigger
+from connectors.s3.trigger_s3_records import AwsS3RecordsConfiguration, AwsS3RecordsTrigger, EventsFilter
 from tests.helpers import async_list, async_temporary_file
 
 
@@ -179,3 +179,49 @@ def test_check_if_payload_is_valid_2(connector: AwsS3RecordsTrigger, session_fak
         )
 
         assert connector.is_valid_payload({"eventSource": "random.amazonaws.com", "eventName": event}) is False
+
+
+@pytest.mark.asyncio
+async def test_aws_s3_records_trigger_parse_content_with_custom_filters(
+    aws_module: AwsModule, symphony_storage: Path, faker: Faker
+):
+    """
+    Test AwsS3RecordsTrigger `_parse_content` with filters defined in the configuration.
+
+    Args:
+        aws_module: AwsModule
+        symphony_storage: Path
+        faker: Faker
+    """
+    connector = AwsS3RecordsTrigger(module=aws_module, data_path=symphony_storage)
+    connector.configuration = AwsS3RecordsConfiguration(
+        intake_key=faker.word(),
+        queue_name=faker.word(),
+        events_filters={
+            "iam.amazonaws.com": {"supported": ["Create", "Delete"]},
+            "default": {"unsupported": ["Get"]},
+        },
+    )
+
+    records = [
+        {"eventSource": "iam.amazonaws.com", "eventName": "CreateUser"},
+        {"eventSource": "iam.amazonaws.com", "eventName": "ListUsers"},
+        {"eventSource": "iam.amazonaws.com", "eventName": "DeleteRole"},
+        {"eventSource": "s3.amazonaws.com", "eventName": "GetObject"},
+        {"eventSource": "ec2.amazonaws.com", "eventName": "DescribeInstances"},
+    ]
+
+    async with async_temporary_file(orjson.dumps({"Records": records})) as f:
+        assert await async_list(connector._parse_content(f)) == [
+            orjson.dumps(record).decode("utf-8") for record in (records[0], records[2], records[4])
+        ]
+
+
+def test_events_filter_memoizes_decisions():
+    """Test EventsFilter returns the same decisions from its cache."""
+    events_filter = EventsFilter({"default": {"unsupported": ["List", "Describe"]}})
+
+    assert events_filter.is_valid("random.amazonaws.com", "ListBuckets") is False
+    assert events_filter.is_valid("random.amazonaws.com", "ListBuckets") is False
+    assert events_filter.is_valid("random.amazonaws.com", "CreateBucket") is True
+    assert EventsFilter({}).is_valid("random.amazonaws.com", "ListBuckets") is True
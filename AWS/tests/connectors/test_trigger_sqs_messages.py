@@ -1,6 +1,8 @@
 """Contains tests for AwsSqsMessagesTrigger."""
 
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock
 
@@ -242,3 +244,39 @@ def test_is_aws_notification(message: dict, expected: bool, connector: AwsSqsMes
         connector: AwsSqsMessagesTrigger
     """
     assert connector.is_aws_notification(message) is expected
+
+
+@pytest.mark.asyncio
+async def test_trigger_sqs_messages_with_concurrent_consumers(
+    session_faker: Faker, sqs_message: str, connector: AwsSqsMessagesTrigger
+):
+    """
+    Test trigger AwsSqsMessagesTriggerConfiguration with several consumers polling the queue.
+
+    Args:
+        session_faker: Faker
+        sqs_message: str
+        connector: AwsSqsMessagesTrigger
+    """
+    amount_of_messages = session_faker.pyint(min_value=1, max_value=10)
+    valid_messages = [
+        (sqs_message, session_faker.pyint(min_value=1, max_value=1000)) for _ in range(amount_of_messages)
+    ]
+    records_per_message = len(orjson.loads(sqs_message).get("Records", []))
+
+    @asynccontextmanager
+    async def receive_messages(max_messages: int):
+        # long polling gives the hand to the other consumers
+        await asyncio.sleep(0)
+        yield valid_messages
+
+    connector.sqs_consumers = 3
+    connector.sqs_wrapper = MagicMock()
+    connector.sqs_wrapper.receive_messages = MagicMock(side_effect=receive_messages)
+
+    result = await connector.next_batch()
+
+    # the consumers poll concurrently, then stop as the limit of events to push is reached
+    assert connector.sqs_wrapper.receive_messages.call_count == 3
+    assert result[0] == 3 * amount_of_messages * records_per_message
+    assert sorted(result[1]) == sorted(3 * [timestamp for _, timestamp in valid_messages])
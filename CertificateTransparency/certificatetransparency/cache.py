@@ -0,0 +1,45 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+
+
+class DeduplicationCache:
+    """Remember the keys seen during a time window, forgetting the oldest ones beyond a maximum size"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._expirations: OrderedDict[Hashable, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._expirations)
+
+    def seen(self, key: Hashable) -> bool:
+        """
+        Check if the key was already seen during the time window, and remember it otherwise.
+
+        :param key: The key to check.
+        :return: True if the key was seen during the time window, False otherwise.
+        """
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return False
+
+        now = time.monotonic()
+        with self._lock:
+            # the keys are ordered by expiration, as they are all remembered for the same duration
+            while self._expirations:
+                oldest_key, expiration = next(iter(self._expirations.items()))
+                if expiration > now:
+                    break
+                del self._expirations[oldest_key]
+
+            if key in self._expirations:
+                return True
+
+            self._expirations[key] = now + self.ttl
+            if len(self._expirations) > self.maxsize:
+                self._expirations.popitem(last=False)
+
+            return False
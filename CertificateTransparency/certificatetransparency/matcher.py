@@ -0,0 +1,129 @@
+import re
+from collections.abc import Iterable
+from functools import lru_cache
+
+
+def compile_keyword(keyword: str) -> dict[str, int]:
+    """Compile a keyword into the bit masks of the positions of each of its characters
+
+    Args:
+        keyword (str): The keyword to compile
+
+    Returns:
+        dict[str, int]: For each character of the keyword, the bit mask of its positions
+    """
+    masks: dict[str, int] = {}
+    for position, char in enumerate(keyword):
+        masks[char] = masks.get(char, 0) | (1 << position)
+    return masks
+
+
+def bounded_levenshtein_distance(masks: dict[str, int], length: int, token: str, max_distance: int) -> int | None:
+    """Compute the Levenshtein distance between a compiled keyword and a token, up to a maximum distance
+
+    Use the bit-parallel algorithm of Myers, as extended by Hyyrö to the edit distance between two words:
+    each character of the token updates the whole column of distances at once.
+    The computation stops as soon as the distance cannot be lower than the maximum distance anymore.
+
+    Args:
+        masks (dict[str, int]): The compiled keyword, see `compile_keyword`
+        length (int): The length of the keyword
+        token (str): The word to compare
+        max_distance (int): The maximum distance
+
+    Returns:
+        int | None: The distance between the keyword and the token, None if greater than the maximum distance
+    """
+    if abs(length - len(token)) > max_distance:
+        return None
+
+    if length == 0:
+        return len(token)
+
+    full = (1 << length) - 1
+    last = 1 << (length - 1)
+    positive_vertical = full
+    negative_vertical = 0
+    distance = length
+    remaining = len(token)
+
+    for char in token:
+        equal = masks.get(char, 0)
+        remaining -= 1
+
+        vertical = equal | negative_vertical
+        horizontal = (((equal & positive_vertical) + positive_vertical) ^ positive_vertical) | equal
+        positive_horizontal = negative_vertical | (~(horizontal | positive_vertical) & full)
+        negative_horizontal = positive_vertical & horizontal
+
+        if positive_horizontal & last:
+            distance += 1
+        elif negative_horizontal & last:
+            distance -= 1
+
+        # each remaining character of the token lowers the distance by one at most
+        if distance - remaining > max_distance:
+            return None
+
+        positive_horizontal = ((positive_horizontal << 1) | 1) & full
+        negative_horizontal = (negative_horizontal << 1) & full
+        positive_vertical = negative_horizontal | (~(vertical | positive_horizontal) & full)
+        negative_vertical = positive_horizontal & vertical
+
+    return distance if distance <= max_distance else None
+
+
+class KeywordMatcher:
+    """Match domains against keywords, either contained in the domain or within a Levenshtein distance of its words
+
+    The keywords are compiled once. The decision for each word is cached, as the same words recur in many domains.
+    """
+
+    def __init__(
+        self, keywords: list[str], max_distance: int = 0, ignoring: Iterable[str] = (), cache_size: int = 100000
+    ):
+        self.keywords = keywords
+        self.max_distance = max_distance
+        self.ignoring = frozenset(ignoring)
+        self._compiled_keywords = [(index, compile_keyword(key), len(key)) for index, key in enumerate(keywords)]
+        self._re_split = re.compile(r"\W+")
+        self._match_word = lru_cache(maxsize=cache_size)(self._match_word_uncached)
+
+    def _match_word_uncached(self, word: str) -> int | None:
+        """Return the index of the first keyword within the maximum distance of the word"""
+        for index, masks, length in self._compiled_keywords:
+            if bounded_levenshtein_distance(masks, length, word, self.max_distance) is not None:
+                return index
+        return None
+
+    def match(self, domain: str) -> str | None:
+        """Check if the domain contains a keyword or its derivations.
+
+        Args:
+            domain (str): The domain to check
+
+        Returns:
+            str | None: The keyword matched, None otherwise
+        """
+        # match exact keyword in domain
+        for word in self.keywords:
+            if word in domain:
+                return word
+
+        if self.max_distance <= 0:
+            return None
+
+        # the keyword that comes first in the list wins
+        matched_index: int | None = None
+        for word in self._re_split.split(domain):
+            # Removing too generic words
+            if word in self.ignoring:
+                continue
+
+            index = self._match_word(word)
+            if index is not None and (matched_index is None or index < matched_index):
+                matched_index = index
+                if matched_index == 0:
+                    break
+
+        return self.keywords[matched_index] if matched_index is not None else None
@@ -1,14 +1,31 @@
-import re
+import threading
+import time
+from functools import cached_property
 
 import certstream
-import numpy
 from sekoia_automation.trigger import Trigger
 
+from certificatetransparency.cache import DeduplicationCache
+from certificatetransparency.matcher import KeywordMatcher
+
+STATISTICS_INTERVAL = 60
+
 
 class CertificateUpdatedTrigger(Trigger):
     _ignoring: list[str] = ["email", "mail", "cloud"]
 
-    _re_split: re.Pattern
+    _statistics_start: float = 0.0
+    _analysed_domains: int = 0
+    _matched_domains: int = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending_matches: list[dict] = []
+        self._pending_lock = threading.Lock()
+
+    @property
+    def batch_interval(self) -> int:
+        return self.configuration.get("batch_interval", 0)
 
     def run(self):
         self.log("Trigger starting")
@@ -20,75 +37,89 @@ class CertificateUpdatedTrigger(Trigger):
         if len(extend_ignoring) > 0:
             self._ignoring.extend(extend_ignoring)
 
-        self._re_split = re.compile(r"\W+")
+        self._statistics_start = time.time()
+
+        stop_flushing = threading.Event()
+        flusher = threading.Thread(target=self._flush_periodically, args=(stop_flushing,), daemon=True)
+        if self.batch_interval > 0:
+            flusher.start()
+
+        try:
+            certstream.listen_for_events(self.analyse_domain, url="wss://certstream.calidog.io/")
+        finally:
+            if flusher.is_alive():
+                stop_flushing.set()
+                flusher.join()
+            self.flush_matches()
 
-        certstream.listen_for_events(self.analyse_domain, url="wss://certstream.calidog.io/")
         self.log("Trigger stopping")
 
+    @cached_property
+    def matcher(self) -> KeywordMatcher:
+        return KeywordMatcher(
+            keywords=self.configuration.get("keywords", []),
+            max_distance=self.configuration.get("max_distance", 0),
+            ignoring=self._ignoring,
+        )
+
+    @cached_property
+    def deduplication_cache(self) -> DeduplicationCache:
+        return DeduplicationCache(
+            maxsize=self.configuration.get("deduplication_cache_size", 100000),
+            ttl=self.configuration.get("deduplication_ttl", 3600),
+        )
+
     def analyse_domain(self, message, context):
         """Callback method for a new event"""
 
         if message["message_type"] == "certificate_update":
             for domain in message["data"]["leaf_cert"]["all_domains"]:
+                self._analysed_domains += 1
                 matched_keyword = self._contains_keywords(domain)
-                if matched_keyword:
-                    self.send_event(
-                        event_name=domain,
-                        event={
-                            "matched_keyword": matched_keyword,
-                            "domain": domain,
-                            "certstream_object": message["data"],
-                        },
-                    )
-
-    def _levenshtein_distance(self, token1: str, token2: str) -> int:
-        """Levenshtein distance is a calculation of the closeness of two works
-
-        More precisely, it is the number of insertion/deletions/permutations
-        required to go from a given word to another
-        e.g. from "hello" to "jelly" the distance is 2 (j->h and o->y)
-        See here for an explanation of how the algorithm works:
-        https://blog.paperspace.com/measuring-text-similarity-using-levenshtein-distance/
-
-        Args:
-            token1 (str): First word to compare
-            token2 (str): Second word to compare
-
-        Returns:
-            int: Levenshtein distance between token1 and token2
+                # certstream repeats the same domains across precertificates and renewals
+                if not matched_keyword or self.deduplication_cache.seen((domain, matched_keyword)):
+                    continue
+
+                self._matched_domains += 1
+                self.emit_match(
+                    {
+                        "matched_keyword": matched_keyword,
+                        "domain": domain,
+                        "certstream_object": message["data"],
+                    }
+                )
+
+            self._report_statistics(message["data"].get("seen"))
+
+    def emit_match(self, match: dict):
+        """
+        Send the match right away or, if batching is enabled, keep it for the next batch.
+
+        :param match: The matched keyword, the domain and the certstream object.
+        """
+        if self.batch_interval <= 0:
+            self.send_event(event_name=match["domain"], event=match)
+            return
+
+        with self._pending_lock:
+            self._pending_matches.append(match)
+
+    def flush_matches(self):
+        """
+        Send the pending matches in a single event.
         """
-        # Initialize a matrix of distances, where token1 is "the abscissa   "
-        # and token2 is "the ordinate", so to say
-        distances = numpy.zeros((len(token1) + 1, len(token2) + 1))
-        # Variables used to store temp. distances later on
-        a = 0
-        b = 0
-        c = 0
-
-        # Fill the first line and column of the matrix with incremental values
-        for t1 in range(len(token1) + 1):
-            distances[t1][0] = t1
-        for t2 in range(len(token2) + 1):
-            distances[0][t2] = t2
-
-        # We loop over each character of each token and see if they are identical
-        for t1 in range(1, len(token1) + 1):
-            for t2 in range(1, len(token2) + 1):
-                # If so, the distance between the tokens doesn't increase:
-                # we keep the previous value (i.e. the one 1 step earlier on the matrix's diagonale)
-                if token1[t1 - 1] == token2[t2 - 1]:
-                    distances[t1][t2] = distances[t1 - 1][t2 - 1]
-                # Otherwise, we look up the distance of the previous steps, of which they are 3:
-                # one char earlier on token1, on token2 or on both
-                # We keep the lowest distance and increment it then add it to the matrix
-                else:
-                    a = distances[t1][t2 - 1]
-                    b = distances[t1 - 1][t2]
-                    c = distances[t1 - 1][t2 - 1]
-                    distances[t1][t2] = min(a, b, c) + 1
-
-        # Finally the actual distance is the low-right corner, the end of the diagonale
-        return distances[len(token1)][len(token2)]
+        with self._pending_lock:
+            matches, self._pending_matches = self._pending_matches, []
+
+        if matches:
+            self.send_event(event_name=f"{len(matches)} domains matching keywords", event={"matches": matches})
+
+    def _flush_periodically(self, stop_event: threading.Event):
+        while not stop_event.wait(self.batch_interval):
+            try:
+                self.flush_matches()
+            except Exception as error:
+                self.log_exception(error, message="Failed to send the batch of matches")
 
     def _contains_keywords(self, domain: str) -> str | bool:
         """
@@ -97,24 +128,27 @@ class CertificateUpdatedTrigger(Trigger):
         :param domain: The domain to check.
         :return: The keyword matched, or false.
         """
-        keywords: list[str] = self.configuration.get("keywords", None)
-        max_distance = self.configuration.get("max_distance", 0)
+        return self.matcher.match(domain) or False
 
-        # match exact keyword in domain
-        for word in keywords:
-            if word in domain:
-                return word
-
-        if max_distance <= 0:
-            return False
-
-        words_in_domain = self._re_split.split(domain)
-
-        # Testing Levenshtein distance for keywords
-        for key in keywords:
-            # Removing too generic words
-            for word in [w for w in words_in_domain if w not in self._ignoring]:
-                if self._levenshtein_distance(str(word), str(key)) <= max_distance:
-                    return key
+    def _report_statistics(self, seen: float | None):
+        """
+        Log the throughput of the analysis and how far behind the stream the trigger is, once per interval
 
-        return False
+        :param seen: The time the last certificate was seen by certstream.
+        """
+        now = time.time()
+        elapsed = now - self._statistics_start
+        if elapsed < STATISTICS_INTERVAL:
+            return
+
+        statistics = (
+            f"Analysed {self._analysed_domains} domains ({self._analysed_domains / elapsed:.1f}/s), "
+            f"matched {self._matched_domains} ({self._matched_domains / elapsed:.2f}/s)"
+        )
+        if seen is not None:
+            statistics += f", backlog of {max(now - seen, 0):.1f}s"
+        self.log(level="info", message=statistics)
+
+        self._statistics_start = now
+        self._analysed_domains = 0
+        self._matched_domains = 0
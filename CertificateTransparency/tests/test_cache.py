@@ -0,0 +1,28 @@
+from unittest.mock import patch
+
+from certificatetransparency.cache import DeduplicationCache
+
+
+def test_deduplication_cache():
+    cache = DeduplicationCache(maxsize=2, ttl=60)
+
+    with patch("certificatetransparency.cache.time.monotonic", return_value=1000.0):
+        assert cache.seen("a") is False
+        assert cache.seen("a") is True
+        assert cache.seen("b") is False
+        assert cache.seen("c") is False
+        # the oldest key is forgotten beyond the maximum size
+        assert cache.seen("a") is False
+        assert len(cache) == 2
+
+    with patch("certificatetransparency.cache.time.monotonic", return_value=1060.0):
+        # the keys expire after the time window
+        assert cache.seen("c") is False
+        assert len(cache) == 1
+
+
+def test_deduplication_cache_disabled():
+    cache = DeduplicationCache(maxsize=2, ttl=0)
+
+    assert cache.seen("a") is False
+    assert cache.seen("a") is False
@@ -0,0 +1,41 @@
+import pytest
+
+from certificatetransparency.matcher import KeywordMatcher, bounded_levenshtein_distance, compile_keyword
+
+
+@pytest.mark.parametrize(
+    "keyword,token,max_distance,expected",
+    [
+        ("hello", "jelly", 2, 2),
+        ("hello", "hello", 0, 0),
+        ("sekoia", "sek0la", 2, 2),
+        ("sekoia", "sekoia-admin", 2, None),
+        ("sekoia", "sek", 2, None),
+        ("sekoia", "", 6, 6),
+        ("kitten", "sitting", 3, 3),
+        ("kitten", "sitting", 2, None),
+    ],
+)
+def test_bounded_levenshtein_distance(keyword, token, max_distance, expected):
+    assert bounded_levenshtein_distance(compile_keyword(keyword), len(keyword), token, max_distance) == expected
+
+
+def test_matcher_exact_keyword():
+    matcher = KeywordMatcher(["sekoia", "splunk"])
+
+    assert matcher.match("my-splunk.com") == "splunk"
+    assert matcher.match("sekola.com") is None
+
+
+def test_matcher_first_keyword_wins():
+    matcher = KeywordMatcher(["sekoia", "splunk"], max_distance=2)
+
+    assert matcher.match("splonk.sekola.com") == "sekoia"
+    assert matcher.match("splonk.com") == "splunk"
+
+
+def test_matcher_ignores_generic_words():
+    matcher = KeywordMatcher(["sekoia"], max_distance=2, ignoring=["sekola"])
+
+    assert matcher.match("sekola.com") is None
+    assert matcher.match("sek0la.com") == "sekoia"
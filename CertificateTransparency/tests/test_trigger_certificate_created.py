@@ -1,4 +1,3 @@
-import re
 from unittest.mock import Mock, patch
 
 import pytest
@@ -6,12 +5,10 @@ import pytest
 from certificatetransparency.triggers.certificate_updated import CertificateUpdatedTrigger
 
 
-def create_trigger(configuration: dict | None = None, compile_re: bool = True) -> CertificateUpdatedTrigger:
+def create_trigger(configuration: dict | None = None) -> CertificateUpdatedTrigger:
     trigger = CertificateUpdatedTrigger()
     trigger.configuration = configuration if configuration else {}
     trigger.log = Mock()
-    if compile_re:
-        trigger._re_split = re.compile(r"\W+")
     return trigger
 
 
@@ -56,8 +53,70 @@ def test_analyse_domain_all():
         )
 
 
+def test_analyse_domain_reports_statistics():
+    event = {
+        "message_type": "certificate_update",
+        "data": {"leaf_cert": {"all_domains": ["sekoia.com", "lambda"]}, "seen": 1000.0},
+    }
+
+    trigger = create_trigger({"keywords": ["sekoia"]})
+    trigger._statistics_start = 940.0
+
+    with patch.object(trigger, "send_event", Mock()), patch(
+        "certificatetransparency.triggers.certificate_updated.time.time", return_value=1010.0
+    ):
+        trigger.analyse_domain(event, None)
+
+    trigger.log.assert_called_once_with(
+        level="info", message="Analysed 2 domains (0.0/s), matched 1 (0.01/s), backlog of 10.0s"
+    )
+    assert trigger._analysed_domains == 0
+    assert trigger._statistics_start == 1010.0
+
+
+def test_analyse_domain_deduplicates_matches():
+    event = {
+        "message_type": "certificate_update",
+        "data": {"leaf_cert": {"all_domains": ["sekoia.com", "www.sekoia.com", "sekoia.com"]}},
+    }
+
+    trigger = create_trigger({"keywords": ["sekoia"]})
+
+    with patch.object(trigger, "send_event", Mock()) as mock:
+        trigger.analyse_domain(event, None)
+        trigger.analyse_domain(event, None)
+
+        assert [call.kwargs["event_name"] for call in mock.call_args_list] == ["sekoia.com", "www.sekoia.com"]
+
+
+def test_analyse_domain_batches_matches():
+    event = {
+        "message_type": "certificate_update",
+        "data": {"leaf_cert": {"all_domains": ["sekoia.com", "www.sekoia.com", "lambda"]}},
+    }
+
+    trigger = create_trigger({"keywords": ["sekoia"], "batch_interval": 60})
+
+    with patch.object(trigger, "send_event", Mock()) as mock:
+        trigger.analyse_domain(event, None)
+        assert mock.call_count == 0
+
+        trigger.flush_matches()
+        trigger.flush_matches()
+
+        mock.assert_called_once_with(
+            event_name="2 domains matching keywords",
+            event={
+                "matches": [
+                    {"matched_keyword": "sekoia", "domain": "sekoia.com", "certstream_object": event["data"]},
+                    {"matched_keyword": "sekoia", "domain": "www.sekoia.com", "certstream_object": event["data"]},
+                ]
+            },
+        )
+
+
 def test_run():
-    trigger = create_trigger(configuration={"keywords": ["sekoia"], "ignoring": ["amazon"]}, compile_re=False)
+    trigger = create_trigger(configuration={"keywords": ["sekoia"], "ignoring": ["amazon"]})
     with patch("certificatetransparency.triggers.certificate_updated.certstream.listen_for_events") as certstream_mock:
         trigger.run()
 
@@ -1,9 +1,11 @@
-import json
+import os
 import queue
 import threading
 import time
-from collections.abc import Generator
+from collections import defaultdict, deque
+from collections.abc import Callable, Generator, Iterable
 from functools import cached_property
+from typing import NamedTuple
 
 import orjson
 from requests.auth import AuthBase
@@ -16,17 +18,29 @@ from crowdstrike_falcon import CrowdStrikeFalconModule
 from crowdstrike_falcon.client import CrowdstrikeFalconClient
 from crowdstrike_falcon.exceptions import StreamNotAvailable
 from crowdstrike_falcon.helpers import (
+    TTLCache,
     compute_refresh_interval,
     get_detection_id,
     get_epp_detection_composite_id,
     group_edges_by_verticle_type,
 )
 from crowdstrike_falcon.logging import get_logger
-from crowdstrike_falcon.metrics import EVENTS_LAG, INCOMING_DETECTIONS, INCOMING_VERTICLES, OUTCOMING_EVENTS
+from crowdstrike_falcon.metrics import (
+    ENRICHMENT_DURATION,
+    EVENTS_LAG,
+    EVENTS_QUEUE_SIZE,
+    INCOMING_DETECTIONS,
+    INCOMING_VERTICLES,
+    OUTCOMING_EVENTS,
+    PUSH_DURATION,
+)
 
 logger = get_logger()
 
 MAX_EVENTS_PER_BATCH = 1000
+MAX_PUSH_RETRY_DELAY = 60
+MAX_DETECTIONS_PER_ENRICHMENT = 100
+MAX_VERTICLES_PER_REQUEST = 100
 
 
 class VerticlesCollector:
@@ -34,9 +48,13 @@ class VerticlesCollector:
         self,
         connector: "EventStreamTrigger",
         falcon_client: CrowdstrikeFalconClient | None = None,
+        cache_size: int = 10000,
+        cache_ttl: float = 600,
     ):
         self.connector = connector
         self.falcon_client = falcon_client or connector.client
+        # the same process graphs recur in many detections: keep the details of their verticles for a while
+        self.verticles_cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
         self.edge_types = set(self.falcon_client.get_edge_types()) - {
             "device",
             "hunting_lead",
@@ -97,28 +115,60 @@ class VerticlesCollector:
 
         return graph_ids
 
-    def collect_verticles_from_graph_ids(self, graph_ids: set[str]) -> Generator[tuple[str, str, dict], None, None]:
+    def get_verticles_details(self, verticle_ids: list[str], verticle_type: str) -> dict[str, dict]:
         """
-        Collect verticles from a list of graph ids
+        Get the details of the verticles, from the cache if already fetched
 
-        :param list: graph_ids: The list of sources to explore the graph
+        :param list verticle_ids: The identifiers of the verticles
+        :param str verticle_type: The type of the verticles
+        :return: The details of the verticles, by identifier
+        :rtype: dict
         """
+        verticles: dict[str, dict] = {}
+        missing_ids: list[str] = []
+        for verticle_id in verticle_ids:
+            vertex = self.verticles_cache.get(verticle_id)
+            if vertex is not None:
+                verticles[verticle_id] = vertex
+            else:
+                missing_ids.append(verticle_id)
+
+        for index in range(0, len(missing_ids), MAX_VERTICLES_PER_REQUEST):
+            chunk = missing_ids[index : index + MAX_VERTICLES_PER_REQUEST]
+            try:
+                for vertex in self.falcon_client.get_verticles_details(chunk, verticle_type):
+                    self.verticles_cache.set(vertex["id"], vertex)
+                    verticles[vertex["id"]] = vertex
+            except HTTPError as error:
+                self.log_exception(
+                    error,
+                    message=f"Failed to get the details of {len(chunk)} verticles of type {verticle_type}",
+                    level="warning",
+                )
+
+        return verticles
+
+    def collect_verticles_by_graph_id(self, graph_ids: set[str]) -> dict[str, list[tuple[str, str, dict]]]:
+        """
+        Collect the verticles from a list of graph ids
+
+        The details of the verticles are requested once per type of verticles for all the graph ids.
+
+        :param set graph_ids: The sources to explore the graph
+        :return: The verticles, with their source and the type of their edge, by graph id
+        :rtype: dict
+        """
+        # the explored graph id, the source and the type of the edges pointing to each verticle, by verticle type
+        links: dict[str, dict[str, list[tuple[str, str, str]]]] = defaultdict(lambda: defaultdict(list))
         for graph_id in graph_ids:
             # iter over each type of edges
             for edge_type in self.edge_types:
                 try:
                     # get edges starting from a graph id
                     edges = self.falcon_client.list_edges(graph_id, edge_type)
-                    groups = group_edges_by_verticle_type(edges)
-
-                    # for each group, get the verticles
-                    for verticle_type, list_of_edges in groups:
-                        verticles_links = {edge["id"]: edge["source_vertex_id"] for edge in list_of_edges}
-                        for vertex in self.falcon_client.get_verticles_details(
-                            list(verticles_links.keys()), verticle_type
-                        ):
-                            INCOMING_VERTICLES.labels(intake_key=self.connector.configuration.intake_key).inc()
-                            yield (verticles_links[vertex["id"]], edge_type, vertex)
+                    for verticle_type, list_of_edges in group_edges_by_verticle_type(edges):
+                        for edge in list_of_edges:
+                            links[verticle_type][edge["id"]].append((graph_id, edge["source_vertex_id"], edge_type))
                 except HTTPError as error:
                     self.log_exception(
                         error,
@@ -126,72 +176,460 @@ class VerticlesCollector:
                         level="warning",
                     )
 
-    def collect_verticles_from_detection(self, detection_id: str) -> Generator[tuple[str, str, dict], None, None]:
+        verticles: dict[str, list[tuple[str, str, dict]]] = defaultdict(list)
+        for verticle_type, verticles_links in links.items():
+            details = self.get_verticles_details(list(verticles_links.keys()), verticle_type)
+            for verticle_id, vertex in details.items():
+                for graph_id, source_vertex_id, edge_type in verticles_links.get(verticle_id, []):
+                    INCOMING_VERTICLES.labels(intake_key=self.connector.configuration.intake_key).inc()
+                    verticles[graph_id].append((source_vertex_id, edge_type, vertex))
+
+        return verticles
+
+    def collect_verticles_from_graph_ids(self, graph_ids: set[str]) -> Generator[tuple[str, str, dict], None, None]:
         """
-        Collect the verticles (events) from a detection
+        Collect verticles from a list of graph ids
 
-        :param str detection_id: The identifier of the detection
+        :param list: graph_ids: The list of sources to explore the graph
         """
-        try:
-            # get detection details from its identifier
-            detection_details = next(self.falcon_client.get_detection_details(detection_ids=[detection_id]))
+        for verticles in self.collect_verticles_by_graph_id(graph_ids).values():
+            yield from verticles
 
-            # get graph ids from detection
-            graph_ids = self.get_graph_ids_from_detection(detection_details)
+    def _collect_verticles_by_source(
+        self, graph_ids_by_source: dict[str, set[str]]
+    ) -> dict[str, list[tuple[str, str, dict]]]:
+        """
+        Collect the verticles of several detections or alerts, exploring each graph id once
 
-            # for each group, get ther verticles
-            yield from self.collect_verticles_from_graph_ids(graph_ids)
-        except HTTPError as error:
+        :param dict graph_ids_by_source: The graph ids of each detection or alert
+        :return: The verticles by detection or alert
+        :rtype: dict
+        """
+        all_graph_ids: set[str] = set().union(*graph_ids_by_source.values())
+        verticles_by_graph_id = self.collect_verticles_by_graph_id(all_graph_ids)
+
+        return {
+            source_id: [verticle for graph_id in graph_ids for verticle in verticles_by_graph_id.get(graph_id, [])]
+            for source_id, graph_ids in graph_ids_by_source.items()
+        }
+
+    def _get_details_at_once(
+        self, identifiers: list[str], get_details: Callable[[list[str]], Iterable[dict]], identifier_field: str
+    ) -> dict[str, dict]:
+        """
+        Get the details of several detections or alerts in one request
+
+        Only the details whose identifier is one of the requested identifiers are returned. The others are
+        requested one by one by the caller.
+
+        :param list identifiers: The identifiers of the detections or alerts
+        :param Callable get_details: The function requesting the details of a list of identifiers
+        :param str identifier_field: The field of the details holding the identifier
+        :return: The details by requested identifier
+        :rtype: dict
+        """
+        requested = set(identifiers)
+        details_by_id: dict[str, dict] = {}
+        for details in get_details(identifiers):
+            identifier = details.get(identifier_field)
+            if identifier in requested:
+                details_by_id[identifier] = details
+
+        return details_by_id
+
+    def collect_verticles_from_detections(self, detection_ids: list[str]) -> dict[str, list[tuple[str, str, dict]]]:
+        """
+        Collect the verticles (events) from several detections
+
+        :param list detection_ids: The identifiers of the detections
+        :return: The verticles by detection
+        :rtype: dict
+        """
+        try:
+            # get the details of all the detections at once
+            details_by_detection = self._get_details_at_once(
+                detection_ids,
+                lambda identifiers: self.falcon_client.get_detection_details(detection_ids=identifiers),
+                "detection_id",
+            )
+        except Exception as error:
             self.log_exception(
                 error,
-                message=(
-                    f"Failed to collect verticles for detection {detection_id}: "
-                    f"{error.response.status_code} {error.response.reason}"
-                ),
+                message=f"Failed to get the details of {len(detection_ids)} detections, requesting them one by one",
+                level="warning",
             )
+            details_by_detection = {}
+
+        graph_ids_by_detection: dict[str, set[str]] = {}
+        for detection_id in detection_ids:
+            try:
+                detection_details = details_by_detection.get(detection_id) or next(
+                    self.falcon_client.get_detection_details(detection_ids=[detection_id])
+                )
+                graph_ids_by_detection[detection_id] = self.get_graph_ids_from_detection(detection_details)
+            except HTTPError as error:
+                self.log_exception(
+                    error,
+                    message=(
+                        f"Failed to collect verticles for detection {detection_id}: "
+                        f"{error.response.status_code} {error.response.reason}"
+                    ),
+                )
+            except Exception as error:
+                self.log_exception(
+                    error,
+                    message=f"Failed to collect verticles for detection {detection_id}",
+                )
+
+        try:
+            return self._collect_verticles_by_source(graph_ids_by_detection)
         except Exception as error:
             self.log_exception(
                 error,
-                message=f"Failed to collect verticles for detection {detection_id}",
+                message=f"Failed to collect verticles for detections {', '.join(graph_ids_by_detection)}",
             )
 
-    def collect_verticles_from_alert(self, composite_id: str) -> Generator[tuple[str, str, dict], None, None]:
-        """
-        Collect the verticles (events) from an alert
+        return {}
 
-        :param str detection_id: The identifier of the alert
+    def collect_verticles_from_detection(self, detection_id: str) -> Generator[tuple[str, str, dict], None, None]:
         """
-        try:
-            # get alert details from its identifier
-            alert_details = next(self.falcon_client.get_alert_details(composite_ids=[composite_id]))
+        Collect the verticles (events) from a detection
 
-            # get graph ids from detection
-            graph_ids = self.get_graph_ids_from_alert(alert_details)
+        :param str detection_id: The identifier of the detection
+        """
+        yield from self.collect_verticles_from_detections([detection_id]).get(detection_id, [])
 
-            # for each group, get their verticles
-            yield from self.collect_verticles_from_graph_ids(graph_ids)
+    def collect_verticles_from_alerts(self, composite_ids: list[str]) -> dict[str, list[tuple[str, str, dict]]]:
+        """
+        Collect the verticles (events) from several alerts
 
+        :param list composite_ids: The identifiers of the alerts
+        :return: The verticles by alert
+        :rtype: dict
+        """
+        try:
+            # get the details of all the alerts at once
+            details_by_alert = self._get_details_at_once(
+                composite_ids,
+                lambda identifiers: self.falcon_client.get_alert_details(composite_ids=identifiers),
+                "composite_id",
+            )
         except HTTPError as error:
             if error.response.status_code == 403:
                 # we don't have proper permissions - roll back to the old API
-                self.connector.use_alert_api = False
-                self.log(
-                    level="warning", message="Not enough permissions to use Alert API - rollback to Detection API"
-                )
+                self._rollback_to_detection_api(error, composite_ids)
+                return {}
 
             self.log_exception(
                 error,
-                message=(
-                    f"Failed to collect verticles for alert {composite_id}: "
-                    f"{error.response.status_code} {error.response.reason}"
-                ),
+                message=f"Failed to get the details of {len(composite_ids)} alerts, requesting them one by one",
+                level="warning",
+            )
+            details_by_alert = {}
+        except Exception as error:
+            self.log_exception(
+                error,
+                message=f"Failed to get the details of {len(composite_ids)} alerts, requesting them one by one",
+                level="warning",
             )
+            details_by_alert = {}
 
+        graph_ids_by_alert: dict[str, set[str]] = {}
+        for composite_id in composite_ids:
+            try:
+                alert_details = details_by_alert.get(composite_id) or next(
+                    self.falcon_client.get_alert_details(composite_ids=[composite_id])
+                )
+                graph_ids_by_alert[composite_id] = self.get_graph_ids_from_alert(alert_details)
+            except HTTPError as error:
+                if error.response.status_code == 403:
+                    self._rollback_to_detection_api(error, [composite_id])
+                    continue
+
+                self.log_exception(
+                    error,
+                    message=(
+                        f"Failed to collect verticles for alert {composite_id}: "
+                        f"{error.response.status_code} {error.response.reason}"
+                    ),
+                )
+            except Exception as error:
+                self.log_exception(
+                    error,
+                    message=f"Failed to collect verticles for alert {composite_id}",
+                )
+
+        try:
+            return self._collect_verticles_by_source(graph_ids_by_alert)
         except Exception as error:
             self.log_exception(
                 error,
-                message=f"Failed to collect verticles for alert {composite_id}",
+                message=f"Failed to collect verticles for alerts {', '.join(graph_ids_by_alert)}",
+            )
+
+        return {}
+
+    def _rollback_to_detection_api(self, error: HTTPError, composite_ids: list[str]) -> None:
+        """
+        We don't have proper permissions to use the Alert API - roll back to the old API
+        """
+        self.connector.use_alert_api = False
+        self.log(level="warning", message="Not enough permissions to use Alert API - rollback to Detection API")
+        self.log_exception(
+            error,
+            message=(
+                f"Failed to collect verticles for alerts {', '.join(composite_ids)}: "
+                f"{error.response.status_code} {error.response.reason}"
+            ),
+        )
+
+    def collect_verticles_from_alert(self, composite_id: str) -> Generator[tuple[str, str, dict], None, None]:
+        """
+        Collect the verticles (events) from an alert
+
+        :param str composite_id: The identifier of the alert
+        """
+        yield from self.collect_verticles_from_alerts([composite_id]).get(composite_id, [])
+
+
+class StreamEvent(NamedTuple):
+    stream_root_url: str
+    event: str
+    offset: int | None = None
+    creation_time: int | None = None
+
+
+class EnrichmentRequest(NamedTuple):
+    stream_root_url: str
+    kind: str  # "detection" or "alert"
+    identifier: str
+    severity_name: str | None
+    severity_code: int | None
+    submitted_at: float
+    offset: int | None = None  # the offset of the detection, held until its verticles are forwarded
+
+
+class VerticlesEnrichmentWorker(threading.Thread):
+    """
+    Collect the verticles of the detections and alerts read from the streams, out of the stream readers.
+
+    Pending requests are collected together, so the details of the detections, alerts and verticles are requested
+    once for the whole batch.
+    """
+
+    def __init__(
+        self,
+        connector: "EventStreamTrigger",
+        verticles_collector: VerticlesCollector,
+    ):
+        super().__init__()
+        self.connector = connector
+        self.verticles_collector = verticles_collector
+        self.enrichment_queue = connector.enrichment_queue
+        self.events_queue = connector.events_queue
+        self.stream_offsets = connector.stream_offsets
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    @property
+    def running(self):
+        return not self._stop_event.is_set()
+
+    def log(self, *args, **kwargs):
+        self.connector.log(*args, **kwargs)
+
+    def log_exception(self, *args, **kwargs):
+        self.connector.log_exception(*args, **kwargs)
+
+    def next_batch(self) -> list[EnrichmentRequest]:
+        """
+        Get the pending enrichment requests
+        """
+        batch = [self.enrichment_queue.get(block=True, timeout=5)]
+
+        try:
+            while len(batch) < MAX_DETECTIONS_PER_ENRICHMENT:
+                batch.append(self.enrichment_queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        return batch
+
+    def enqueue(self, stream_root_url: str, event: str, offset: int | None) -> None:
+        while self.running:
+            try:
+                self.events_queue.put(StreamEvent(stream_root_url, event, offset), timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def release(self, request: EnrichmentRequest) -> None:
+        """
+        Release the hold of the request on the offset of its detection
+        """
+        if request.offset is not None:
+            self.stream_offsets.acknowledge({request.stream_root_url: [request.offset]})
+
+    def forward_verticles(self, request: EnrichmentRequest, verticles: list[tuple[str, str, dict]]) -> None:
+        """
+        Queue the verticles of the detection as events
+
+        The events carry the offset of the detection: it is committed once all of them are forwarded.
+        """
+        events = [
+            orjson.dumps(
+                {
+                    "metadata": {
+                        "detectionIdString": request.identifier,
+                        "eventType": "Vertex",
+                        "edge": {"sourceVertexId": source_vertex_id, "type": edge_type},
+                        "severity": {"name": request.severity_name, "code": request.severity_code},
+                    },
+                    "event": vertex,
+                }
+            ).decode()
+            for source_vertex_id, edge_type, vertex in verticles
+        ]
+
+        if not events:
+            self.release(request)
+            return
+
+        # the request holds the offset once, each event will be acknowledged
+        if request.offset is not None and len(events) > 1:
+            self.stream_offsets.hold(request.stream_root_url, request.offset, len(events) - 1)
+
+        for event in events:
+            self.enqueue(request.stream_root_url, event, request.offset)
+
+    def enrich(self, batch: list[EnrichmentRequest]) -> None:
+        """
+        Collect the verticles of the requested detections and alerts and queue them as events
+        """
+        detection_ids = [request.identifier for request in batch if request.kind == "detection"]
+        alert_ids = [request.identifier for request in batch if request.kind == "alert"]
+
+        verticles_by_detection = (
+            self.verticles_collector.collect_verticles_from_detections(detection_ids) if detection_ids else {}
+        )
+        verticles_by_alert = self.verticles_collector.collect_verticles_from_alerts(alert_ids) if alert_ids else {}
+
+        for request in batch:
+            verticles = (verticles_by_detection if request.kind == "detection" else verticles_by_alert).get(
+                request.identifier, []
+            )
+
+            try:
+                self.forward_verticles(request, verticles)
+            except Exception as error:
+                self.log_exception(error, message=f"Failed to forward the verticles of {request.identifier}")
+                self.release(request)
+
+            ENRICHMENT_DURATION.labels(intake_key=self.connector.configuration.intake_key).observe(
+                time.monotonic() - request.submitted_at
             )
+            self.log(message=f"Collected {len(verticles)} vertex", level="info")
+
+    def run(self) -> None:
+        """
+        Enrich the detections and the alerts
+        """
+
+        while self.running:
+            try:
+                batch = self.next_batch()
+            except queue.Empty:
+                continue
+
+            try:
+                self.enrich(batch)
+            except Exception as error:
+                self.log_exception(error, message="Failed to collect verticles")
+                # don't block the offsets of the streams on the failed requests
+                for request in batch:
+                    self.release(request)
+            finally:
+                for _ in batch:
+                    self.enrichment_queue.task_done()
+
+
+class StreamOffsets:
+    """
+    Track the offsets of the events read from the streams.
+
+    The offset of a stream is committed in the cache only once all the events before it were forwarded to the
+    intake. Events forwarded out of order, by parallel forwarders, don't advance the offset past a pending event.
+
+    An offset can be held several times, e.g. by a detection and by the collection of its verticles: it is released
+    once each hold was acknowledged.
+    """
+
+    def __init__(self, data_path):
+        self._data_path = data_path
+        self._lock = threading.Lock()
+        self._pending: dict[str, deque[int]] = defaultdict(deque)
+        self._holds: dict[str, dict[int, int]] = defaultdict(dict)
+
+    def get(self, stream_root_url: str) -> int:
+        """
+        Return the committed offset of the stream
+        """
+        with self._lock, PersistentJSON("cache.json", self._data_path) as cache:
+            return cache.get(stream_root_url, 0)
+
+    def reset(self, stream_root_url: str) -> None:
+        """
+        Forget the pending offsets of the stream, when its reader is restarted from the committed offset
+        """
+        with self._lock:
+            self._pending.pop(stream_root_url, None)
+            self._holds.pop(stream_root_url, None)
+
+    def track(self, stream_root_url: str, offset: int) -> None:
+        """
+        Register the offset of an event read from the stream
+        """
+        with self._lock:
+            holds = self._holds[stream_root_url]
+            if offset not in holds:
+                self._pending[stream_root_url].append(offset)
+            holds[offset] = holds.get(offset, 0) + 1
+
+    def hold(self, stream_root_url: str, offset: int, count: int = 1) -> None:
+        """
+        Hold a tracked offset until `count` more acknowledgements
+        """
+        with self._lock:
+            holds = self._holds.get(stream_root_url)
+            if holds is not None and offset in holds:
+                holds[offset] += count
+
+    def acknowledge(self, offsets_per_stream: dict[str, list[int]]) -> None:
+        """
+        Mark the offsets as forwarded and commit, for each stream, the highest offset without pending event before it
+        """
+        with self._lock:
+            committable: dict[str, int] = {}
+
+            for stream_root_url, offsets in offsets_per_stream.items():
+                pending = self._pending.get(stream_root_url)
+                if not pending:
+                    continue
+
+                holds = self._holds[stream_root_url]
+                for offset in offsets:
+                    if offset in holds:
+                        holds[offset] -= 1
+
+                while pending and holds.get(pending[0], 0) <= 0:
+                    committable[stream_root_url] = pending.popleft()
+                    holds.pop(committable[stream_root_url], None)
+
+            if committable:
+                with PersistentJSON("cache.json", self._data_path) as cache:
+                    cache.update(committable)
 
 
 class EventStreamAuthentication(AuthBase):
@@ -224,6 +662,8 @@ class EventStreamReader(threading.Thread):
         self.app_id = app_id
         self._stop_event = threading.Event()
         self.events_queue = connector.events_queue
+        self.stream_offsets = connector.stream_offsets
+        self.enrichment_queue = connector.enrichment_queue
         self.refresh_timer = RepeatedTimer(self.refresh_interval, self.refresh_stream_timer)
 
     def stop_refresh(self):
@@ -281,6 +721,21 @@ class EventStreamReader(threading.Thread):
         else:
             logger.info("successfully refreshed event stream", refresh_url=refresh_url)
 
+    def enqueue(self, event: StreamEvent) -> bool:
+        """
+        Put the event in the queue, waiting for room while the reader is running.
+
+        The queue is bounded: when the forwarders fall behind, the reader stops consuming the stream.
+        """
+        while self.running:
+            try:
+                self.events_queue.put(event, timeout=1)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
     def refresh_stream_timer(self):
         return self.refresh_stream(refresh_url=self.stream_info["refreshActiveSessionURL"])
 
@@ -314,23 +769,37 @@ class EventStreamReader(threading.Thread):
                 while self.running:
                     try:
                         for line in http_response.iter_lines():
-                            if line.strip():
+                            line = line.strip()
+                            if line:
                                 try:
-                                    decoded_line = line.strip().decode()
-                                    # check the line is json
-                                    event = json.loads(decoded_line)
-                                    # store the new event in the queue along with it stream root url
-                                    self.events_queue.put((self.stream_root_url, decoded_line))
-                                    INCOMING_DETECTIONS.labels(
-                                        intake_key=self.connector.configuration.intake_key
-                                    ).inc()
+                                    # parse the line once, the raw line is forwarded as is
+                                    event = orjson.loads(line)
+                                    metadata = event.get("metadata") or {}
+                                    offset = metadata.get("offset")
 
+                                    # track the offset of the event until it is forwarded
+                                    if offset is not None:
+                                        self.stream_offsets.track(self.stream_root_url, offset)
+
+                                    # request the verticles first, so they hold the offset before the event is
+                                    # forwarded
                                     if self.connector.use_alert_api:
                                         alert_id = get_epp_detection_composite_id(event)
-                                        self.collect_verticles_for_epp_detection(alert_id, event)
+                                        self.collect_verticles_for_epp_detection(alert_id, event, offset)
 
                                     detection_id = get_detection_id(event)
-                                    self.collect_verticles(detection_id, event)
+                                    self.collect_verticles(detection_id, event, offset)
+
+                                    # store the new event in the queue along with it stream root url
+                                    stream_event = StreamEvent(
+                                        self.stream_root_url, line.decode(), offset, metadata.get("eventCreationTime")
+                                    )
+                                    if not self.enqueue(stream_event):
+                                        break
+
+                                    INCOMING_DETECTIONS.labels(
+                                        intake_key=self.connector.configuration.intake_key
+                                    ).inc()
 
                                 except Exception as any_exception:
                                     logger.error(
@@ -360,7 +829,34 @@ class EventStreamReader(threading.Thread):
                 level="info",
             )
 
-    def collect_verticles(self, detection_id: str | None, detection_event: dict):
+    def submit_enrichment(self, kind: str, identifier: str, detection_event: dict, offset: int | None = None) -> None:
+        """
+        Request the collection of the verticles of the detection to the enrichment workers
+
+        The request holds the offset of the detection until its verticles are forwarded.
+        """
+        event_content = detection_event.get("event", {})
+        request = EnrichmentRequest(
+            stream_root_url=self.stream_root_url,
+            kind=kind,
+            identifier=identifier,
+            severity_name=event_content.get("SeverityName"),
+            severity_code=event_content.get("Severity"),
+            submitted_at=time.monotonic(),
+            offset=offset,
+        )
+
+        if offset is not None:
+            self.stream_offsets.hold(self.stream_root_url, offset)
+
+        while self.running:
+            try:
+                self.enrichment_queue.put(request, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def collect_verticles(self, detection_id: str | None, detection_event: dict, offset: int | None = None):
         if detection_id is None:
             logger.info("Not a detection")
             return
@@ -370,32 +866,11 @@ class EventStreamReader(threading.Thread):
             return
 
         logger.info("Collect verticles for detection", detection_id=detection_id)
+        self.submit_enrichment("detection", detection_id, detection_event, offset)
 
-        event_content = detection_event.get("event", {})
-        severity_name = event_content.get("SeverityName")
-        severity_code = event_content.get("Severity")
-
-        nb_verticles = 0
-        for (
-            source_vertex_id,
-            edge_type,
-            vertex,
-        ) in self.verticles_collector.collect_verticles_from_detection(detection_id):
-            nb_verticles += 1
-            event = {
-                "metadata": {
-                    "detectionIdString": detection_id,
-                    "eventType": "Vertex",
-                    "edge": {"sourceVertexId": source_vertex_id, "type": edge_type},
-                    "severity": {"name": severity_name, "code": severity_code},
-                },
-                "event": vertex,
-            }
-            self.events_queue.put((self.stream_root_url, orjson.dumps(event).decode()))
-
-        self.log(message=f"Collected {nb_verticles} vertex", level="info")
-
-    def collect_verticles_for_epp_detection(self, composite_id: str | None, detection_event: dict):
+    def collect_verticles_for_epp_detection(
+        self, composite_id: str | None, detection_event: dict, offset: int | None = None
+    ):
         if composite_id is None:
             logger.info("Not a epp detection")
             return
@@ -405,30 +880,7 @@ class EventStreamReader(threading.Thread):
             return
 
         logger.info("Collect verticles for detection", composite_id=composite_id)
-
-        event_content = detection_event.get("event", {})
-        severity_name = event_content.get("SeverityName")
-        severity_code = event_content.get("Severity")
-
-        nb_verticles = 0
-        for (
-            source_vertex_id,
-            edge_type,
-            vertex,
-        ) in self.verticles_collector.collect_verticles_from_alert(composite_id):
-            nb_verticles += 1
-            event = {
-                "metadata": {
-                    "detectionIdString": composite_id,
-                    "eventType": "Vertex",
-                    "edge": {"sourceVertexId": source_vertex_id, "type": edge_type},
-                    "severity": {"name": severity_name, "code": severity_code},
-                },
-                "event": vertex,
-            }
-            self.events_queue.put((self.stream_root_url, orjson.dumps(event).decode()))
-
-        self.log(message=f"Collected {nb_verticles} vertex", level="info")
+        self.submit_enrichment("alert", composite_id, detection_event, offset)
 
 
 class EventForwarder(threading.Thread):
@@ -454,6 +906,74 @@ class EventForwarder(threading.Thread):
     def log_exception(self, *args, **kwargs):
         self.connector.log_exception(*args, **kwargs)
 
+    def next_batch(self) -> list[StreamEvent]:
+        """
+        Get the next batch of events from the queue
+        """
+        batch = [self.events_queue.get(block=True, timeout=5)]
+
+        try:
+            while len(batch) < MAX_EVENTS_PER_BATCH:
+                batch.append(self.events_queue.get(block=True, timeout=0.5))
+        except queue.Empty:
+            pass
+
+        EVENTS_QUEUE_SIZE.labels(intake_key=self.connector.configuration.intake_key).set(self.events_queue.qsize())
+        return batch
+
+    def push(self, events: list[str]) -> bool:
+        """
+        Push the events to the intake, retrying until it succeeds or the forwarder is stopped
+        """
+        attempt = 0
+        while self.running:
+            try:
+                start = time.monotonic()
+                self.connector.push_events_to_intakes(events=events)
+                PUSH_DURATION.labels(intake_key=self.connector.configuration.intake_key).observe(
+                    time.monotonic() - start
+                )
+                return True
+            except Exception as error:
+                delay = min(2**attempt, MAX_PUSH_RETRY_DELAY)
+                self.log_exception(error, message=f"Failed to forward events, retrying in {delay} seconds")
+                self._stop_event.wait(delay)
+                attempt += 1
+
+        return False
+
+    def forward(self, batch: list[StreamEvent]) -> None:
+        """
+        Forward the batch of events to the intake and commit the offsets of their streams
+        """
+        events = [stream_event.event for stream_event in batch]
+        offsets_per_stream: dict[str, list[int]] = defaultdict(list)
+        last_creation_time_per_stream: dict[str, int | None] = {}
+
+        for stream_event in batch:
+            last_creation_time_per_stream[stream_event.stream_root_url] = stream_event.creation_time
+            if stream_event.offset is not None:
+                offsets_per_stream[stream_event.stream_root_url].append(stream_event.offset)
+
+        self.log(
+            message=f"Forward {len(events)} events to the intake",
+            level="info",
+        )
+        if not self.push(events):
+            # the forwarder was stopped: the offsets are not committed and the events will be read again
+            return
+
+        OUTCOMING_EVENTS.labels(intake_key=self.connector.configuration.intake_key).inc(len(events))
+
+        # store the offsets for each stream
+        self.connector.stream_offsets.acknowledge(offsets_per_stream)
+
+        now = time.time()
+        for stream_root_url, creation_time in last_creation_time_per_stream.items():
+            if creation_time:
+                lag = now - (creation_time / 1000)
+                EVENTS_LAG.labels(intake_key=self.connector.configuration.intake_key, stream=stream_root_url).set(lag)
+
     def run(self) -> None:
         """
         Forward the queue to the intake
@@ -461,50 +981,7 @@ class EventForwarder(threading.Thread):
 
         while self.running:
             try:
-                (stream_root_url, event) = self.events_queue.get(block=True, timeout=5)
-                batch_of_events = [event]
-                last_event_per_stream: dict[str, str] = {stream_root_url: event}
-
-                try:
-                    while len(batch_of_events) < MAX_EVENTS_PER_BATCH:
-                        (stream_root_url, event) = self.events_queue.get(block=True, timeout=0.5)
-                        last_event_per_stream[stream_root_url] = event
-                        batch_of_events.append(event)
-
-                except queue.Empty:
-                    pass
-
-                if batch_of_events:
-                    self.log(
-                        message=f"Forward {len(batch_of_events)} events to the intake",
-                        level="info",
-                    )
-                    OUTCOMING_EVENTS.labels(intake_key=self.connector.configuration.intake_key).inc(
-                        len(batch_of_events)
-                    )
-                    self.connector.push_events_to_intakes(events=batch_of_events)
-
-                    now = time.time()
-
-                    # store the last offset for each stream
-                    with PersistentJSON("cache.json", self.connector._data_path) as cache:
-                        for (
-                            stream_root_url,
-                            last_event,
-                        ) in last_event_per_stream.items():
-                            metadata = orjson.loads(last_event).get("metadata", {})
-
-                            last_event_offset = metadata.get("offset")
-                            if last_event_offset:
-                                # update the offset in the cache file
-                                cache[stream_root_url] = last_event_offset
-
-                            creation_time = metadata.get("eventCreationTime")
-                            if creation_time:
-                                lag = now - (creation_time / 1000)
-                                EVENTS_LAG.labels(
-                                    intake_key=self.connector.configuration.intake_key, stream=stream_root_url
-                                ).set(lag)
+                self.forward(self.next_batch())
             except queue.Empty:
                 pass
             except Exception as error:
@@ -525,7 +1002,17 @@ class EventStreamTrigger(Connector):
 
         self.auth_token = None
 
-        self.events_queue: queue.SimpleQueue = queue.SimpleQueue()
+        # the queue is bounded to apply backpressure on the stream readers when the intake slows down
+        self.events_queue_size = int(os.getenv("CROWDSTRIKE_EVENTS_QUEUE_SIZE", 10 * MAX_EVENTS_PER_BATCH))
+        self.events_queue: queue.Queue = queue.Queue(maxsize=self.events_queue_size)
+        self.nb_forwarders = max(int(os.getenv("CROWDSTRIKE_EVENT_FORWARDERS", 4)), 1)
+        self.stream_offsets = StreamOffsets(self._data_path)
+
+        # the verticles of the detections are collected by a pool of workers, out of the stream readers
+        self.enrichment_queue: queue.Queue = queue.Queue(maxsize=MAX_DETECTIONS_PER_ENRICHMENT * 10)
+        self.nb_enrichment_workers = max(int(os.getenv("CROWDSTRIKE_ENRICHMENT_WORKERS", 4)), 1)
+        self.verticles_cache_size = int(os.getenv("CROWDSTRIKE_VERTICLES_CACHE_SIZE", 10000))
+        self.verticles_cache_ttl = int(os.getenv("CROWDSTRIKE_VERTICLES_CACHE_TTL", 600))
         self.f_stop = threading.Event()
 
         self._network_sleep_on_retry = 60
@@ -564,7 +1051,9 @@ class EventStreamTrigger(Connector):
     @cached_property
     def verticles_collector(self) -> VerticlesCollector | None:
         try:
-            verticles_collector = VerticlesCollector(self, self.client)
+            verticles_collector = VerticlesCollector(
+                self, self.client, cache_size=self.verticles_cache_size, cache_ttl=self.verticles_cache_ttl
+            )
             return verticles_collector
         except HTTPError as error:
             if error.response.status_code == 403:
@@ -599,8 +1088,7 @@ class EventStreamTrigger(Connector):
 
         for stream_root_url, stream_info in streams.items():
             # read the stream offset
-            with PersistentJSON("cache.json", self._data_path) as cache:
-                stream_offset = cache.get(stream_root_url, 0)
+            stream_offset = self.stream_offsets.get(stream_root_url)
 
             stream_threads[stream_root_url] = EventStreamReader(
                 self,
@@ -629,9 +1117,9 @@ class EventStreamTrigger(Connector):
             streams = self.get_streams(app_id)
             for stream_root_url, stream_info in streams.items():
                 if stream_root_url not in stream_threads or not stream_threads[stream_root_url].is_alive():
-                    # read the stream offset
-                    with PersistentJSON("cache.json", self._data_path) as cache:
-                        stream_offset = cache.get(stream_root_url, 0)
+                    # restart from the committed offset, the events read after it will be read again
+                    self.stream_offsets.reset(stream_root_url)
+                    stream_offset = self.stream_offsets.get(stream_root_url)
 
                     stream_threads[stream_root_url] = EventStreamReader(
                         self,
@@ -649,31 +1137,75 @@ class EventStreamTrigger(Connector):
             if stream_thread.is_alive():
                 stream_thread.stop()
 
+    def start_forwarders(self) -> list[EventForwarder]:
+        forwarders = [EventForwarder(self) for _ in range(self.nb_forwarders)]
+        for forwarder in forwarders:
+            forwarder.start()
+
+        return forwarders
+
+    def supervise_forwarders(self, forwarders: list[EventForwarder]):
+        # if a forwarder is down, we spawn a new one
+        for index, forwarder in enumerate(forwarders):
+            if not forwarder.is_alive():
+                self.log(message="Event forwarder failed", level="error")
+                forwarders[index] = EventForwarder(self)
+                forwarders[index].start()
+
+        EVENTS_QUEUE_SIZE.labels(intake_key=self.configuration.intake_key).set(self.events_queue.qsize())
+
+    def stop_forwarders(self, forwarders: list[EventForwarder]):
+        for forwarder in forwarders:
+            forwarder.stop()
+
+    def start_enrichment_workers(self) -> list[VerticlesEnrichmentWorker]:
+        if self.verticles_collector is None:
+            return []
+
+        workers = [
+            VerticlesEnrichmentWorker(self, self.verticles_collector) for _ in range(self.nb_enrichment_workers)
+        ]
+        for worker in workers:
+            worker.start()
+
+        return workers
+
+    def supervise_enrichment_workers(self, workers: list[VerticlesEnrichmentWorker]):
+        # if an enrichment worker is down, we spawn a new one
+        for index, worker in enumerate(workers):
+            if not worker.is_alive():
+                self.log(message="Enrichment worker failed", level="error")
+                workers[index] = VerticlesEnrichmentWorker(self, worker.verticles_collector)
+                workers[index].start()
+
+    def stop_enrichment_workers(self, workers: list[VerticlesEnrichmentWorker]):
+        for worker in workers:
+            worker.stop()
+
     def run(self):
         try:
             app_id: str = self.generate_app_id()
             streams: dict[str, dict] = self.get_streams(app_id)
 
-            # start a thread to consume the internal event queue
-            read_queue_thread = EventForwarder(self)
-            read_queue_thread.start()
+            # start threads to consume the internal event queue
+            forwarders = self.start_forwarders()
+
+            # start threads to collect the verticles of the detections
+            enrichment_workers = self.start_enrichment_workers()
 
             # start threads to consume streams
             stream_threads = self.start_streams(streams, app_id)
 
             try:
                 while self.running:
-                    # if the read queue thread is down, we spawn a new one
-                    if not read_queue_thread.is_alive():
-                        self.log(message="Event forwarder failed", level="error")
-                        read_queue_thread = EventForwarder(self)
-                        read_queue_thread.start()
-
+                    self.supervise_forwarders(forwarders)
+                    self.supervise_enrichment_workers(enrichment_workers)
                     self.supervise_streams(streams, stream_threads)
                     time.sleep(5)
             finally:
                 self.stop_streams(stream_threads)
-                read_queue_thread.stop()
+                self.stop_enrichment_workers(enrichment_workers)
+                self.stop_forwarders(forwarders)
 
         except HTTPError as error:
             if error.response is not None and error.response.status_code == 429:
@@ -1,5 +1,8 @@
-from collections import defaultdict, namedtuple
+import threading
+import time
+from collections import OrderedDict, defaultdict, namedtuple
 from collections.abc import Generator, Iterator
+from typing import Any
 
 import six
 from stix2patterns.pattern import Pattern
@@ -21,6 +24,50 @@ class VerticleID(namedtuple("VerticleId", ["type", "device_id", "object_id"])):
         return cls._make(parts)
 
 
+class TTLCache:
+    """
+    A thread-safe cache whose entries expire after a time-to-live.
+
+    When the cache is full, the least recently stored entries are evicted.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """
+        Return the value of the key if present and not expired, the default value otherwise
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+
+            return value
+
+    def set(self, key: Any, value: Any) -> None:
+        """
+        Store the value of the key for the time-to-live of the cache
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
 def get_extended_verticle_type(verticle_id_str: str | None) -> str | None:
     """
     Return the extended verticle type
@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Gauge
+from prometheus_client import Counter, Gauge, Histogram
 
 # Declare prometheus metrics
 prom_namespace_crowdstrike = "symphony_module_crowdstrike"
@@ -17,6 +17,27 @@ INCOMING_VERTICLES = Counter(
     labelnames=["intake_key"],
 )
 
+EVENTS_QUEUE_SIZE = Gauge(
+    name="events_queue_size",
+    documentation="Number of events waiting in the internal queue to be forwarded",
+    namespace=prom_namespace_crowdstrike,
+    labelnames=["intake_key"],
+)
+
+PUSH_DURATION = Histogram(
+    name="push_events_duration",
+    documentation="Time spent, in seconds, pushing a batch of events to the intake",
+    namespace=prom_namespace_crowdstrike,
+    labelnames=["intake_key"],
+)
+
+ENRICHMENT_DURATION = Histogram(
+    name="detection_enrichment_duration",
+    documentation="Time, in seconds, from the reading of a detection to the collection of its verticles",
+    namespace=prom_namespace_crowdstrike,
+    labelnames=["intake_key"],
+)
+
 # Declare common prometheus metrics
 prom_namespace = "symphony_module_common"
 
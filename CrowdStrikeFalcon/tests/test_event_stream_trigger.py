@@ -12,10 +12,14 @@ from requests.exceptions import HTTPError
 from crowdstrike_falcon import CrowdStrikeFalconModule
 from crowdstrike_falcon.client import CrowdstrikeFalconClient
 from crowdstrike_falcon.event_stream_trigger import (
+    EnrichmentRequest,
     EventForwarder,
     EventStreamReader,
     EventStreamTrigger,
+    StreamEvent,
+    StreamOffsets,
     VerticlesCollector,
+    VerticlesEnrichmentWorker,
 )
 
 
@@ -39,7 +43,7 @@ def trigger(symphony_storage):
 
 
 def test_read_queue(trigger):
-    trigger.events_queue.put(("fake-stream-url", '{"metadata": {"offset": 10}, "foo": "bar"}'))
+    trigger.events_queue.put(StreamEvent("fake-stream-url", '{"metadata": {"offset": 10}, "foo": "bar"}', 10))
 
     trigger.push_events_to_intakes = MagicMock()
     t = EventForwarder(trigger)
@@ -53,6 +57,85 @@ def test_read_queue(trigger):
     assert len(trigger.push_events_to_intakes.call_args.kwargs["events"]) == 1
 
 
+def test_forward_commits_offsets_after_push(trigger, symphony_storage):
+    stream_root_url = "fake-stream-url"
+    for offset in (10, 11):
+        trigger.stream_offsets.track(stream_root_url, offset)
+
+    trigger.push_events_to_intakes = MagicMock(side_effect=[Exception("intake unavailable"), None])
+    forwarder = EventForwarder(trigger)
+    forwarder._stop_event.wait = MagicMock()
+    forwarder.forward(
+        [
+            StreamEvent(stream_root_url, '{"metadata": {"offset": 10}, "foo": "bar"}', 10),
+            StreamEvent(stream_root_url, '{"metadata": {"offset": 11}, "foo": "baz"}', 11),
+        ]
+    )
+
+    assert trigger.push_events_to_intakes.call_count == 2
+    assert trigger.stream_offsets.get(stream_root_url) == 11
+
+
+def test_stream_offsets_wait_for_pending_events(symphony_storage):
+    offsets = StreamOffsets(symphony_storage)
+    for offset in (1, 2, 3):
+        offsets.track("stream", offset)
+
+    # events forwarded out of order don't advance the offset past a pending event
+    offsets.acknowledge({"stream": [2, 3]})
+    assert offsets.get("stream") == 0
+
+    offsets.acknowledge({"stream": [1]})
+    assert offsets.get("stream") == 3
+
+    # untracked offsets are ignored
+    offsets.acknowledge({"other-stream": [42]})
+    assert offsets.get("other-stream") == 0
+
+
+def test_stream_offsets_held_until_acknowledged(symphony_storage):
+    offsets = StreamOffsets(symphony_storage)
+    offsets.track("stream", 1)
+    offsets.hold("stream", 1, 2)
+    offsets.track("stream", 2)
+
+    # the offset is released once each hold is acknowledged
+    offsets.acknowledge({"stream": [1, 2]})
+    assert offsets.get("stream") == 0
+
+    offsets.acknowledge({"stream": [1, 1]})
+    assert offsets.get("stream") == 2
+
+
+def test_read_stream_blocks_when_queue_is_full(trigger):
+    trigger.events_queue = queue.Queue(maxsize=1)
+    client_mock = MagicMock()
+    client_mock.get.return_value.__enter__.return_value.status_code = 200
+    client_mock.get.return_value.__enter__.return_value.iter_lines.return_value = [
+        b'{"metadata": {"offset": 1}}',
+        b'{"metadata": {"offset": 2}}',
+    ]
+    reader = EventStreamReader(
+        trigger,
+        "fake-stream-url",
+        {
+            "dataFeedURL": "fake-stream-url?appId=sio-00000",
+            "refreshActiveSessionInterval": 1800,
+            "sessionToken": {"token": "my_token=="},
+        },
+        "sio-00000",
+        0,
+        client_mock,
+    )
+
+    reader.start()
+    time.sleep(1)
+    reader.stop()
+    reader.join()
+
+    assert trigger.events_queue.qsize() == 1
+
+
 def test_get_streams(trigger):
     with requests_mock.Mocker() as mock:
         mock.register_uri(
@@ -205,9 +288,11 @@ def test_read_stream(trigger):
     reader.join()
 
     assert trigger.events_queue.qsize() > 1
-    assert trigger.events_queue.get() == (
+    assert trigger.events_queue.get() == StreamEvent(
         "https://firehose.eu-1.crowdstrike.com/sensors/entities/datafeed/v1/0",
         orjson.dumps(fake_event).decode(),
+        fake_event["metadata"]["offset"],
+        fake_event["metadata"]["eventCreationTime"],
     )
 
 
@@ -262,11 +347,18 @@ def test_read_stream_call_verticles_collector(trigger):
     reader.join()
 
     assert trigger.events_queue.qsize() > 1
-    assert trigger.events_queue.get() == (
+    assert trigger.events_queue.get() == StreamEvent(
         "https://firehose.eu-1.crowdstrike.com/sensors/entities/datafeed/v1/0",
         orjson.dumps(fake_event).decode(),
+        fake_event["metadata"]["offset"],
+        fake_event["metadata"]["eventCreationTime"],
     )
-    verticles_collector.collect_verticles_from_detection.assert_called_with(detection_id)
+    verticles_collector.collect_verticles_from_detection.assert_not_called()
+
+    # the verticles are collected by the enrichment workers
+    request = trigger.enrichment_queue.get_nowait()
+    assert request.kind == "detection"
+    assert request.identifier == detection_id
 
 
 def test_read_stream_fails_on_stream_error(trigger):
@@ -757,25 +849,17 @@ def test_verticle_collector_collect_verticles_from_graph_ids(verticles_collector
             },
         )
 
+        # the details of the verticles of all the graph ids are requested at once
         mock.register_uri(
             "GET",
             "https://my.fake.sekoia/threatgraph/entities/processes/v1?scope=device&"
             "ids=pid:835449907c99453085a924a16e967be5:6494700150&"
-            "ids=pid:835449907c99453085a924a16e967be5:6492874271",
-            json={
-                "errors": [],
-                "meta": {},
-                "resources": verticles1,
-            },
-        )
-
-        mock.register_uri(
-            "GET",
-            "https://my.fake.sekoia/threatgraph/entities/processes/v1?scope=device&ids=pid:835449907c99453085a924a16e967be5:6463227462",  # noqa: E501
+            "ids=pid:835449907c99453085a924a16e967be5:6492874271&"
+            "ids=pid:835449907c99453085a924a16e967be5:6463227462",
             json={
                 "errors": [],
                 "meta": {},
-                "resources": verticles2,
+                "resources": verticles,
             },
         )
 
@@ -784,6 +868,118 @@ def test_verticle_collector_collect_verticles_from_graph_ids(verticles_collector
         assert vertex_ids == {vertex["id"] for vertex in verticles}
 
 
+def test_enrichment_worker_batches_detections(trigger):
+    vertex = {"id": "pid:835449907c99453085a924a16e967be5:6494700150"}
+    verticles_collector = MagicMock()
+    verticles_collector.collect_verticles_from_detections.return_value = {
+        "ldt:1": [("pid:835449907c99453085a924a16e967be5:8322695771", "child_process", vertex)],
+    }
+    worker = VerticlesEnrichmentWorker(trigger, verticles_collector)
+    batch = [
+        EnrichmentRequest("fake-stream-url", "detection", "ldt:1", "Critical", 5, time.monotonic()),
+        EnrichmentRequest("fake-stream-url", "detection", "ldt:2", "Low", 1, time.monotonic()),
+    ]
+
+    worker.enrich(batch)
+
+    verticles_collector.collect_verticles_from_detections.assert_called_once_with(["ldt:1", "ldt:2"])
+    verticles_collector.collect_verticles_from_alerts.assert_not_called()
+    stream_root_url, event, _, _ = trigger.events_queue.get_nowait()
+    assert stream_root_url == "fake-stream-url"
+    assert orjson.loads(event)["metadata"]["detectionIdString"] == "ldt:1"
+    assert orjson.loads(event)["event"] == vertex
+    assert trigger.events_queue.qsize() == 0
+
+
+def test_enrichment_worker_holds_the_detection_offset(trigger):
+    stream_root_url = "fake-stream-url"
+    trigger.stream_offsets.track(stream_root_url, 10)
+    request = EnrichmentRequest(stream_root_url, "detection", "ldt:1", "Critical", 5, time.monotonic(), 10)
+    trigger.stream_offsets.hold(stream_root_url, 10)
+
+    worker = VerticlesEnrichmentWorker(trigger, MagicMock())
+    worker.forward_verticles(
+        request, [("pid:1", "child_process", {"id": "pid:2"}), ("pid:1", "child_process", {"id": "pid:3"})]
+    )
+    verticles_events = [trigger.events_queue.get_nowait() for _ in range(2)]
+    assert {stream_event.offset for stream_event in verticles_events} == {10}
+
+    # the detection is forwarded before its verticles
+    trigger.stream_offsets.acknowledge({stream_root_url: [10]})
+    assert trigger.stream_offsets.get(stream_root_url) == 0
+
+    trigger.stream_offsets.acknowledge({stream_root_url: [stream_event.offset for stream_event in verticles_events]})
+    assert trigger.stream_offsets.get(stream_root_url) == 10
+
+
+def test_enrichment_worker_releases_the_offset_without_verticles(trigger):
+    stream_root_url = "fake-stream-url"
+    trigger.stream_offsets.track(stream_root_url, 10)
+    trigger.stream_offsets.hold(stream_root_url, 10)
+    request = EnrichmentRequest(stream_root_url, "detection", "ldt:1", "Critical", 5, time.monotonic(), 10)
+
+    worker = VerticlesEnrichmentWorker(trigger, MagicMock())
+    worker.forward_verticles(request, [])
+    trigger.stream_offsets.acknowledge({stream_root_url: [10]})
+
+    assert trigger.events_queue.qsize() == 0
+    assert trigger.stream_offsets.get(stream_root_url) == 10
+
+
+def test_verticle_collector_isolates_detection_failures(verticles_collector):
+    response = Mock()
+    response.status_code = 500
+    error = HTTPError(response=response)
+
+    def get_detection_details(detection_ids):
+        if detection_ids != ["ldt:2"]:
+            raise error
+
+        # the identifier of the details differs from the one of the stream
+        yield {
+            "detection_id": "ldt:other",
+            "behaviors": [{"triggering_process_graph_id": "pid:835449907c99453085a924a16e967be5:1"}],
+        }
+
+    verticles_collector.log_exception = MagicMock()
+    verticles_collector.edge_types = {"child_process"}
+    verticles_collector.falcon_client = MagicMock()
+    verticles_collector.falcon_client.get_detection_details.side_effect = get_detection_details
+    verticles_collector.falcon_client.list_edges.return_value = [
+        {
+            "edge_type": "child_process",
+            "id": "pid:835449907c99453085a924a16e967be5:2",
+            "source_vertex_id": "pid:835449907c99453085a924a16e967be5:0",
+        }
+    ]
+    verticles_collector.falcon_client.get_verticles_details.return_value = [
+        {"id": "pid:835449907c99453085a924a16e967be5:2"}
+    ]
+
+    verticles = verticles_collector.collect_verticles_from_detections(["ldt:1", "ldt:2"])
+
+    # the verticles are mapped to the requested detection, through the explored graph id
+    assert verticles == {
+        "ldt:2": [
+            (
+                "pid:835449907c99453085a924a16e967be5:0",
+                "child_process",
+                {"id": "pid:835449907c99453085a924a16e967be5:2"},
+            )
+        ]
+    }
+
+
+def test_verticle_collector_get_verticles_details_from_cache(verticles_collector):
+    vertex = {"id": "pid:835449907c99453085a924a16e967be5:6494700150"}
+    verticles_collector.falcon_client = MagicMock()
+    verticles_collector.falcon_client.get_verticles_details.return_value = [vertex]
+
+    assert verticles_collector.get_verticles_details([vertex["id"]], "processes") == {vertex["id"]: vertex}
+    assert verticles_collector.get_verticles_details([vertex["id"]], "processes") == {vertex["id"]: vertex}
+    verticles_collector.falcon_client.get_verticles_details.assert_called_once_with([vertex["id"]], "processes")
+
+
 def test_read_stream_with_verticles(trigger):
     detection_id = "ldt:aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa:11111111111"
 
@@ -979,21 +1175,12 @@ def test_read_stream_with_verticles(trigger):
             "GET",
             "https://my.fake.sekoia/threatgraph/entities/processes/v1?scope=device&"
             f"ids={verticle1['id']}&"
-            f"ids={verticle2['id']}",
-            json={
-                "errors": [],
-                "meta": {},
-                "resources": [verticle1, verticle2],
-            },
-        )
-
-        mock.register_uri(
-            "GET",
-            f"https://my.fake.sekoia/threatgraph/entities/processes/v1?scope=device&ids={verticle3['id']}",
+            f"ids={verticle2['id']}&"
+            f"ids={verticle3['id']}",
             json={
                 "errors": [],
                 "meta": {},
-                "resources": [verticle3],
+                "resources": [verticle1, verticle2, verticle3],
             },
         )
 
@@ -1013,12 +1200,19 @@ def test_read_stream_with_verticles(trigger):
             trigger.verticles_collector,
         )
 
+        worker = VerticlesEnrichmentWorker(trigger, trigger.verticles_collector)
+        worker.start()
         reader.start()
 
         time.sleep(1)
         reader.stop()
         reader.join()
 
+        # wait for the verticles to be collected
+        trigger.enrichment_queue.join()
+        worker.stop()
+        worker.join()
+
         expected_verticles = [
             {
                 "metadata": {
@@ -1072,7 +1266,7 @@ def test_read_stream_with_verticles(trigger):
         actual_events = set()
         try:
             while (msg := trigger.events_queue.get(timeout=1)) is not None:
-                actual_events.add(msg[1])
+                actual_events.add(msg.event)
         except queue.Empty:
             pass
 
@@ -1279,21 +1473,12 @@ def test_read_stream_with_verticles_with_alert(trigger):
             "GET",
             "https://my.fake.sekoia/threatgraph/entities/processes/v1?scope=device&"
             f"ids={verticle1['id']}&"
-            f"ids={verticle2['id']}",
-            json={
-                "errors": [],
-                "meta": {},
-                "resources": [verticle1, verticle2],
-            },
-        )
-
-        mock.register_uri(
-            "GET",
-            f"https://my.fake.sekoia/threatgraph/entities/processes/v1?scope=device&ids={verticle3['id']}",
+            f"ids={verticle2['id']}&"
+            f"ids={verticle3['id']}",
             json={
                 "errors": [],
                 "meta": {},
-                "resources": [verticle3],
+                "resources": [verticle1, verticle2, verticle3],
             },
         )
 
@@ -1313,12 +1498,19 @@ def test_read_stream_with_verticles_with_alert(trigger):
             trigger.verticles_collector,
         )
 
+        worker = VerticlesEnrichmentWorker(trigger, trigger.verticles_collector)
+        worker.start()
         reader.start()
 
         time.sleep(1)
         reader.stop()
         reader.join()
 
+        # wait for the verticles to be collected
+        trigger.enrichment_queue.join()
+        worker.stop()
+        worker.join()
+
         expected_verticles = [
             {
                 "metadata": {
@@ -1372,7 +1564,7 @@ def test_read_stream_with_verticles_with_alert(trigger):
         actual_events = set()
         try:
             while (msg := trigger.events_queue.get(timeout=1)) is not None:
-                actual_events.add(msg[1])
+                actual_events.add(msg.event)
         except queue.Empty:
             pass
 
@@ -1,6 +1,9 @@
+from unittest.mock import patch
+
 import pytest
 
 from crowdstrike_falcon.helpers import (
+    TTLCache,
     VerticleID,
     compute_refresh_interval,
     get_detection_id,
@@ -112,3 +115,20 @@ def test_get_detection_id():
 @pytest.mark.parametrize("interval,expected_result", [(1800, 1500), (60, 50), (30, 30), (3600, 3300)])
 def test_compute_refresh_interval(interval, expected_result):
     assert compute_refresh_interval(interval) == expected_result
+
+
+def test_ttl_cache():
+    cache = TTLCache(maxsize=2, ttl=60)
+    with patch("crowdstrike_falcon.helpers.time.monotonic", return_value=1000):
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.set("c", 3)
+
+        # the oldest entry is evicted when the cache is full
+        assert len(cache) == 2
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+
+    # entries expire after the time-to-live
+    with patch("crowdstrike_falcon.helpers.time.monotonic", return_value=1061):
+        assert cache.get("c", "expired") == "expired"
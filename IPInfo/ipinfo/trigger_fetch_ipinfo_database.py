@@ -1,23 +1,33 @@
+import heapq
 import ipaddress
 import json
+import tempfile
 import time
 import gzip
 import logging
 import uuid
+import zlib
+from contextlib import ExitStack
 from datetime import datetime, timedelta
 from functools import cached_property
-from io import BytesIO
 from ipaddress import IPv6Network, IPv4Network
-from typing import Iterator
+from pathlib import Path
+from typing import Iterable, Iterator
 from iso3166 import countries
 
+import orjson
 import requests
 from sekoia_automation.storage import write
 from sekoia_automation.trigger import Trigger
 
 
 class TriggerFetchIPInfoDatabase(Trigger):
-    MAX_HOUR_TAG_VALID_FOR: int = 3 * 24  # Tags are valid for 3 days
+    MAX_HOUR_TAG_VALID_FOR: int = 30 * 24  # Tags are valid for 30 days
+    SNAPSHOT_FILE_NAME: str = "ipinfo_snapshot.tsv.gz"
+    # Number of rows sorted in memory at once, before being merged from disk
+    SORT_RUN_SIZE: int = 100000
+    # Namespace of the deterministic identifiers of the observables
+    ID_NAMESPACE: uuid.UUID = uuid.UUID("1e9f6197-b3a0-4665-88e7-767929d013a4")
 
     @cached_property
     def api_token(self):
@@ -28,7 +38,7 @@ class TriggerFetchIPInfoDatabase(Trigger):
         if valid_for := self.configuration.get("tags_valid_for"):
             return valid_for
         return min(
-            self.MAX_HOUR_TAG_VALID_FOR, self.configuration.get("interval", 24) * 3
+            self.MAX_HOUR_TAG_VALID_FOR, self.configuration.get("interval", 24) * 30
         )
 
     @property
@@ -52,6 +62,74 @@ class TriggerFetchIPInfoDatabase(Trigger):
     def datetime_to_str(date: datetime) -> str:
         return date.strftime("%Y-%m-%dT%H:%M:%SZ")
 
+    def _deterministic_id(self, object_type: str, name: str) -> str:
+        return f"{object_type}--{uuid.uuid5(self.ID_NAMESPACE, name)}"
+
+    @property
+    def snapshot_path(self) -> Path:
+        return Path(self.data_path).joinpath(self.SNAPSHOT_FILE_NAME)
+
+    @property
+    def pending_snapshot_path(self) -> Path:
+        return self.snapshot_path.with_suffix(".tmp")
+
+    def iter_snapshot(self) -> Iterator[tuple[bytes, bytes, float]]:
+        """
+        Iterate over the ranges published by the previous runs, with their state
+        and the date of their last publication, sorted by range
+        """
+        if not self.snapshot_path.exists():
+            return
+
+        try:
+            with gzip.open(self.snapshot_path, mode="rb") as fp:
+                for entry in fp:
+                    ip_range, state, published_at = entry.rstrip(b"\n").split(b"\t")
+                    yield ip_range, state, float(published_at)
+        except Exception:
+            # the ranges left are considered as new ones and published again
+            self.log(
+                message="Failed to load the snapshot of the database", level="warning"
+            )
+
+    def commit_snapshot(self) -> None:
+        """
+        Replace the snapshot of the previous run with the one of this run
+        """
+        if self.pending_snapshot_path.exists():
+            self.pending_snapshot_path.replace(self.snapshot_path)
+
+    @property
+    def tags_lifetime(self) -> float:
+        """
+        Time, in seconds, after which a published range must be published again,
+        before its tags expire
+        """
+        return self.tags_valid_for * 3600 - self.interval
+
+    def _spread_publication(self, ip_range: bytes, published_at: float) -> float:
+        """
+        Backdate the publication of a range by a share of the tags lifetime,
+        derived from the range, so the ranges published at once
+        are published again over the next runs instead of all at the same run
+        """
+        share = zlib.crc32(ip_range) / 2**32
+        return published_at - share * max(self.tags_lifetime, 0)
+
+    @staticmethod
+    def _get_range_state(data: dict) -> tuple[str, str] | None:
+        """
+        Return the compact representation of a row: the range and its ASN and country
+        """
+        try:
+            asn, country = data["asn"], data["country"]
+            if asn == "" or country == "":
+                return None
+
+            return f"{data['start_ip']}-{data['end_ip']}", f"{asn}:{country}"
+        except Exception:
+            return None
+
     def run(self):
         """
         Entrypoint of the trigger
@@ -71,6 +149,7 @@ class TriggerFetchIPInfoDatabase(Trigger):
         and create events in chunks to forward its content
         """
         chunks = 0
+        self.pending_snapshot_path.unlink(missing_ok=True)
         for location_chunk_info in self.build_chunks(
             generator=self.get_ipinfo_database(),
             chunk_size=self.configuration.get("chunk_size", 10000),
@@ -79,15 +158,32 @@ class TriggerFetchIPInfoDatabase(Trigger):
             chunks += 1
         self.log(f"Sent {chunks} chunk events to the API")
 
+        # the snapshot is replaced once all the changes were sent
+        self.commit_snapshot()
+
     def get_ipinfo_database(self) -> Iterator[list]:
         """
         Downloads the ipinfo.io database in json format
+
+        The database is decompressed and parsed while it is downloaded.
+        Only the ranges added, changed or removed since the previous run are yielded,
+        unless the tags of the published ranges are about to expire.
         """
-        response = requests.get(self.database_url, stream=True)
-        if not response.ok:
-            logging.error(f"Server answered with {response.status_code}")
-            return
+        with requests.get(self.database_url, stream=True) as response:
+            if not response.ok:
+                logging.error(f"Server answered with {response.status_code}")
+                return
+
+            yield from self._parse_database(response.raw)
 
+    def _parse_database(self, stream) -> Iterator[list]:
+        """
+        Parses the compressed database, row by row
+
+        The rows are sorted by range on disk, by runs of `SORT_RUN_SIZE` rows,
+        and merged with the snapshot of the previous run, also sorted by range,
+        in a single pass: the databases are never held in memory.
+        """
         # Establish validity timeframe for produced observables
         # The tags are valid for 10 days
         now: datetime = datetime.utcnow()
@@ -97,11 +193,131 @@ class TriggerFetchIPInfoDatabase(Trigger):
         )
         asn_cache: dict[int, dict] = dict()
 
-        with gzip.open(BytesIO(response.content), mode="r") as gz:
-            for row in gz.readlines():
-                yield from self._parse_db_row(
-                    row, tag_valid_from, tag_valid_until, asn_cache
+        with tempfile.TemporaryDirectory(dir=self.data_path) as directory:
+            runs: list[Path] = []
+            entries: list[bytes] = []
+            for data in self._iter_rows(stream):
+                range_state = self._get_range_state(data)
+                if range_state is None:
+                    # not routed or invalid row, there is nothing to compare
+                    yield from self._parse_db_entry(
+                        data, tag_valid_from, tag_valid_until, asn_cache
+                    )
+                    continue
+
+                ip_range, state = range_state
+                entries.append(
+                    f"{ip_range}\t{state}\t".encode() + orjson.dumps(data) + b"\n"
+                )
+                if len(entries) >= self.SORT_RUN_SIZE:
+                    runs.append(self._write_sorted_run(Path(directory), entries))
+                    entries = []
+
+            if entries:
+                runs.append(self._write_sorted_run(Path(directory), entries))
+                entries = []
+
+            with ExitStack() as stack:
+                sorted_entries = heapq.merge(
+                    *(stack.enter_context(run.open("rb")) for run in runs)
+                )
+                snapshot = stack.enter_context(
+                    gzip.open(self.pending_snapshot_path, mode="wb")
+                )
+
+                yield from self._diff_ranges(
+                    sorted_entries,
+                    snapshot,
+                    tag_valid_from,
+                    tag_valid_until,
+                    asn_cache,
+                )
+
+    def _iter_rows(self, stream) -> Iterator[dict]:
+        """
+        Decompresses and parses the rows of the database
+        """
+        with gzip.open(stream, mode="r") as gz:
+            for row in gz:
+                try:
+                    yield orjson.loads(row)
+                except ValueError:
+                    self.log(
+                        message=f"Found an invalid row: {row.decode()}", level="error"
+                    )
+
+    @staticmethod
+    def _write_sorted_run(directory: Path, entries: list[bytes]) -> Path:
+        """
+        Sorts the entries and writes them in a new file of the directory
+        """
+        entries.sort()
+        run_path = directory.joinpath(f"run-{uuid.uuid4()}")
+        with run_path.open("wb") as fp:
+            fp.writelines(entries)
+
+        return run_path
+
+    def _diff_ranges(
+        self,
+        entries: Iterable[bytes],
+        snapshot: gzip.GzipFile,
+        tag_valid_from: str,
+        tag_valid_until: str,
+        asn_cache: dict[int, dict],
+    ) -> Iterator[list]:
+        """
+        Compares the ranges of the database with the ones of the previous run,
+        both sorted by range, and yields the observables of the changes.
+
+        The ranges of the database are written in the new snapshot as they are read,
+        with the date of their last publication. The unchanged ranges are published
+        again once their tags are about to expire.
+        """
+        now = time.time()
+        previous_ranges = self.iter_snapshot()
+        previous = next(previous_ranges, None)
+        last_range: bytes | None = None
+
+        for entry in entries:
+            ip_range, state, row = entry.rstrip(b"\n").split(b"\t", 2)
+
+            # the ranges only in the previous snapshot were removed from the database
+            while previous is not None and previous[0] < ip_range:
+                yield from self._expire_range(
+                    previous[0].decode(), previous[1].decode(), tag_valid_from
                 )
+                previous = next(previous_ranges, None)
+
+            # new or changed ranges are published, with their next publication spread
+            publish = True
+            published_at = self._spread_publication(ip_range, now)
+            if previous is not None and previous[0] == ip_range:
+                if previous[1] == state:
+                    # unchanged ranges are published again before their tags expire
+                    publish = now - previous[2] >= self.tags_lifetime
+                    published_at = now if publish else previous[2]
+                previous = next(previous_ranges, None)
+
+            if ip_range != last_range:
+                snapshot.write(
+                    ip_range + b"\t" + state + f"\t{published_at}\n".encode()
+                )
+                last_range = ip_range
+
+            if not publish:
+                continue
+
+            yield from self._parse_db_entry(
+                orjson.loads(row), tag_valid_from, tag_valid_until, asn_cache
+            )
+
+        # expire the tags of the ranges removed from the database
+        while previous is not None:
+            yield from self._expire_range(
+                previous[0].decode(), previous[1].decode(), tag_valid_from
+            )
+            previous = next(previous_ranges, None)
 
     @staticmethod
     def build_chunks(
@@ -126,7 +342,7 @@ class TriggerFetchIPInfoDatabase(Trigger):
     ) -> dict:
         asn_cache[asn_number] = {
             "type": "autonomous-system",
-            "id": f"autonomous-system--{str(uuid.uuid4())}",
+            "id": self._deterministic_id("autonomous-system", str(asn_number)),
             "number": asn_number,
             "name": asn_name,
             "x_inthreat_sources_refs": [self.identity["id"]],
@@ -134,7 +350,7 @@ class TriggerFetchIPInfoDatabase(Trigger):
         return asn_cache[asn_number]
 
     def _get_tags(
-        self, country_code: str, tag_valid_from: str, tag_valid_until: str, row: bytes
+        self, country_code: str, tag_valid_from: str, tag_valid_until: str
     ) -> list:
         try:
             # check the country code is valid
@@ -161,8 +377,29 @@ class TriggerFetchIPInfoDatabase(Trigger):
         Parses a database row and yields the extracted observables.
         """
         try:
-            data = json.loads(row.decode("utf-8"))
+            data = orjson.loads(row)
+        except Exception:
+            self.log(
+                message=f"Found an invalid ASN or country code: {row.decode()}",
+                level="error",
+            )
+            return
 
+        yield from self._parse_db_entry(
+            data, tag_valid_from, tag_valid_until, asn_cache
+        )
+
+    def _parse_db_entry(
+        self,
+        data: dict,
+        tag_valid_from: str,
+        tag_valid_until: str,
+        asn_cache: dict[int, dict],
+    ) -> Iterator[list]:
+        """
+        Yields the observables extracted from a parsed database row.
+        """
+        try:
             asn_number = data["asn"]
             asn_name = data["as_name"]
             country_code = data["country"]
@@ -175,7 +412,7 @@ class TriggerFetchIPInfoDatabase(Trigger):
 
         except Exception:
             self.log(
-                message=f"Found an invalid ASN or country code: {row.decode()}",
+                message=f"Found an invalid ASN or country code: {json.dumps(data)}",
                 level="error",
             )
             return
@@ -184,7 +421,7 @@ class TriggerFetchIPInfoDatabase(Trigger):
             # Don't consider not routed IP segment
             return
 
-        tags = self._get_tags(country_code, tag_valid_from, tag_valid_until, row)
+        tags = self._get_tags(country_code, tag_valid_from, tag_valid_until)
         if asn_number in asn_cache:
             autonomous_system = asn_cache[asn_number]
         else:
@@ -222,10 +459,34 @@ class TriggerFetchIPInfoDatabase(Trigger):
             yield result
         except Exception:
             self.log(
-                message=f"Cannot parse provided ip addresses {row.decode()}",
+                message=f"Cannot parse provided ip addresses {json.dumps(data)}",
                 level="error",
             )
 
+    def _expire_range(self, ip_range: str, state: str, now: str) -> Iterator[list]:
+        """
+        Yields the observables of a removed range, with their tags expiring now.
+        """
+        try:
+            start_ip, end_ip = ip_range.split("-", 1)
+            asn, country_code = state.rsplit(":", 1)
+            ip_start = ipaddress.ip_address(start_ip)
+            ip_end = ipaddress.ip_address(end_ip)
+        except ValueError:
+            return
+
+        asn_number = asn[2:] if asn.startswith("AS") else asn
+        tags = self._get_tags(country_code, now, now)
+        tags.append(
+            {"valid_from": now, "valid_until": now, "name": f"asn:{asn_number}"}
+        )
+
+        observable_type = f"ipv{ip_start.version}-addr"
+        yield [
+            self._create_observable(observable_type, network, tags)
+            for network in ipaddress.summarize_address_range(ip_start, ip_end)
+        ]
+
     def _create_observable(
         self,
         observable_type: str,
@@ -234,7 +495,7 @@ class TriggerFetchIPInfoDatabase(Trigger):
     ) -> dict:
         return {
             "type": observable_type,
-            "id": f"{observable_type}--{str(uuid.uuid4())}",
+            "id": self._deterministic_id(observable_type, str(ip_range)),
             "value": str(ip_range),
             "x_inthreat_tags": tags,
             "x_inthreat_sources_refs": [self.identity["id"]],
@@ -244,7 +505,10 @@ class TriggerFetchIPInfoDatabase(Trigger):
         self, observable: dict, autonomous_system: dict
     ) -> dict:
         return {
-            "id": f"observable-relationship--{uuid.uuid4()}",
+            "id": self._deterministic_id(
+                "observable-relationship",
+                f"{observable['id']}:belongs-to:{autonomous_system['id']}",
+            ),
             "type": "observable-relationship",
             "source_ref": observable["id"],
             "target_ref": autonomous_system["id"],
@@ -262,7 +526,9 @@ class TriggerFetchIPInfoDatabase(Trigger):
         location_chunk.append(self.identity)
         chunk_size = len(location_chunk)
         file_path = write(
-            "observables.json", json.dumps(location_chunk), data_path=self.data_path
+            "observables.json",
+            orjson.dumps(location_chunk).decode(),
+            data_path=self.data_path,
         )
         directory = file_path.parent.as_posix()
 
@@ -32,4 +32,6 @@ def config_storage():
 def mocked_uuid(mocker):
     mock_uuid = mocker.patch.object(uuid, "uuid4", autospec=True)
     mock_uuid.return_value = uuid.UUID(hex="00000000000000000000000000000000")
+    mock_uuid5 = mocker.patch.object(uuid, "uuid5", autospec=True)
+    mock_uuid5.return_value = uuid.UUID(hex="00000000000000000000000000000000")
     return mock_uuid
@@ -1,8 +1,10 @@
+import gzip
+import json
 import time
 from signal import SIGINT
 import os
 from threading import Thread
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import pytest
 import requests_mock
@@ -28,6 +30,7 @@ def trigger(symphony_storage, request_mock, config_storage):
     ).write_text("https://callback.url/")
     request_mock.post(trigger.callback_url)
     request_mock.post(trigger.logs_url)
+    trigger.snapshot_path.unlink(missing_ok=True)
     yield trigger
 
 
@@ -52,6 +55,92 @@ def test_get_ipinfo_database(trigger, symphony_storage, request_mock):
         assert "directory" in caller_params
 
 
+def test_get_ipinfo_database_only_yields_changes(trigger, request_mock):
+    trigger.configuration = {"interval": 0, "tags_valid_for": 72}
+    with gzip.open("tests/data/country_asn.json.gz", "rb") as fp:
+        rows = fp.read().splitlines()
+
+    # first run: all the ranges are published
+    request_mock.get(trigger.database_url, content=gzip.compress(b"\n".join(rows)))
+    first_run = [item for items in trigger.get_ipinfo_database() for item in items]
+    trigger.commit_snapshot()
+
+    # second run: the country of a range changed and another range was removed
+    changed = json.loads(rows[1])
+    changed["country"] = "FR"
+    removed = json.loads(rows[2])
+    new_rows = [rows[0], json.dumps(changed).encode(), *rows[3:]]
+    request_mock.get(trigger.database_url, content=gzip.compress(b"\n".join(new_rows)))
+    second_run = [item for items in trigger.get_ipinfo_database() for item in items]
+
+    first_run_ids = {item["id"] for item in first_run}
+    observables = [item for item in second_run if item["type"].endswith("-addr")]
+    assert len(second_run) < len(first_run)
+    # the identifiers are stable between runs
+    assert {item["id"] for item in second_run} <= first_run_ids
+    assert {
+        tag["name"]
+        for observable in observables
+        for tag in observable["x_inthreat_tags"]
+        if tag["name"].startswith("country:")
+    } == {"country:FR", f"country:{removed['country']}"}
+
+
+def test_get_ipinfo_database_spreads_the_publications(trigger, request_mock):
+    trigger.configuration = {"interval": 0, "tags_valid_for": 72}
+    with open("tests/data/country_asn.json.gz", "rb") as fp:
+        request_mock.get(trigger.database_url, content=fp.read())
+
+    def published_ranges() -> list[dict]:
+        return [
+            item
+            for items in trigger.get_ipinfo_database()
+            for item in items
+            if item["type"].endswith("-addr")
+        ]
+
+    first_run = published_ranges()
+    trigger.commit_snapshot()
+
+    # the unchanged ranges are published again over the lifetime of their tags
+    now = time.time()
+    with patch("time.time", return_value=now + trigger.tags_lifetime / 2):
+        second_run = published_ranges()
+        trigger.commit_snapshot()
+    assert 0 < len(second_run) < len(first_run)
+
+    # and all of them before their tags expire
+    with patch("time.time", return_value=now + trigger.tags_lifetime):
+        third_run = published_ranges()
+        trigger.commit_snapshot()
+    assert {item["id"] for item in second_run + third_run} == {
+        item["id"] for item in first_run
+    }
+
+
+def test_get_ipinfo_database_merges_sorted_runs(trigger, request_mock):
+    trigger.configuration = {"interval": 0, "tags_valid_for": 72}
+    with open("tests/data/country_asn.json.gz", "rb") as fp:
+        content = fp.read()
+    request_mock.get(trigger.database_url, content=content)
+
+    single_run = [item for items in trigger.get_ipinfo_database() for item in items]
+    trigger.pending_snapshot_path.unlink()
+
+    # the ranges are sorted in several files, merged when compared to the snapshot
+    trigger.SORT_RUN_SIZE = 3
+    several_runs = [item for items in trigger.get_ipinfo_database() for item in items]
+    trigger.commit_snapshot()
+
+    assert sorted(item["id"] for item in several_runs) == sorted(
+        item["id"] for item in single_run
+    )
+    assert list(trigger.iter_snapshot()) == sorted(trigger.iter_snapshot())
+
+    # nothing changed since the previous run
+    assert [item for items in trigger.get_ipinfo_database() for item in items] == []
+
+
 def test_parse_db_rows_ipv4(trigger, mocked_uuid):
     # ipv6 segment
     assert list(
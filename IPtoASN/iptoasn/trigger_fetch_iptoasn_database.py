@@ -4,15 +4,14 @@ A trigger to download IPtoASN database
 
 import gzip
 import ipaddress
-import json
 import logging
 import time
 import uuid
 from collections.abc import Iterator
 from datetime import datetime, timedelta
-from io import BytesIO
 from ipaddress import IPv4Network, IPv6Network
 
+import orjson
 import requests
 from iso3166 import countries
 from sekoia_automation.trigger import Trigger
@@ -77,8 +76,8 @@ class TriggerFetchIPtoASNDatabase(Trigger):
         work_dir = self._data_path.joinpath("iptoasn_chunks").joinpath(str(uuid.uuid4()))
         chunk_path = work_dir.joinpath("observables.json")
         work_dir.mkdir(parents=True, exist_ok=True)
-        with chunk_path.open("w") as fp:
-            fp.write(json.dumps(location_chunk))
+        with chunk_path.open("wb") as fp:
+            fp.write(orjson.dumps(location_chunk))
 
         directory = str(work_dir.relative_to(self._data_path))
         file_path = str(chunk_path.relative_to(work_dir))
@@ -107,23 +106,29 @@ class TriggerFetchIPtoASNDatabase(Trigger):
 
     def get_iptoasn_database(self) -> Iterator[list]:
         for url in self.database_urls:
-            response = requests.get(url, stream=True)
-            if not response.ok:
-                logging.error(f"Server answered with {response.status_code}")
-                return
-
-            # establishes validity timeframe for produced observables
-            #
-            # a tag is valid for the (refresh interval * 10) to support errors
-            # but cannot be higher than the MAX_HOUR_TAG_VALID_HOUR
-            tag_valid_for: int = min(self.MAX_HOUR_TAG_VALID_FOR, self.configuration.get("interval", 24) * 10)
-            now: datetime = datetime.utcnow()
-            tag_valid_from: str = datetime_to_str(now)
-            tag_valid_until: str = datetime_to_str(now + timedelta(hours=tag_valid_for))
-            asn_cache: dict[int, dict] = dict()
-            with gzip.open(BytesIO(response.content), mode="r") as gz:
-                for row in gz.readlines():
-                    yield from self._parse_db_row(row, tag_valid_from, tag_valid_until, asn_cache)
+            with requests.get(url, stream=True) as response:
+                if not response.ok:
+                    logging.error(f"Server answered with {response.status_code}")
+                    return
+
+                yield from self._parse_database(response.raw)
+
+    def _parse_database(self, stream) -> Iterator[list]:
+        """
+        Parses the compressed database while it is downloaded, row by row
+        """
+        # establishes validity timeframe for produced observables
+        #
+        # a tag is valid for the (refresh interval * 10) to support errors
+        # but cannot be higher than the MAX_HOUR_TAG_VALID_HOUR
+        tag_valid_for: int = min(self.MAX_HOUR_TAG_VALID_FOR, self.configuration.get("interval", 24) * 10)
+        now: datetime = datetime.utcnow()
+        tag_valid_from: str = datetime_to_str(now)
+        tag_valid_until: str = datetime_to_str(now + timedelta(hours=tag_valid_for))
+        asn_cache: dict[int, dict] = dict()
+        with gzip.open(stream, mode="r") as gz:
+            for row in gz:
+                yield from self._parse_db_row(row, tag_valid_from, tag_valid_until, asn_cache)
 
     def _get_tags(self, country_code: str, tag_valid_from: str, tag_valid_until: str, row: bytes) -> list:
         try:
@@ -36,6 +36,16 @@ def test_get_iptoasn_database(trigger, symphony_storage, request_mock):
         assert "directory" in caller_params
 
 
+def test_parse_database_from_stream(trigger):
+    with open("tests/data/ip2asn-combined.tsv.gz", "rb") as stream:
+        results = list(trigger._parse_database(stream))
+
+    assert len(results) > 0
+    # the first routed segment is 1.0.0.0/24
+    assert results[0][0]["number"] == 13335
+    assert results[0][2]["value"] == "1.0.0.0/24"
+
+
 def test_parse_db_rows_ipv4(trigger, mocked_uuid):
     # simple ipv4 segment
     assert list(
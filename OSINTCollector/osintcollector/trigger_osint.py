@@ -1,11 +1,17 @@
 import copy
+import hashlib
+import json
 import logging
 import os
 import re
+import shelve
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from traceback import format_exc
 
 import requests
+from apscheduler.executors.pool import ThreadPoolExecutor as SchedulerThreadPoolExecutor
 from apscheduler.schedulers.blocking import BlockingScheduler
 from osintcollector.errors import GZipError, MagicLibError, UnzipError
 from osintcollector.extract import create_identity, create_observables, magic_data
@@ -23,8 +29,11 @@ class OSINTTrigger(Trigger):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+        # Number of sources crawled concurrently
+        self._max_workers = max(int(os.environ.get("OSINT_CRAWLING_WORKERS", 8)), 1)
+
         # Scheduler to fetch the sources
-        self._scheduler = BlockingScheduler()
+        self._scheduler = BlockingScheduler(executors={"default": SchedulerThreadPoolExecutor(self._max_workers)})
 
         # Logger
         logging.basicConfig(
@@ -68,8 +77,8 @@ class OSINTTrigger(Trigger):
                 )
 
         # Run first iteration immediately
-        for source in valid_sources:
-            self._run(source)
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            list(executor.map(self._run, valid_sources))
 
     def run(self) -> None:
         self.log("Starting OSINTCollector trigger")
@@ -77,43 +86,129 @@ class OSINTTrigger(Trigger):
         self._scheduler.start()
         self.log("Stopping OSINTCollector trigger")
 
+    @staticmethod
+    def _cache_file(source: dict) -> str:
+        return re.sub("[^A-Za-z0-9._]", "_", source["url"])
+
+    def _conditional_headers(self, source: dict) -> dict:
+        """
+        Headers to download the source only if it was modified since the last iteration
+        """
+        if not source.get("cache_results", True):
+            return {}
+
+        headers = {}
+        with shelve.open(self._data_path.joinpath(f"{self._cache_file(source)}.http").as_posix()) as cache:
+            if cache.get("etag"):
+                headers["If-None-Match"] = cache["etag"]
+
+            if cache.get("modified"):
+                headers["If-Modified-Since"] = cache["modified"]
+
+        return headers
+
+    def _save_validators(self, source: dict, response: requests.Response) -> None:
+        """
+        Remember the validators of the response, once its content was processed
+        """
+        if not source.get("cache_results", True):
+            return
+
+        with shelve.open(self._data_path.joinpath(f"{self._cache_file(source)}.http").as_posix()) as cache:
+            cache["etag"] = response.headers.get("ETag")
+            cache["modified"] = response.headers.get("Last-Modified")
+
+    @staticmethod
+    def _observable_digest(observable: dict) -> str:
+        """
+        Digest of the observable, without the fields that change at each call
+        """
+        observable_copy = copy.deepcopy(observable)
+        for history in observable_copy.get("x_inthreat_history", []):
+            history.pop("date", None)
+
+        for tag in observable_copy.get("x_inthreat_tags", []):
+            tag.pop("valid_from", None)
+            tag.pop("valid_until", None)
+
+        canonical = json.dumps(observable_copy, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _migrate_cache(self, cache_file: str, index: shelve.Shelf, now: float) -> None:
+        """
+        Import the observables of the former JSON cache of the source in its index
+        """
+        if not self._data_path.joinpath(cache_file).exists():
+            return
+
+        with PersistentJSON(cache_file, data_path=self._data_path) as cache:
+            for observable in cache.get("observables", []):
+                index[self._observable_digest(observable)] = now
+
+        self._data_path.joinpath(cache_file).unlink()
+
     def _new_observables(self, source: dict, observables: list) -> list:
-        """Only return observables that were not returned by the last iteration"""
+        """
+        Only return observables that were not seen recently
+
+        The index of the source maps the digest of each observable to the last time it was seen.
+        Observables that were not seen for `cache_expiry` seconds are forgotten, and sent again if they come back.
+        """
         if not source.get("cache_results", True):
             return observables
 
         new_observables = []
-        cache_file = re.sub("[^A-Za-z0-9._]", "_", source["url"])
+        cache_file = self._cache_file(source)
+        expiry = int(source.get("cache_expiry", 2 * int(source.get("frequency", 3600))))
+        now = time.time()
 
-        with PersistentJSON(cache_file, data_path=self._data_path) as cache:
-            cache.setdefault("observables", [])
+        with shelve.open(self._data_path.joinpath(f"{cache_file}.index").as_posix()) as index:
+            self._migrate_cache(cache_file, index, now)
 
-            to_cache = []
             for observable in observables:
-                # Copy the object and remove the `date` field
-                # Because it will change at each call
-                observable_copy = copy.deepcopy(observable)
-                for history in observable_copy.get("x_inthreat_history", []):
-                    history.pop("date", None)
-
-                for tag in observable_copy.get("x_inthreat_tags", []):
-                    tag.pop("valid_from", None)
-                    tag.pop("valid_until", None)
-
-                to_cache.append(observable_copy)
-                if observable_copy not in cache["observables"]:
+                digest = self._observable_digest(observable)
+                last_seen = index.get(digest)
+                if last_seen is None or now - last_seen > expiry:
                     new_observables.append(observable)
 
-            cache["observables"] = to_cache
+                index[digest] = now
+
+            for digest in [digest for digest, last_seen in index.items() if now - last_seen > expiry]:
+                del index[digest]
 
         return new_observables
 
+    def _refresh_observables(self, source: dict) -> None:
+        """
+        Mark the observables of the last iteration as seen, when the source was not modified
+        """
+        with shelve.open(self._data_path.joinpath(f"{self._cache_file(source)}.index").as_posix()) as index:
+            if len(index) == 0:
+                return
+
+            # all the observables of an iteration are seen at the same time
+            latest = max(index.values())
+            now = time.time()
+            for digest in [digest for digest, last_seen in index.items() if last_seen == latest]:
+                index[digest] = now
+
     def _run(self, source) -> None:
+        name = source.get("name")
         try:
-            raw_data = self.__crawl(name=source.get("name"), url=source.get("url"))
+            start = time.monotonic()
+            response = requests.get(source.get("url"), headers=self._conditional_headers(source), timeout=5)
+
+            if response.status_code == 304:
+                self._refresh_observables(source)
+                self._logger.info(f"{name}: not modified, checked in {time.monotonic() - start:.2f}s")
+                return
+
+            raw_data = self.__crawl(name=name, response=response)
+            fetch_duration = time.monotonic() - start
 
             if raw_data:
                 try:
+                    start = time.monotonic()
                     scraped_data: list[dict] = get_scraper(source).run(data=raw_data)
 
                     if not scraped_data:
@@ -123,9 +218,17 @@ class OSINTTrigger(Trigger):
                     identity = create_identity(source)
                     observables = self._new_observables(source, create_observables(source, identity, scraped_data))
 
+                    self._logger.info(
+                        f"{name}: fetched {len(response.content)} bytes in {fetch_duration:.2f}s, "
+                        f"parsed {len(scraped_data)} items in {time.monotonic() - start:.2f}s, "
+                        f"{len(observables)} new observables"
+                    )
+
                     if observables:
                         self._send_observables(identity, observables)
 
+                    self._save_validators(source, response)
+
                 except ScrapingError as e:
                     self.log(
                         f'Error while parsing source {source.get("name")}:\n'
@@ -164,12 +267,10 @@ class OSINTTrigger(Trigger):
             remove_directory=True,
         )
 
-    def __crawl(self, name: str, url: str) -> str | None:
+    def __crawl(self, name: str, response: requests.Response) -> str | None:
         """
-        Downloads the raw data from the requested source
+        Extracts the raw data from the response of the requested source
         """
-        response = requests.get(url, timeout=5)
-
         if not response.ok:
             self.log(
                 f"{name}: HTTP query failed "
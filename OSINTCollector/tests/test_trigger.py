@@ -314,6 +314,81 @@ def test_observable_cache(send_event, ssh_source, symphony_storage):
                 assert obj["value"] == "1.156.8.47"
 
 
+@patch.object(OSINTTrigger, "send_event")
+def test_observable_cache_expiry(send_event, ssh_source, symphony_storage):
+    trigger = OSINTTrigger(data_path=symphony_storage)
+    ssh_source["cache_expiry"] = 3600
+
+    with patch("osintcollector.trigger_osint.time.time", return_value=1000.0):
+        trigger._run(ssh_source)
+        assert send_event.call_count == 1
+
+    # Observables seen before the expiry are not sent again
+    with patch("osintcollector.trigger_osint.time.time", return_value=4000.0):
+        trigger._run(ssh_source)
+        assert send_event.call_count == 1
+
+    # Observables not seen for longer than the expiry are sent again
+    with patch("osintcollector.trigger_osint.time.time", return_value=8000.0):
+        trigger._run(ssh_source)
+        assert send_event.call_count == 2
+        name, bundle = get_name_and_bundle(symphony_storage, send_event)
+        assert len(bundle["objects"]) == 5
+
+
+@patch.object(OSINTTrigger, "send_event")
+def test_observable_cache_migration(send_event, ssh_source, symphony_storage):
+    trigger = OSINTTrigger(data_path=symphony_storage)
+
+    # Build the former JSON cache from a first run
+    with patch.object(trigger, "_new_observables", side_effect=lambda source, observables: observables):
+        trigger._run(ssh_source)
+    _, bundle = get_name_and_bundle(symphony_storage, send_event)
+    cache_file = symphony_storage / "https___lists.blocklist.de_lists_ssh.txt"
+    cache_file.write_text(json.dumps({"observables": bundle["objects"][1:]}))
+
+    # The observables of the former cache are not sent again
+    trigger._run(ssh_source)
+    assert send_event.call_count == 1
+    assert not cache_file.exists()
+
+
+@patch.object(OSINTTrigger, "send_event")
+def test_conditional_request(send_event, ssh_source, symphony_storage):
+    trigger = OSINTTrigger(data_path=symphony_storage)
+    ssh_source["cache_expiry"] = 3600
+    results = """1.10.185.247
+1.163.232.194"""
+
+    with requests_mock.Mocker() as mock:
+        mock.get(
+            ssh_source["url"],
+            [
+                {"text": results, "headers": {"ETag": '"v1"', "Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"}},
+                {"status_code": 304},
+                {"text": results + "\n1.156.8.47"},
+            ],
+        )
+
+        with patch("osintcollector.trigger_osint.time.time", return_value=1000.0):
+            trigger._run(ssh_source)
+            assert send_event.call_count == 1
+            assert "If-None-Match" not in mock.last_request.headers
+
+        # The source was not modified: it is not parsed and its observables are still seen
+        with patch("osintcollector.trigger_osint.time.time", return_value=4000.0):
+            trigger._run(ssh_source)
+            assert send_event.call_count == 1
+            assert mock.last_request.headers["If-None-Match"] == '"v1"'
+            assert mock.last_request.headers["If-Modified-Since"] == "Wed, 21 Oct 2015 07:28:00 GMT"
+
+        with patch("osintcollector.trigger_osint.time.time", return_value=6000.0):
+            trigger._run(ssh_source)
+            assert send_event.call_count == 2
+            name, bundle = get_name_and_bundle(symphony_storage, send_event)
+            assert name == "OSINT: blocklist.de ssh: 1 observable"
+
+
 @pytest.fixture
 def amazon_ranges_source():
     source = {
@@ -21,6 +21,11 @@ class BaseGetEvents(Action):
     DEFAULT_LIMIT = 100
     MAX_LIMIT = 100
 
+    # Delays between two polls of the status of a search job, growing while the job is not over
+    POLLING_MIN_INTERVAL = 1.0
+    POLLING_MAX_INTERVAL = 30.0
+    POLLING_BACKOFF_FACTOR = 1.5
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -101,6 +106,7 @@ class BaseGetEvents(Action):
         :param timeout: The maximum time to wait in seconds
         """
         start_wait = time.time()
+        polling_interval = self.POLLING_MIN_INTERVAL
 
         # Initial status check
         response_get = self.http_session.get(f"{self.events_api_path}/search/jobs/{event_search_job_uuid}", timeout=20)
@@ -115,8 +121,9 @@ class BaseGetEvents(Action):
 
         # Wait for the condition to be met
         while should_we_wait(response_get.json()["status"]):
-            # Wait one second before polling again
-            time.sleep(1)
+            # Wait before polling again, longer and longer, without exceeding the timeout
+            time.sleep(max(min(polling_interval, timeout - (time.time() - start_wait)), 0))
+            polling_interval = min(polling_interval * self.POLLING_BACKOFF_FACTOR, self.POLLING_MAX_INTERVAL)
 
             # Poll the job status
             response_get = self.http_session.get(
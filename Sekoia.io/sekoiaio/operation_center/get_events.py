@@ -1,5 +1,8 @@
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Generator
+from uuid import uuid4
 
+import orjson
 import requests
 import urllib3
 from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type
@@ -8,6 +11,10 @@ from .base_get_event import BaseGetEvents
 
 
 class GetEvents(BaseGetEvents):
+    # Maximum number of events written in a file, when `to_file` is set
+    MAX_FILE_LIMIT = 10000
+    # Number of pages fetched concurrently
+    PAGE_WORKERS = 4
 
     @retry(
         reraise=True,
@@ -16,6 +23,79 @@ class GetEvents(BaseGetEvents):
         retry=retry_if_exception_type(requests.exceptions.Timeout)
         | retry_if_exception_type(urllib3.exceptions.TimeoutError),
     )
+    def _get_page(self, event_search_job_uuid: str, page_size: int, offset: int) -> dict[str, Any]:
+        """
+        Retrieve a page of the results of the event search job
+
+        :param event_search_job_uuid: The UUID of the event search job
+        :param page_size: The number of results of the page
+        :param offset: The offset of the page
+        :return: The page, with its items and the total number of results
+        """
+        response_events = self.http_session.get(
+            f"{self.events_api_path}/search/jobs/{event_search_job_uuid}/events",
+            params={"limit": page_size, "offset": offset},
+            timeout=20,
+        )
+        try:
+            response_events.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            self.log(
+                f"HTTP error when retrieving events for job {event_search_job_uuid}: {e}. Response status: {response_events.status_code}, Response text: {response_events.text}",
+                level="error",
+            )
+            raise
+
+        return response_events.json()
+
+    def _iter_results(self, event_search_job_uuid: str, limit: int) -> Generator[list[dict[str, Any]], None, None]:
+        """
+        Retrieve the results of the event search job, page by page
+
+        Once the first page gives the total, the next pages are fetched concurrently and yielded in order.
+
+        :param event_search_job_uuid: The UUID of the event search job
+        :param limit: The maximum number of results to retrieve
+        :return: The pages of events
+        """
+        page_size = min(limit, self.MAX_LIMIT)
+        page = self._get_page(event_search_job_uuid, page_size, 0)
+        num_results = 0
+        total = min(page["total"], limit)
+        offsets = range(page_size, total, page_size)
+
+        with ThreadPoolExecutor(max_workers=self.PAGE_WORKERS) as executor:
+            pages = iter([page])
+            next_offset = 0
+
+            while True:
+                for page in pages:
+                    if not page["items"]:
+                        if num_results < page["total"] and num_results < limit:
+                            self.log(
+                                "Number of fetched results doesn't match total",
+                                level="error",
+                                num_results=num_results,
+                                total=page["total"],
+                                search_job=event_search_job_uuid,
+                            )
+                        return
+
+                    items = page["items"][: limit - num_results]
+                    num_results += len(items)
+                    yield items
+
+                if next_offset >= len(offsets):
+                    return
+
+                # fetch the next pages concurrently, a few at a time to bound the memory usage
+                window = offsets[next_offset : next_offset + self.PAGE_WORKERS]
+                next_offset += self.PAGE_WORKERS
+                pages = executor.map(
+                    lambda offset: self._get_page(event_search_job_uuid, page_size, offset),
+                    window,
+                )
+
     def _get_results(self, event_search_job_uuid: str, limit: int) -> list[dict[str, Any]]:
         """
         Retrieve the results of the event search job
@@ -24,46 +104,27 @@ class GetEvents(BaseGetEvents):
         :param limit: The maximum number of results to retrieve
         :return: A list of events
         """
-        results: list[dict[str, Any]] = []
-        offset: int = 0
-        total: None | int = None
-
-        while total is None or total > offset:
-            response_events = self.http_session.get(
-                f"{self.events_api_path}/search/jobs/{event_search_job_uuid}/events",
-                params={"limit": limit, "offset": offset},
-                timeout=20,
-            )
-            try:
-                response_events.raise_for_status()
-            except requests.exceptions.HTTPError as e:
-                self.log(
-                    f"HTTP error when retrieving events for job {event_search_job_uuid}: {e}. Response status: {response_events.status_code}, Response text: {response_events.text}",
-                    level="error",
-                )
-                raise
-
-            response_content = response_events.json()
-            if not response_content["items"]:
-                num_results = len(results)
-                if num_results < response_content["total"] and num_results < limit:
-                    self.log(
-                        "Number of fetched results doesn't match total",
-                        level="error",
-                        num_results=num_results,
-                        total=response_content["total"],
-                        search_job=event_search_job_uuid,
-                    )
-                break
-            results += response_content["items"]
-            total = min(response_content["total"], limit)
-
-            offset += limit
-
-        return results
+        return [event for items in self._iter_results(event_search_job_uuid, limit) for event in items]
+
+    def _write_results(self, event_search_job_uuid: str, limit: int) -> str:
+        """
+        Write the results of the event search job in a NDJSON file, as they are retrieved
+
+        :param event_search_job_uuid: The UUID of the event search job
+        :param limit: The maximum number of results to retrieve
+        :return: The path of the file, relative to the data path
+        """
+        filename = f"events-{uuid4()}.ndjson"
+        with self._data_path.joinpath(filename).open("wb") as f:
+            for items in self._iter_results(event_search_job_uuid, limit):
+                f.writelines(orjson.dumps(event) + b"\n" for event in items)
+
+        return filename
 
     def run(self, arguments):
-        limit = min(self.MAX_LIMIT, arguments.get("limit") or self.DEFAULT_LIMIT)
+        to_file = arguments.get("to_file", False)
+        max_limit = self.MAX_FILE_LIMIT if to_file else self.MAX_LIMIT
+        limit = min(max_limit, arguments.get("limit") or self.DEFAULT_LIMIT)
         self.configure_http_session()
 
         # Trigger the event search job
@@ -78,6 +139,9 @@ class GetEvents(BaseGetEvents):
         self.wait_for_search_job_execution(event_search_job_uuid=event_search_job_uuid)
 
         # Retrieve the results
+        if to_file:
+            return {"events_path": self._write_results(event_search_job_uuid=event_search_job_uuid, limit=limit)}
+
         results = self._get_results(event_search_job_uuid=event_search_job_uuid, limit=limit)
 
         return {"events": results}
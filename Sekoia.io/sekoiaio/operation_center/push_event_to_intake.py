@@ -1,14 +1,21 @@
+import gzip
 import json
 import logging
+import re
+import threading
+import time
 from concurrent.futures import ThreadPoolExecutor
 from concurrent.futures import wait as wait_futures
 from posixpath import join as urljoin
-from typing import Any, Generator, Sequence
+from typing import Any, Generator, Iterable, NamedTuple, TextIO
 
+import orjson
 import requests
 from requests import Response
+from requests.adapters import HTTPAdapter
 from sekoia_automation.action import Action
 from sekoia_automation.constants import CHUNK_BYTES_MAX_SIZE, EVENT_BYTES_MAX_SIZE
+from sekoia_automation.exceptions import MissingActionArgumentFileError
 from tenacity import Retrying, stop_after_delay, wait_exponential, retry_if_exception
 
 from sekoiaio.utils import user_agent
@@ -17,12 +24,117 @@ from sekoiaio.logging import get_logger
 
 logger = get_logger(__name__)
 
+COMPRESSION_LEVEL = 5
+NOT_WHITESPACE = re.compile(r"\S")
+
+
+class JSONArrayStream:
+    """
+    Iterate over the items of a JSON array stored in a file, without loading the whole array.
+
+    If the file holds other JSON values, such as the lines of a NDJSON file, these values are the items.
+    """
+
+    def __init__(self, fp: TextIO, block_size: int = 1 << 20):
+        self.fp = fp
+        self.block_size = block_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """
+        Read the next block of the file, dropping the consumed part of the buffer
+        """
+        if self.eof:
+            return False
+
+        data = self.fp.read(self.block_size)
+        if not data:
+            self.eof = True
+            return False
+
+        self.buffer = self.buffer[self.position :] + data
+        self.position = 0
+        return True
+
+    def _peek(self) -> str:
+        """
+        Move to the next non-whitespace character and return it, or an empty string at the end of the file
+        """
+        while True:
+            match = NOT_WHITESPACE.search(self.buffer, self.position)
+            if match:
+                self.position = match.start()
+                return self.buffer[self.position]
+
+            self.position = len(self.buffer)
+            if not self._fill():
+                return ""
+
+    def _decode(self) -> Any:
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+
+            # a value reaching the end of the buffer may be truncated (e.g. a number)
+            if end == len(self.buffer) and self._fill():
+                continue
+
+            self.position = end
+            return value
+
+    def __iter__(self) -> Generator[Any, None, None]:
+        first = self._peek()
+        if first == "":
+            return
+
+        if first != "[":
+            while self._peek() != "":
+                yield self._decode()
+            return
+
+        self.position += 1
+        if self._peek() == "]":
+            return
+
+        while True:
+            self._peek()
+            yield self._decode()
+
+            separator = self._peek()
+            self.position += 1
+            if separator == "]":
+                return
+
+            if separator != ",":
+                raise ValueError(f"Invalid JSON array: unexpected {separator!r} at position {self.position}")
+
+
+class ForwardedChunk(NamedTuple):
+    event_ids: list[str]
+    size: int
+    compressed_size: int
+    latency: float
+
 
 class PushEventToIntake(Action):
     def __init__(self, *args, **kwargs):
         self.max_workers = int(kwargs.pop("max_workers", 5))
+        self.compress = bool(kwargs.pop("compress", True))
         super().__init__(*args, **kwargs)
 
+        # Connections to the intake are kept alive and shared by the workers
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers))
+        self.session.headers.update({"User-Agent": user_agent(), "Content-Type": "application/json"})
+
     def _delete_file(self, arguments: dict):
         event_path = arguments.get("event_path") or arguments.get("events_path")
         if event_path:
@@ -48,25 +160,64 @@ class PushEventToIntake(Action):
             reraise=True,
         )
 
-    def _chunk_events(self, events: Sequence[str]) -> Generator[list[Any], None, None]:
+    def _iter_events(self, arguments: dict) -> Generator[Any, None, None]:
+        """
+        Iterate over the events to push, streaming them from the file of events if any
+
+        The events are resolved as `json_argument` does: the direct value first, then the file.
         """
-        Group events by chunk.
+        arg_event = self.json_argument("event", arguments, required=False)
+        if arg_event:
+            yield arg_event
+
+        if arguments.get("events") is not None:
+            yield from arguments["events"]
+        elif "events_path" in arguments:
+            filepath = self.data_path.joinpath(arguments["events_path"])
+            if not filepath.is_file():
+                raise MissingActionArgumentFileError(filepath)
+
+            with filepath.open("r") as fp:
+                yield from JSONArrayStream(fp)
+
+    @staticmethod
+    def _serialize_event(event: Any) -> str:
+        """
+        Serialize the event as the string sent in the batch
+
+        Args:
+            event: Any: The event, as a string or as a JSON value
+
+        Returns:
+            str:
+        """
+        if not isinstance(event, str):
+            event = orjson.dumps(event).decode("utf-8")
+
+        return event
+
+    def _chunk_events(self, events: Iterable[str]) -> Generator[list[bytes], None, None]:
+        """
+        Group events by chunk, as the JSON strings sent in the batch.
 
         Args:
-            sequence events: Sequence: The events to group
+            iterable events: Iterable[str]: The serialized events to group
 
         Returns:
-            Generator[list[Any], None, None]:
+            Generator[list[bytes], None, None]:
         """
-        chunk: list[Any] = []
+        chunk: list[bytes] = []
         chunk_bytes: int = 0
         nb_discarded_events: int = 0
 
         # iter over the events
         for event in events:
-            len_event = len(event.encode("utf-8"))
+            serialized_event = orjson.dumps(event)
+            # the serialized event is quoted, and escaped: it is never shorter than the event
+            len_event = len(serialized_event) - 2
 
-            if len_event > EVENT_BYTES_MAX_SIZE:
+            # the limit applies to the event itself, only encoded when its serialized form exceeds it
+            if len_event > EVENT_BYTES_MAX_SIZE and len(event.encode("utf-8")) > EVENT_BYTES_MAX_SIZE:
                 nb_discarded_events += 1
                 continue
 
@@ -77,8 +228,8 @@ class PushEventToIntake(Action):
                 chunk = []
                 chunk_bytes = 0
 
-            # add the event to the current chunk
-            chunk.append(event)
+            # add the event, as a JSON string, to the current chunk
+            chunk.append(serialized_event)
             chunk_bytes += len_event
 
         # if the last chunk is not empty
@@ -90,19 +241,28 @@ class PushEventToIntake(Action):
         if nb_discarded_events > 0:
             self.log(message=f"{nb_discarded_events} too long events " "were discarded (length > 250kb)")
 
+    def _request_body(self, intake_key: str, chunk: list[bytes]) -> bytes:
+        """
+        Build the body of the batch from the serialized events, without serializing them again
+        """
+        return b'{"intake_key":' + orjson.dumps(intake_key) + b',"jsons":[' + b",".join(chunk) + b"]}"
+
     def _send_chunk(
         self,
         intake_key: str,
         batch_api: str,
         chunk_index: int,
-        chunk: list[Any],
-        collect_ids: dict[int, list[str]],
+        chunk: list[bytes],
+        forwarded_chunks: dict[int, ForwardedChunk],
     ):
         try:
-            request_body = {
-                "intake_key": intake_key,
-                "jsons": chunk,
-            }
+            start = time.monotonic()
+            request_body = self._request_body(intake_key, chunk)
+            headers = {}
+            data = request_body
+            if self.compress:
+                data = gzip.compress(request_body, compresslevel=COMPRESSION_LEVEL)
+                headers["Content-Encoding"] = "gzip"
 
             for attempt in self._retry():
                 with attempt:
@@ -113,9 +273,7 @@ class PushEventToIntake(Action):
                         attempt_number=attempt.retry_state.attempt_number,
                     )
 
-                    res: Response = requests.post(
-                        batch_api, json=request_body, timeout=30, headers={"User-Agent": user_agent()}
-                    )
+                    res: Response = self.session.post(batch_api, data=data, timeout=30, headers=headers)
                     logger.log(
                         logging.INFO if res.ok else logging.ERROR,
                         "Chunk forwarded",
@@ -125,60 +283,81 @@ class PushEventToIntake(Action):
                     )
                     res.raise_for_status()
 
-            collect_ids[chunk_index] = res.json().get("event_ids", [])
+            forwarded_chunks[chunk_index] = ForwardedChunk(
+                event_ids=res.json().get("event_ids", []),
+                size=len(request_body),
+                compressed_size=len(data),
+                latency=time.monotonic() - start,
+            )
 
         except Exception as ex:
             message = f"Failed to forward {len(chunk)} events"
             logger.exception(message, extra={"chunk_index": chunk_index})
             self.log_exception(ex, message=message)
 
-    def run(self, arguments) -> dict:
-        events = []
-
-        arg_event = self.json_argument("event", arguments, required=False)
-        if arg_event:
-            if isinstance(arg_event, str):
-                events.append(arg_event)
-            else:
-                events.append(json.dumps(arg_event))
-
-        arg_events = self.json_argument("events", arguments, required=False) or []
-        for event in arg_events:
-            if isinstance(event, str):
-                events.append(event)
-            else:
-                events.append(json.dumps(event))
-
-        # no event to push
-        if not events:
-            self.log("No event to push", level="info")
-            return {"event_ids": []}
+    @staticmethod
+    def _summary(chunk_count: int, forwarded_chunks: dict[int, ForwardedChunk], duration: float) -> dict:
+        """
+        Summarize the throughput of the push
+        """
+        forwarded_bytes = sum(chunk.size for chunk in forwarded_chunks.values())
+        latencies = [chunk.latency for chunk in forwarded_chunks.values()]
+
+        return {
+            "chunk_count": chunk_count,
+            "forwarded_chunk_count": len(forwarded_chunks),
+            "forwarded_bytes": forwarded_bytes,
+            "compressed_bytes": sum(chunk.compressed_size for chunk in forwarded_chunks.values()),
+            "duration": round(duration, 3),
+            "bytes_per_second": round(forwarded_bytes / duration) if duration > 0 else forwarded_bytes,
+            "average_chunk_latency": round(sum(latencies) / len(latencies), 3) if latencies else 0,
+            "max_chunk_latency": round(max(latencies), 3) if latencies else 0,
+        }
 
-        logger.info("Preparing to forward events", event_count=len(events))
+    def run(self, arguments) -> dict:
+        start = time.monotonic()
 
         intake_server = arguments.get("intake_server", "https://intake.sekoia.io")
         batch_api = urljoin(intake_server, "batch")
         intake_key = arguments["intake_key"]
 
-        # Dict to collect event_ids for the API
-        collect_ids: dict[int, list] = {}
+        # Chunks forwarded to the intake, with the event_ids for the API
+        forwarded_chunks: dict[int, ForwardedChunk] = {}
 
-        chunks = self._chunk_events(events)
+        # The events are read, serialized and chunked as the chunks are forwarded.
+        # The number of pending chunks is bounded to keep the memory usage low
+        chunks = self._chunk_events(self._serialize_event(event) for event in self._iter_events(arguments))
+        pending_chunks = threading.BoundedSemaphore(2 * self.max_workers)
+        futures = []
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
             # Forward chunks in parallel
-            futures = [
-                executor.submit(self._send_chunk, intake_key, batch_api, chunk_index, chunk, collect_ids)
-                for chunk_index, chunk in enumerate(chunks)
-            ]
-            logger.info("Submitting chunks to the intake", chunk_count=len(futures))
+            for chunk_index, chunk in enumerate(chunks):
+                if chunk_index == 0:
+                    logger.info("Submitting chunks to the intake")
+
+                pending_chunks.acquire()
+                future = executor.submit(self._send_chunk, intake_key, batch_api, chunk_index, chunk, forwarded_chunks)
+                future.add_done_callback(lambda _: pending_chunks.release())
+                futures.append(future)
+
             wait_futures(futures)
 
-        event_ids = [event_id for chunk_index in sorted(collect_ids.keys()) for event_id in collect_ids[chunk_index]]
+        # no event to push
+        if not futures:
+            self.log("No event to push", level="info")
+            return {"event_ids": []}
+
+        event_ids = [
+            event_id
+            for chunk_index in sorted(forwarded_chunks.keys())
+            for event_id in forwarded_chunks[chunk_index].event_ids
+        ]
+        summary = self._summary(len(futures), forwarded_chunks, time.monotonic() - start)
 
-        logger.info("Successfully forwarded events to the intake", event_count=len(event_ids))
+        logger.info("Successfully forwarded events to the intake", event_count=len(event_ids), **summary)
 
         if not arguments.get("keep_file_after_push", False):
             logger.info("Deleting the event file after push")
             self._delete_file(arguments)
 
-        return {"event_ids": event_ids}
+        return {"event_ids": event_ids, "summary": summary}
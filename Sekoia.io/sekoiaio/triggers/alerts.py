@@ -1,11 +1,12 @@
 import uuid
+from functools import cached_property
 from posixpath import join as urljoin
 
 import orjson
 import requests
 from tenacity import retry, wait_exponential, stop_after_attempt
 
-from sekoiaio.utils import user_agent
+from sekoiaio.utils import TTLCache, user_agent
 
 from .base import _SEKOIANotificationBaseTrigger
 
@@ -14,6 +15,25 @@ class SecurityAlertsTrigger(_SEKOIANotificationBaseTrigger):
     # List of alert types we can handle.
     HANDLED_EVENT_SUB_TYPES = [("alert", "created"), ("alert", "updated"), ("alert-comment", "created")]
 
+    # Bound the number of concurrent requests to the API
+    HANDLERS_CONCURRENCY = 20
+
+    # Alerts fetched recently, shared by the bursts of notifications about the same alert
+    ALERTS_CACHE_SIZE = 1000
+    ALERTS_CACHE_TTL = 5
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._alerts_cache = TTLCache(maxsize=self.ALERTS_CACHE_SIZE, ttl=self.ALERTS_CACHE_TTL)
+
+    @cached_property
+    def http_session(self) -> requests.Session:
+        session = requests.Session()
+        session.headers.update(
+            {"Authorization": f"Bearer {self.module.configuration['api_key']}", "User-Agent": user_agent()}
+        )
+        return session
+
     def handle_event(self, message):
         """Handle alert messages.
 
@@ -40,19 +60,23 @@ class SecurityAlertsTrigger(_SEKOIANotificationBaseTrigger):
         if not self._filter_notifications(message):
             return
 
+        # Discard the alerts of other rules before fetching them, when the notification tells the rule
+        if self._filter_by_rule(alert_attrs.get("rule") or {}) is False:
+            return
+
         try:
-            alert = self._retrieve_alert_from_alertapi(alert_uuid)
+            alert = self._get_alert(
+                alert_uuid,
+                updated_at=alert_attrs.get("updated_at"),
+                updated=alert_attrs.get("updated"),
+                refresh="status" in (alert_attrs.get("updated") or {}),
+            )
         except Exception as exp:
             self.log_exception(exp, message="Failed to fetch alert from Alert API")
             return
 
-        if rule_filter := self.configuration.get("rule_filter"):
-            if alert["rule"]["name"] != rule_filter and alert["rule"]["uuid"] != rule_filter:
-                return
-
-        if rule_names_filter := self.configuration.get("rule_names_filter"):
-            if alert["rule"]["name"] not in rule_names_filter:
-                return
+        if not self._filter_by_rule(alert["rule"]):
+            return
 
         work_dir = self._data_path.joinpath("sekoiaio_securityalerts").joinpath(str(uuid.uuid4()))
         alert_path = work_dir.joinpath("alert.json")
@@ -93,6 +117,56 @@ class SecurityAlertsTrigger(_SEKOIANotificationBaseTrigger):
     def _filter_notifications(self, message) -> bool:
         return True
 
+    def _filter_by_rule(self, rule: dict) -> bool | None:
+        """
+        Check the rule of an alert against the rule filters of the trigger
+
+        Return None if the rule lacks the fields to decide, e.g. the rule given by a notification.
+        """
+        name, rule_uuid = rule.get("name"), rule.get("uuid")
+
+        if rule_filter := self.configuration.get("rule_filter"):
+            if rule_filter not in (name, rule_uuid):
+                return False if name is not None and rule_uuid is not None else None
+
+        if rule_names_filter := self.configuration.get("rule_names_filter"):
+            if name is None:
+                return None
+
+            if name not in rule_names_filter:
+                return False
+
+        return True
+
+    def _get_alert(
+        self,
+        alert_uuid: str,
+        updated_at: str | None = None,
+        updated: dict | None = None,
+        refresh: bool = False,
+    ) -> dict:
+        """
+        Get the alert from the cache, or from the Alert API if it was not fetched recently
+
+        The alerts are only cached when the notification identifies their version,
+        with the date of their last update or with the changes it notifies.
+
+        :param alert_uuid: The UUID of the alert
+        :param updated_at: The last update of the alert, if known
+        :param updated: The changes of the alert notified, if any
+        :param refresh: Whether the alert must be fetched from the Alert API anyway
+        """
+        if updated_at is None and not updated:
+            return self._retrieve_alert_from_alertapi(alert_uuid)
+
+        key = (alert_uuid, updated_at, orjson.dumps(updated, option=orjson.OPT_SORT_KEYS))
+        if not refresh and (alert := self._alerts_cache.get(key)) is not None:
+            return alert
+
+        alert = self._retrieve_alert_from_alertapi(alert_uuid)
+        self._alerts_cache.set(key, alert)
+        return alert
+
     @retry(
         reraise=True,
         wait=wait_exponential(max=10),
@@ -102,12 +176,8 @@ class SecurityAlertsTrigger(_SEKOIANotificationBaseTrigger):
         api_url = urljoin(self.module.configuration["base_url"], f"api/v1/sic/alerts/{alert_uuid}")
         api_url = api_url.replace("/api/api", "/api")  # In case base_url ends with /api
 
-        api_key = self.module.configuration["api_key"]
-        headers = {"Authorization": f"Bearer {api_key}", "User-Agent": user_agent()}
-
-        response = requests.get(
+        response = self.http_session.get(
             api_url,
-            headers=headers,
             params={
                 "stix": False,
                 "comments": False,
@@ -192,20 +262,15 @@ class AlertCommentCreatedTrigger(SecurityAlertsTrigger):
             return
 
         try:
-            alert = self._retrieve_alert_from_alertapi(alert_uuid)
+            alert = self._get_alert(alert_uuid)
+            if not self._filter_by_rule(alert["rule"]):
+                return
+
             comment = self._retrieve_comment_from_alertapi(alert_uuid, comment_uuid)
         except Exception as exp:
             self.log_exception(exp, message="Failed to fetch alert from Alert API")
             return
 
-        if rule_filter := self.configuration.get("rule_filter"):
-            if alert["rule"]["name"] != rule_filter and alert["rule"]["uuid"] != rule_filter:
-                return
-
-        if rule_names_filter := self.configuration.get("rule_names_filter"):
-            if alert["rule"]["name"] not in rule_names_filter:
-                return
-
         work_dir = self._data_path.joinpath("sekoiaio_securityalerts").joinpath(str(uuid.uuid4()))
         alert_path = work_dir.joinpath("alert.json")
         work_dir.mkdir(parents=True, exist_ok=True)
@@ -260,10 +325,7 @@ class AlertCommentCreatedTrigger(SecurityAlertsTrigger):
 
         api_url = api_url.replace("/api/api", "/api")  # In case base_url ends with /api
 
-        api_key = self.module.configuration["api_key"]
-        headers = {"Authorization": f"Bearer {api_key}", "User-Agent": user_agent()}
-
-        response = requests.get(api_url, headers=headers)
+        response = self.http_session.get(api_url)
 
         if not response.ok:
             try:
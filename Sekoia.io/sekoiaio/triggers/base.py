@@ -41,10 +41,18 @@ class _SEKOIANotificationBaseTrigger(Trigger):
 
     seconds_without_events = 3600 * 24  # Force restart the pod every day if no events were received
     last_heartbeat_threshold = 600  # Force restart the pod if no heartbeat was received for 10 minutes
+    HANDLERS_CONCURRENCY = 100  # Maximum number of messages handled at the same time
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self._message_processor: MessagesProcessor = MessagesProcessor(self.handler_dispatcher)
+        self._message_processor: MessagesProcessor = MessagesProcessor(
+            self.handler_dispatcher,
+            max_queue_size=int(os.environ.get("SEKOIAIO_MESSAGES_QUEUE_SIZE", 10000)),
+            overflow_policy=os.environ.get("SEKOIAIO_MESSAGES_OVERFLOW_POLICY", "block"),
+            concurrency=int(os.environ.get("SEKOIAIO_HANDLERS_CONCURRENCY", self.HANDLERS_CONCURRENCY)),
+            coalesce_key=self.coalesce_key,
+            trigger_name=type(self).__name__,
+        )
         self._websocket: WebSocketApp | None = None
         self._last_error: datetime | None = None
         self._last_close: datetime | None = None
@@ -145,6 +153,25 @@ class _SEKOIANotificationBaseTrigger(Trigger):
         self.heartbeat()
         self._message_processor.push_message(raw_message)
 
+    @staticmethod
+    def coalesce_key(raw_message: str) -> tuple[str, str, str] | None:
+        """Key identifying the object a message notifies about.
+
+        Notifications with the same type, action and attributes as a
+        message still waiting in the queue are duplicates and are
+        discarded.
+
+        """
+        try:
+            message = json.loads(raw_message)
+            return (
+                message["type"],
+                message.get("action"),
+                json.dumps(message.get("attributes"), sort_keys=True),
+            )
+        except Exception:
+            return None
+
     def handler_dispatcher(self, raw_message: str):
         """Dispatch events to handler methods given the event type.
 
@@ -18,6 +18,9 @@ class SecurityCasesTrigger(_SEKOIANotificationBaseTrigger):
         ("case", "alerts-updated"),
     ]
 
+    # Bound the number of concurrent requests to the API
+    HANDLERS_CONCURRENCY = 20
+
     def _filter_by_mode(self, case) -> bool:
         mode_filter = self.configuration.get("mode_filter")
         if mode_filter and case.get("manual") != (mode_filter == "manual"):
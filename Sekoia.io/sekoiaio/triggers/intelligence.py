@@ -1,4 +1,5 @@
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from posixpath import join as urljoin
 
 import requests
@@ -15,6 +16,9 @@ class FeedConsumptionTrigger(Trigger):
     FILE_NAME = "stix_objects.json"
     frequency: int = 300  # Frequency in seconds, previous value 3600
     _STOP_EVENT_WAIT = 120
+    SOURCES_FILE_NAME = "sources.json"
+    SOURCES_BATCH_SIZE = 100  # Maximum number of sources resolved in one request
+    SOURCES_CACHE_TTL = 24 * 3600  # Sources are fetched again after a day, to follow their changes
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -22,7 +26,20 @@ class FeedConsumptionTrigger(Trigger):
         self.next_cursor = None
         self.resume_on_errors = False
         self.first_run = True
-        self.sources_caches = {}
+        self.sources_store = PersistentJSON(self.SOURCES_FILE_NAME, self._data_path)
+        self.sources_caches: dict[str, dict] = {}
+        self._sources_fetched_at: dict[str, float] = {}
+        with self.sources_store as cache:
+            self._forget_expired_sources(cache)
+            for ref, source in cache.items():
+                self.sources_caches[ref] = {"name": source["name"], "confidence": source["confidence"]}
+                self._sources_fetched_at[ref] = source["fetched_at"]
+
+        # Fetch of the next page, while the current one is being sent
+        self._prefetch_executor: ThreadPoolExecutor | None = None
+        self._prefetched: tuple[str | None, Future] | None = None
+        # Page fetched ahead to batch the lookups of its sources, with its cursor and the next one
+        self._lookahead: tuple[str, list, str | None] | None = None
 
     @property
     def feed_id(self) -> str:
@@ -40,8 +57,20 @@ class FeedConsumptionTrigger(Trigger):
     def with_resolve_sources(self) -> bool:
         return self.configuration.get("resolve_sources", False)
 
+    @property
+    def prefetch_pages(self) -> bool:
+        return self.configuration.get("prefetch_pages", False)
+
+    @property
+    def cursor(self) -> str | None:
+        with self.context as cache:
+            return cache.get("cursors", {}).get(self.feed_id)
+
     @property
     def url(self):
+        return self.page_url(self.cursor)
+
+    def page_url(self, cursor: str | None) -> str:
         url = (
             urljoin(
                 self.module.configuration["base_url"],
@@ -54,14 +83,12 @@ class FeedConsumptionTrigger(Trigger):
         if len(self.API_URL_ADDITIONAL_PARAMETERS) > 0:
             url += "&" + "&".join(self.API_URL_ADDITIONAL_PARAMETERS)
 
-        with self.context as cache:
-            cursor = cache.get("cursors", {}).get(self.feed_id)
-            if cursor:
-                return f"{url}&cursor={cursor}"
-            elif self.modified_after:
-                return f"{url}&modified_after={self.modified_after}"
-            else:
-                return url
+        if cursor:
+            return f"{url}&cursor={cursor}"
+        elif self.modified_after:
+            return f"{url}&modified_after={self.modified_after}"
+        else:
+            return url
 
     def _handle_response_error(self, response: requests.Response):
         if not response.ok:
@@ -79,10 +106,16 @@ class FeedConsumptionTrigger(Trigger):
                 self._stop_event.wait(self._STOP_EVENT_WAIT)
                 response.raise_for_status()
 
-    def fetch_feed_objects(self):
-        # Request the next batch of objects from the API
+    def fetch_page(self, cursor: str | None) -> tuple[list, str | None]:
+        """
+        Fetch the page of objects following the cursor
+
+        :param cursor: The cursor of the page, None for the first page
+        :return: The objects of the page and the cursor of the next page
+        """
+        # Request the batch of objects from the API
         api_key = self.module.configuration["api_key"]
-        response = requests.get(self.url, headers={"Authorization": f"Bearer {api_key}"})
+        response = requests.get(self.page_url(cursor), headers={"Authorization": f"Bearer {api_key}"})
 
         # manage the response
         self._handle_response_error(response)
@@ -90,10 +123,64 @@ class FeedConsumptionTrigger(Trigger):
         # get objects from the response
         data = response.json()
 
-        # Get cursor for next API call
-        self.next_cursor = data.get("next_cursor", None)
+        return data.get("items", []), data.get("next_cursor", None)
 
-        return data.get("items", [])
+    def fetch_feed_objects(self):
+        objects, self.next_cursor = self.fetch_page(self.cursor)
+        return objects
+
+    def _fetch_page_ahead(self, cursor: str | None) -> tuple[list, str | None]:
+        """
+        Get the page following the cursor, from the page fetched ahead if any
+        """
+        lookahead, self._lookahead = self._lookahead, None
+        if lookahead is not None and lookahead[0] == cursor:
+            return lookahead[1], lookahead[2]
+
+        return self.fetch_page(cursor)
+
+    def _fetch_and_resolve_page(self, cursor: str | None) -> tuple[list, str | None]:
+        objects, next_cursor = self._fetch_page_ahead(cursor)
+        if self.with_resolve_sources:
+            following_objects: list = []
+            # Fetch the following page ahead to look its sources up with the ones of this page
+            if self.prefetch_pages and next_cursor and len(objects) >= self.batch_size_limit:
+                following_objects, following_cursor = self.fetch_page(next_cursor)
+                self._lookahead = (next_cursor, following_objects, following_cursor)
+
+            self.resolve_sources(objects, following_objects)
+
+        return objects, next_cursor
+
+    def _prefetch(self, cursor: str | None):
+        """
+        Start fetching the page following the cursor in the background
+        """
+        if self._prefetch_executor is None:
+            self._prefetch_executor = ThreadPoolExecutor(max_workers=1)
+
+        self._prefetched = (cursor, self._prefetch_executor.submit(self._fetch_and_resolve_page, cursor))
+
+    def _next_page(self) -> list:
+        """
+        Get the next page of objects, with its sources resolved, from the prefetched page if any
+        """
+        prefetched, self._prefetched = self._prefetched, None
+        cursor = self.cursor
+
+        if prefetched is not None:
+            prefetched_cursor, future = prefetched
+            if prefetched_cursor == cursor:
+                objects, self.next_cursor = future.result()
+                return objects
+
+            # Ignore the prefetched page if the cursor moved meanwhile,
+            # once its fetch no longer updates the sources cache
+            if not future.cancel():
+                wait([future])
+
+        objects, self.next_cursor = self._fetch_and_resolve_page(cursor)
+        return objects
 
     def fetch_objects(self, objects_id: list[str]) -> list[dict]:
         """
@@ -120,31 +207,64 @@ class FeedConsumptionTrigger(Trigger):
 
         return data.get("items", [])
 
-    def resolve_sources(self, objects: list[dict]) -> list[dict]:
+    def _is_source_expired(self, fetched_at: float) -> bool:
+        return time.time() - fetched_at >= self.SOURCES_CACHE_TTL
+
+    def _forget_expired_sources(self, cache: dict) -> None:
         """
-        Resolve source references in the objects by fetching them from the Sekoia.io API.
-        This method will fetch the source objects only if they are not already in the cache.
+        Remove the sources fetched too long ago from the cache
+        """
+        for ref in [ref for ref, source in cache.items() if self._is_source_expired(source.get("fetched_at", 0))]:
+            del cache[ref]
+
+    def _unknown_sources(self, objects: list[dict]) -> set[str]:
         """
-        sources_to_fetch: list[str] = []
+        Collect the source references of the objects missing from the cache, or expired
+        """
+        sources_to_fetch: set[str] = set()
 
         # Iterate over objects to collect source references
         for object in objects:
             refs = object.get("x_inthreat_sources_refs", [])
             # Check if already in cache
             for ref in refs:
-                if ref not in self.sources_caches:
-                    sources_to_fetch.append(ref)
+                if ref not in self.sources_caches or self._is_source_expired(self._sources_fetched_at.get(ref, 0)):
+                    sources_to_fetch.add(ref)
 
-        # Remove duplicates
-        sources_to_fetch = sorted(list(set(sources_to_fetch)))
+        return sources_to_fetch
 
-        # Adding sources to the cache
-        sources = self.fetch_objects(sources_to_fetch)
-        for source in sources:
-            self.sources_caches[source["id"]] = {
-                "name": source["name"],
-                "confidence": source.get("confidence", 0),
-            }
+    def resolve_sources(self, objects: list[dict], following_objects: list[dict] | None = None) -> list[dict]:
+        """
+        Resolve source references in the objects by fetching them from the Sekoia.io API.
+        This method will fetch the source objects only if they are not already in the cache,
+        or if they were cached more than `SOURCES_CACHE_TTL` seconds ago.
+
+        The sources of the following objects, if any, fill the room left in the last batch,
+        to be cached without any additional request.
+        """
+        sources_to_fetch = self._unknown_sources(objects)
+        sources_refs = sorted(sources_to_fetch)
+        if sources_refs and following_objects:
+            room = -len(sources_refs) % self.SOURCES_BATCH_SIZE
+            sources_refs += sorted(self._unknown_sources(following_objects) - sources_to_fetch)[:room]
+
+        # Adding sources to the cache, a batch at a time
+        new_sources = {}
+        for index in range(0, len(sources_refs), self.SOURCES_BATCH_SIZE):
+            for source in self.fetch_objects(sources_refs[index : index + self.SOURCES_BATCH_SIZE]):
+                new_sources[source["id"]] = {
+                    "name": source["name"],
+                    "confidence": source.get("confidence", 0),
+                }
+
+        # Persist the cache for the next runs
+        if new_sources:
+            fetched_at = time.time()
+            self.sources_caches.update(new_sources)
+            self._sources_fetched_at.update(dict.fromkeys(new_sources, fetched_at))
+            with self.sources_store as cache:
+                cache.update({ref: {**source, "fetched_at": fetched_at} for ref, source in new_sources.items()})
+                self._forget_expired_sources(cache)
 
         # Getting sources from the cache
         for object in objects:
@@ -159,13 +279,15 @@ class FeedConsumptionTrigger(Trigger):
         batch_start_time = time.time()
 
         # Fetch next batch
-        objects = self.fetch_feed_objects()
-        if self.with_resolve_sources:
-            self.resolve_sources(objects)
+        objects = self._next_page()
 
         # Next runs will be continued in case of errors, as at least one run was ok
         self.resume_on_errors = True
 
+        # Fetch the following page while this one is being sent
+        if self.prefetch_pages and self.next_cursor and len(objects) >= self.batch_size_limit:
+            self._prefetch(self.next_cursor)
+
         # compute the duration to fetch the objects
         batch_duration = int(time.time() - batch_start_time)
         self.log(
@@ -214,6 +336,9 @@ class FeedConsumptionTrigger(Trigger):
                 self.log(message="Failed to get data from feed", level="error")
                 self.log_exception(error, message="Failed to get data from feed")
 
+        if self._prefetch_executor is not None:
+            self._prefetch_executor.shutdown(cancel_futures=True)
+
 
 class FeedIOCConsumptionTrigger(FeedConsumptionTrigger):
     """
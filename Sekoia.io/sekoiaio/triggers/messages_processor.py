@@ -1,10 +1,19 @@
 import signal
-from collections.abc import Callable
-from queue import Queue
-from threading import Event, Thread
+import time
+from collections.abc import Callable, Hashable
+from queue import Empty, Full, Queue
+from threading import Event, Lock, Thread
 
 from gevent.pool import Pool
 
+from sekoiaio.triggers.metrics import DISCARDED_MESSAGES, HANDLER_DURATION, MESSAGES_QUEUE_DEPTH
+
+# What to do with a message when the queue is full:
+# - block: wait for a free slot in the queue
+# - drop_newest: discard the message
+# - drop_oldest: discard the oldest message of the queue
+OVERFLOW_POLICIES = ("block", "drop_newest", "drop_oldest")
+
 
 class MessagesProcessor(Thread):
     """
@@ -17,12 +26,37 @@ class MessagesProcessor(Thread):
     _stop_event: Event
     _pool: Pool
 
-    def __init__(self, callback: Callable):
+    def __init__(
+        self,
+        callback: Callable,
+        max_queue_size: int = 10000,
+        overflow_policy: str = "block",
+        concurrency: int = 100,
+        coalesce_key: Callable[[str], Hashable | None] | None = None,
+        trigger_name: str = "trigger",
+    ):
+        """
+        :param callback: The function handling a message
+        :param max_queue_size: The maximum number of messages waiting to be handled
+        :param overflow_policy: What to do with a message when the queue is full, see `OVERFLOW_POLICIES`
+        :param concurrency: The maximum number of messages handled at the same time
+        :param coalesce_key: A function giving the key of a message, messages with the same key as a message
+                             waiting in the queue are discarded. None to keep all the messages
+        :param trigger_name: The name of the trigger, to label the metrics
+        """
         super().__init__()
-        self._queue = Queue()
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow_policy!r}, expected one of {OVERFLOW_POLICIES}")
+
+        self._queue = Queue(maxsize=max_queue_size)
+        self._overflow_policy = overflow_policy
         self._stop_event = Event()  # Event to notify we must stop the thread
-        self._pool = Pool(100)
+        self._pool = Pool(concurrency)
         self._callback: Callable = callback
+        self._coalesce_key = coalesce_key
+        self._pending_keys: set[Hashable] = set()  # Keys of the messages waiting in the queue
+        self._pending_lock = Lock()
+        self._trigger_name = trigger_name
 
         # Register signal to terminate thread
         signal.signal(signal.SIGINT, self.exit)
@@ -34,7 +68,51 @@ class MessagesProcessor(Thread):
         self._pool.join()
 
     def push_message(self, message: str):
-        self._queue.put(message)
+        key = self._coalesce_key(message) if self._coalesce_key else None
+        if key is not None:
+            with self._pending_lock:
+                # The same message is already waiting to be handled
+                if key in self._pending_keys:
+                    DISCARDED_MESSAGES.labels(trigger=self._trigger_name, reason="duplicate").inc()
+                    return
+
+                self._pending_keys.add(key)
+
+        self._enqueue((key, message))
+        MESSAGES_QUEUE_DEPTH.labels(trigger=self._trigger_name).set(self._queue.qsize())
+
+    def _enqueue(self, item: tuple[Hashable | None, str]):
+        if self._overflow_policy == "block":
+            while not self._stop_event.is_set():
+                try:
+                    self._queue.put(item, timeout=self.QUEUE_TIMEOUT)
+                    return
+                except Full:
+                    pass
+            return
+
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except Full:
+                if self._overflow_policy == "drop_newest":
+                    self._discard(item)
+                    return
+
+            try:
+                self._discard(self._queue.get_nowait())
+            except Empty:
+                pass
+
+    def _discard(self, item: tuple[Hashable | None, str]):
+        self._release(item[0])
+        DISCARDED_MESSAGES.labels(trigger=self._trigger_name, reason="overflow").inc()
+
+    def _release(self, key: Hashable | None):
+        if key is not None:
+            with self._pending_lock:
+                self._pending_keys.discard(key)
 
     def exit(self, _, __):
         # Exit signal received, asking the processor to stop
@@ -48,8 +126,20 @@ class MessagesProcessor(Thread):
 
     def _handle_message(self):
         try:
-            message = self._queue.get(timeout=self.QUEUE_TIMEOUT)
-            self._pool.spawn(self._callback, message)
-        except Exception:
+            key, message = self._queue.get(timeout=self.QUEUE_TIMEOUT)
+        except Empty:
             # Don't block indefinitely to get a chance to exit properly
-            pass
+            return
+
+        self._release(key)
+        MESSAGES_QUEUE_DEPTH.labels(trigger=self._trigger_name).set(self._queue.qsize())
+
+        # Wait for a free slot in the pool: the concurrency is bounded
+        self._pool.spawn(self._process, message)
+
+    def _process(self, message: str):
+        start = time.monotonic()
+        try:
+            self._callback(message)
+        finally:
+            HANDLER_DURATION.labels(trigger=self._trigger_name).observe(time.monotonic() - start)
@@ -0,0 +1,25 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Declare prometheus metrics
+prom_namespace_sekoiaio = "symphony_module_sekoiaio"
+
+MESSAGES_QUEUE_DEPTH = Gauge(
+    name="messages_queue_depth",
+    documentation="Number of LiveAPI messages waiting to be handled",
+    namespace=prom_namespace_sekoiaio,
+    labelnames=["trigger"],
+)
+
+DISCARDED_MESSAGES = Counter(
+    name="discarded_messages",
+    documentation="Number of LiveAPI messages discarded, because the queue was full or because they were duplicates",
+    namespace=prom_namespace_sekoiaio,
+    labelnames=["trigger", "reason"],
+)
+
+HANDLER_DURATION = Histogram(
+    name="message_handler_duration",
+    documentation="Time spent, in seconds, handling a LiveAPI message",
+    namespace=prom_namespace_sekoiaio,
+    labelnames=["trigger"],
+)
@@ -1,8 +1,12 @@
 import json
 import pathlib
 import sys
+import threading
+import time
+from collections import OrderedDict
 from functools import cache
 from datetime import datetime
+from typing import Any, Hashable
 
 
 @cache
@@ -24,3 +28,38 @@ def should_patch() -> bool:
 
 def datetime_to_str(date: datetime) -> str:
     return date.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class TTLCache:
+    """
+    A thread-safe cache whose entries expire after `ttl` seconds, and whose oldest entries are evicted beyond `maxsize`
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expiration, value = entry
+            if expiration <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
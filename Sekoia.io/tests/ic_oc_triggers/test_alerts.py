@@ -1,3 +1,4 @@
+import copy
 import json
 from unittest.mock import MagicMock, Mock, patch
 
@@ -438,3 +439,73 @@ def test_comment_trigger_filter_notification_function(
 
     trigger.handle_event(samplenotif_alert_comment_created)
     trigger.send_event.assert_not_called()
+
+
+def test_alert_trigger_filter_by_rule_before_fetch(alert_trigger, samplenotif_alert_created, sample_sicalertapi):
+    alert_trigger.send_event = MagicMock()
+    alert_trigger.configuration = {"rule_filter": "foo"}
+    samplenotif_alert_created["attributes"]["rule"] = {
+        "name": sample_sicalertapi["rule"]["name"],
+        "uuid": sample_sicalertapi["rule"]["uuid"],
+    }
+
+    with requests_mock.Mocker() as mock:
+        alert_trigger.handle_event(samplenotif_alert_created)
+
+        assert mock.call_count == 0
+        assert not alert_trigger.send_event.called
+
+
+def test_alert_trigger_filter_by_rule_partial(alert_trigger):
+    alert_trigger.configuration = {"rule_filter": "foo"}
+    assert alert_trigger._filter_by_rule({"name": "bar"}) is None
+    assert alert_trigger._filter_by_rule({"name": "bar", "uuid": "baz"}) is False
+    assert alert_trigger._filter_by_rule({"name": "foo"}) is True
+
+    alert_trigger.configuration = {"rule_names_filter": ["foo"]}
+    assert alert_trigger._filter_by_rule({"uuid": "baz"}) is None
+    assert alert_trigger._filter_by_rule({"name": "bar", "uuid": "baz"}) is False
+
+
+def test_alert_trigger_caches_alerts(
+    alert_trigger, samplenotif_alert_updated, samplenotif_alert_status_changed, sample_sicalertapi
+):
+    alert_trigger.send_event = MagicMock()
+    alert_uuid = sample_sicalertapi["uuid"]
+
+    with requests_mock.Mocker() as mock:
+        alert_mock = mock.get(f"http://fake.url/api/v1/sic/alerts/{alert_uuid}", json=sample_sicalertapi)
+
+        # a burst of notifications about the same alert is served by a single call
+        alert_trigger.handle_event(samplenotif_alert_updated)
+        alert_trigger.handle_event(samplenotif_alert_updated)
+        assert alert_mock.call_count == 1
+        assert alert_trigger.send_event.call_count == 2
+
+        # a change of status is always fetched
+        alert_trigger.handle_event(samplenotif_alert_status_changed)
+        assert alert_mock.call_count == 2
+        assert alert_trigger.send_event.call_count == 3
+
+
+def test_alert_trigger_caches_alerts_by_version(
+    alert_trigger, samplenotif_alert_created, samplenotif_alert_updated, sample_sicalertapi
+):
+    alert_trigger.send_event = MagicMock()
+    alert_uuid = sample_sicalertapi["uuid"]
+
+    with requests_mock.Mocker() as mock:
+        alert_mock = mock.get(f"http://fake.url/api/v1/sic/alerts/{alert_uuid}", json=sample_sicalertapi)
+
+        # notifications without any version of the alert are not served from the cache
+        alert_trigger.handle_event(samplenotif_alert_created)
+        alert_trigger.handle_event(samplenotif_alert_created)
+        assert alert_mock.call_count == 2
+
+        # other changes of the alert are fetched again
+        alert_trigger.handle_event(samplenotif_alert_updated)
+        another_update = copy.deepcopy(samplenotif_alert_updated)
+        another_update["attributes"]["updated"] = {"dynamic_urgency_value": 40}
+        alert_trigger.handle_event(another_update)
+        assert alert_mock.call_count == 4
+        assert alert_trigger.send_event.call_count == 4
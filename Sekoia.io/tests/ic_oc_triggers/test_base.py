@@ -112,3 +112,18 @@ def test_ssl_opt_no_env(base_trigger):
 def test_ssl_opt_env(base_trigger, monkeypatch):
     monkeypatch.setenv("REQUESTS_CA_BUNDLE", "test")
     assert base_trigger.ssl_opt == {"ca_certs": "test"}
+
+
+def test_sekoianotificationbasetrigger_coalesce_key(base_trigger):
+    message = {"type": "alert", "action": "updated", "attributes": {"uuid": "1", "short_id": "ALX"}}
+    same = {
+        "metadata": {"version": 2},
+        "action": "updated",
+        "type": "alert",
+        "attributes": {"short_id": "ALX", "uuid": "1"},
+    }
+    assert base_trigger.coalesce_key(json.dumps(message)) == base_trigger.coalesce_key(json.dumps(same))
+    assert base_trigger.coalesce_key(json.dumps({**message, "action": "created"})) != base_trigger.coalesce_key(
+        json.dumps(message)
+    )
+    assert base_trigger.coalesce_key("dfdfg") is None
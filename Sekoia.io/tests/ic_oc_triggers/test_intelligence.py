@@ -153,6 +153,72 @@ def test_resolve_sources(trigger):
         }
 
 
+def test_resolve_sources_persisted(trigger, data_storage):
+    source_object = object_factory(1)
+    with requests_mock.Mocker() as mock_requests:
+        mock_requests.get(
+            f"https://api.sekoia.io/api/v2/inthreat/objects?match[id]={source_object['id']}",
+            status_code=200,
+            json={"items": [source_object]},
+        )
+        trigger.resolve_sources([object_factory(2, sources=[source_object["id"]])])
+
+    # The sources are resolved from the cache of the previous run, without any request
+    new_trigger = FeedConsumptionTrigger(data_path=data_storage)
+    with requests_mock.Mocker() as mock_requests:
+        objects = new_trigger.resolve_sources([object_factory(3, sources=[source_object["id"]])])
+        assert mock_requests.call_count == 0
+
+    assert objects[0]["x_inthreat_sources"] == [
+        {"name": source_object["name"], "confidence": source_object["confidence"]}
+    ]
+
+
+def test_resolve_sources_expired(trigger, data_storage):
+    source_object = object_factory(1)
+    renamed_source_object = {**source_object, "name": "Renamed object"}
+    url = f"https://api.sekoia.io/api/v2/inthreat/objects?match[id]={source_object['id']}"
+
+    with requests_mock.Mocker() as mock_requests:
+        mock_requests.get(url, status_code=200, json={"items": [source_object]})
+        trigger.resolve_sources([object_factory(2, sources=[source_object["id"]])])
+
+    # The sources cached too long ago are fetched again
+    trigger.SOURCES_CACHE_TTL = 0
+    with requests_mock.Mocker() as mock_requests:
+        mock_requests.get(url, status_code=200, json={"items": [renamed_source_object]})
+        objects = trigger.resolve_sources([object_factory(3, sources=[source_object["id"]])])
+        assert mock_requests.call_count == 1
+
+    assert objects[0]["x_inthreat_sources"][0]["name"] == "Renamed object"
+
+    # and forgotten by the next runs
+    with patch.object(FeedConsumptionTrigger, "SOURCES_CACHE_TTL", 0):
+        new_trigger = FeedConsumptionTrigger(data_path=data_storage)
+    assert new_trigger.sources_caches == {}
+
+
+def test_resolve_sources_batches(trigger):
+    trigger.SOURCES_BATCH_SIZE = 2
+    sources = [object_factory(index) for index in range(3)]
+    objects = [object_factory(3, sources=[source["id"] for source in sources])]
+
+    with requests_mock.Mocker() as mock_requests:
+        mock_requests.get(
+            "https://api.sekoia.io/api/v2/inthreat/objects?match[id]=object-0,object-1",
+            status_code=200,
+            json={"items": sources[:2]},
+        )
+        mock_requests.get(
+            "https://api.sekoia.io/api/v2/inthreat/objects?match[id]=object-2",
+            status_code=200,
+            json={"items": sources[2:]},
+        )
+        trigger.resolve_sources(objects)
+
+    assert [source["name"] for source in objects[0]["x_inthreat_sources"]] == ["Object 0", "Object 1", "Object 2"]
+
+
 def test_next_batch_with_data(trigger):
     with requests_mock.Mocker() as mock_requests:
         mock_requests.get(
@@ -211,3 +277,99 @@ def test_run(trigger):
 
     calls = [call.kwargs["event"] for call in trigger.send_event.call_args_list]
     assert len(calls) > 0
+
+
+def test_next_batch_prefetch(trigger):
+    trigger.configuration["prefetch_pages"] = True
+    trigger.configuration["batch_size_limit"] = 2
+
+    with requests_mock.Mocker() as mock_requests, patch("time.sleep"):
+        mock_requests.get(trigger.url, status_code=200, json={"items": ["a", "b"], "next_cursor": "cursor1"})
+        mock_requests.get(
+            trigger.page_url("cursor1"), status_code=200, json={"items": ["c"], "next_cursor": "cursor2"}
+        )
+
+        trigger.next_batch()
+        # The next page is fetched in the background
+        assert trigger._prefetched[0] == "cursor1"
+        trigger._prefetched[1].result()
+        assert mock_requests.call_count == 2
+
+        # and used by the next batch
+        trigger.next_batch()
+        assert mock_requests.call_count == 2
+
+    assert len(trigger.send_event.mock_calls) == 2
+    assert trigger.cursor == "cursor2"
+
+
+def test_resolve_sources_batches_following_objects(trigger):
+    trigger.SOURCES_BATCH_SIZE = 3
+    sources = [object_factory(index) for index in range(4)]
+    objects = [object_factory(4, sources=["object-0", "object-1"])]
+    following_objects = [object_factory(5, sources=["object-1", "object-2", "object-3"])]
+
+    with requests_mock.Mocker() as mock_requests:
+        mock_requests.get(
+            "https://api.sekoia.io/api/v2/inthreat/objects?match[id]=object-0,object-1,object-2",
+            status_code=200,
+            json={"items": sources[:3]},
+        )
+        trigger.resolve_sources(objects, following_objects)
+        # The sources of the following objects fill the room left in the batch
+        assert mock_requests.call_count == 1
+
+    assert [source["name"] for source in objects[0]["x_inthreat_sources"]] == ["Object 0", "Object 1"]
+    assert "object-2" in trigger.sources_caches
+    assert "object-3" not in trigger.sources_caches
+
+
+def test_next_batch_prefetch_resolves_sources_ahead(trigger):
+    trigger.configuration["prefetch_pages"] = True
+    trigger.configuration["resolve_sources"] = True
+    trigger.configuration["batch_size_limit"] = 2
+    sources = [object_factory(index) for index in range(2)]
+
+    with requests_mock.Mocker() as mock_requests, patch("time.sleep"):
+        mock_requests.get(
+            trigger.url,
+            status_code=200,
+            json={"items": [object_factory(2, ["object-0"]), object_factory(3)], "next_cursor": "cursor1"},
+        )
+        mock_requests.get(
+            trigger.page_url("cursor1"),
+            status_code=200,
+            json={"items": [object_factory(4, ["object-1"])], "next_cursor": "cursor2"},
+        )
+        mock_requests.get(
+            "https://api.sekoia.io/api/v2/inthreat/objects?match[id]=object-0,object-1",
+            status_code=200,
+            json={"items": sources},
+        )
+
+        trigger.next_batch()
+        trigger._prefetched[1].result()
+        # The sources of both pages are looked up at once and the following page is fetched once
+        assert mock_requests.call_count == 3
+
+        trigger.next_batch()
+        assert mock_requests.call_count == 3
+
+    assert len(trigger.send_event.mock_calls) == 2
+    assert trigger.cursor == "cursor2"
+
+
+def test_next_page_waits_for_stale_prefetch(trigger):
+    stale_future = MagicMock()
+    stale_future.cancel.return_value = False
+    trigger._prefetched = ("stale_cursor", stale_future)
+
+    with requests_mock.Mocker() as mock_requests, patch("sekoiaio.triggers.intelligence.wait") as mock_wait:
+        mock_requests.get(trigger.url, status_code=200, json={"items": ["a"], "next_cursor": "cursor1"})
+        objects = trigger._next_page()
+
+    # The stale page is still being resolved: wait for it before fetching the page again
+    mock_wait.assert_called_once_with([stale_future])
+    stale_future.result.assert_not_called()
+    assert objects == ["a"]
+    assert trigger.next_cursor == "cursor1"
@@ -45,3 +45,53 @@ def test_run(callback):
     processor.stop()
     sleep(0.2)  # Give time to the thread to join the pool
     callback.assert_called_once_with("foo")
+
+
+def test_invalid_overflow_policy(callback):
+    with pytest.raises(ValueError):
+        MessagesProcessor(callback=callback, overflow_policy="unknown")
+
+
+def test_overflow_drop_newest(callback):
+    processor = MessagesProcessor(callback=callback, max_queue_size=2, overflow_policy="drop_newest")
+    for message in ["foo", "bar", "baz"]:
+        processor.push_message(message)
+
+    assert [processor._queue.get_nowait()[1] for _ in range(2)] == ["foo", "bar"]
+
+
+def test_overflow_drop_oldest(callback):
+    processor = MessagesProcessor(callback=callback, max_queue_size=2, overflow_policy="drop_oldest")
+    for message in ["foo", "bar", "baz"]:
+        processor.push_message(message)
+
+    assert [processor._queue.get_nowait()[1] for _ in range(2)] == ["bar", "baz"]
+
+
+def test_overflow_block_stopped(callback):
+    processor = MessagesProcessor(callback=callback, max_queue_size=1, overflow_policy="block")
+    processor.QUEUE_TIMEOUT = 0.1
+    processor.push_message("foo")
+    processor.stop()
+    processor.push_message("bar")  # Doesn't block once the processor is stopped
+    assert processor._queue.qsize() == 1
+
+
+def test_coalesce_messages(callback):
+    processor = MessagesProcessor(callback=callback, coalesce_key=lambda message: message.split(":")[0])
+    for message in ["foo:1", "foo:2", "bar:1"]:
+        processor.push_message(message)
+    assert processor._queue.qsize() == 2
+
+    processor._handle_message()
+    processor._pool.join()
+    callback.assert_called_once_with("foo:1")
+
+    # Once handled, the same key is accepted again
+    processor.push_message("foo:3")
+    assert processor._queue.qsize() == 2
+
+
+def test_concurrency(callback):
+    processor = MessagesProcessor(callback=callback, concurrency=3)
+    assert processor._pool.size == 3
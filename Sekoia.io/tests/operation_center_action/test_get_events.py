@@ -1,4 +1,8 @@
-from unittest.mock import patch, Mock
+import json
+from pathlib import Path
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest.mock import call, patch, Mock
 
 import pytest
 import requests
@@ -10,6 +14,15 @@ base_url = module_base_url + "api/v1/sic/"
 apikey = "fake_api_key"
 
 
+@pytest.fixture
+def symphony_storage():
+    new_storage = Path(mkdtemp())
+
+    yield new_storage
+
+    rmtree(new_storage.as_posix())
+
+
 def test_get_events(requests_mock):
     action = GetEvents()
     action.module.configuration = {"base_url": module_base_url, "api_key": apikey}
@@ -726,3 +739,62 @@ def test_get_job_result_with_retries_on_connection_timeout(requests_mock):
     with patch("tenacity.nap.time"):
         results: dict = action.run(arguments)
         assert results["events"] == events
+
+
+def test_get_events_to_file(requests_mock, symphony_storage):
+    action = GetEvents(data_path=symphony_storage)
+    action.module.configuration = {"base_url": module_base_url, "api_key": apikey}
+
+    arguments = {
+        "query": 'source.ip:"127.0.0.1"',
+        "earliest_time": "-1d",
+        "latest_time": "now",
+        "limit": 250,
+        "to_file": True,
+    }
+
+    requests_mock.post(
+        "https://fake.url/api/v1/sic/conf/events/search/jobs",
+        json={"uuid": "483d36a5-8538-49c4-be19-49b669f90bf8"},
+    )
+    requests_mock.get(
+        "https://fake.url/api/v1/sic/conf/events/search/jobs/483d36a5-8538-49c4-be19-49b669f90bf8",
+        json={"status": 2, "uuid": "483d36a5-8538-49c4-be19-49b669f90bf8"},
+    )
+
+    events = [{"event": {"id": index}} for index in range(300)]
+    for offset in (0, 100, 200):
+        requests_mock.get(
+            (
+                "https://fake.url/api/v1/sic/conf/events/search/jobs/"
+                f"483d36a5-8538-49c4-be19-49b669f90bf8/events?limit=100&offset={offset}"
+            ),
+            json={"items": events[offset : offset + 100], "total": 300},
+        )
+
+    results: dict = action.run(arguments)
+
+    assert "events" not in results
+    with symphony_storage.joinpath(results["events_path"]).open() as f:
+        assert [json.loads(line) for line in f] == events[:250]
+
+    # the search job is limited to the requested number of events
+    assert requests_mock.request_history[0].json()["max_last_events"] == 250
+
+
+def test_wait_for_search_job_with_backoff(requests_mock):
+    action = GetEvents()
+    action.module.configuration = {"base_url": module_base_url, "api_key": apikey}
+    action.configure_http_session()
+
+    requests_mock.get(
+        "https://fake.url/api/v1/sic/conf/events/search/jobs/483d36a5-8538-49c4-be19-49b669f90bf8",
+        [{"json": {"status": 1}}] * 4 + [{"json": {"status": 2}}],
+    )
+
+    with patch("sekoiaio.operation_center.base_get_event.time.sleep") as sleep:
+        action._wait_for_search_job_step(
+            "483d36a5-8538-49c4-be19-49b669f90bf8", lambda status: status == 1, "complete", 1800
+        )
+
+    assert sleep.call_args_list == [call(1.0), call(1.5), call(2.25), call(3.375)]
@@ -1,3 +1,5 @@
+import gzip
+import io
 import json
 import uuid
 from pathlib import Path
@@ -7,8 +9,10 @@ from tempfile import mkdtemp
 import pytest
 import requests
 import requests_mock
+from sekoia_automation.constants import EVENT_BYTES_MAX_SIZE
+from sekoia_automation.exceptions import MissingActionArgumentFileError
 
-from sekoiaio.operation_center.push_event_to_intake import PushEventToIntake
+from sekoiaio.operation_center.push_event_to_intake import JSONArrayStream, PushEventToIntake
 
 module_base_url = "https://app.sekoia.fake/"
 base_url = module_base_url + "batch"
@@ -174,3 +178,66 @@ def test_push_event_to_intake_should_not_retry():
             }
         )
         assert len(results["event_ids"]) == 0
+
+
+def test_push_events_to_intake_compressed_body():
+    action = PushEventToIntake()
+    action.module.configuration = {"base_url": module_base_url, "api_key": apikey}
+
+    with requests_mock.Mocker() as mock:
+        mock.post("https://intake.sekoia.fake/batch", json={"event_ids": ["001", "002"]})
+
+        results: dict = action.run(
+            {
+                "intake_server": "https://intake.sekoia.fake",
+                "intake_key": "my_intake_key",
+                "events": ["my fake event", {"message": "another fake event"}],
+            }
+        )
+
+        request = mock.last_request
+        assert request.headers["Content-Encoding"] == "gzip"
+        assert json.loads(gzip.decompress(request.body)) == {
+            "intake_key": "my_intake_key",
+            "jsons": ["my fake event", '{"message":"another fake event"}'],
+        }
+        assert results["summary"]["chunk_count"] == 1
+        assert results["summary"]["forwarded_chunk_count"] == 1
+        assert results["summary"]["forwarded_bytes"] == len(gzip.decompress(request.body))
+
+
+def test_json_array_stream():
+    events = ["my fake event", {"message": "another fake event", "values": [1, 2.5, None]}, 12345, 'é"]']
+
+    assert list(JSONArrayStream(io.StringIO(json.dumps(events, indent=2)), block_size=3)) == events
+    assert list(JSONArrayStream(io.StringIO(" [ ] "), block_size=3)) == []
+    assert list(JSONArrayStream(io.StringIO('"my fake event"'), block_size=3)) == ["my fake event"]
+    assert list(JSONArrayStream(io.StringIO(""))) == []
+    assert list(JSONArrayStream(io.StringIO('{"a": 1}\n"b"\n12\n'), block_size=2)) == [{"a": 1}, "b", 12]
+
+
+def test_chunk_events_measures_the_unescaped_events():
+    action = PushEventToIntake()
+    # the escaped form of the event exceeds the maximum size, but not the event itself
+    event = '"' * (EVENT_BYTES_MAX_SIZE // 2 + 1)
+    too_long_event = "é" * (EVENT_BYTES_MAX_SIZE // 2 + 1)
+
+    chunks = list(action._chunk_events([event, too_long_event]))
+
+    assert chunks == [[json.dumps(event).encode()]]
+
+
+def test_iter_events_prefers_the_direct_value(symphony_storage):
+    action = PushEventToIntake(data_path=symphony_storage)
+    file_path = "events.json"
+    symphony_storage.joinpath(file_path).write_text('["event from file"]')
+
+    assert list(action._iter_events({"events": ["direct event"], "events_path": file_path})) == ["direct event"]
+    assert list(action._iter_events({"events_path": file_path})) == ["event from file"]
+
+
+def test_iter_events_missing_file(symphony_storage):
+    action = PushEventToIntake(data_path=symphony_storage)
+
+    with pytest.raises(MissingActionArgumentFileError):
+        list(action._iter_events({"events_path": "missing.json"}))
@@ -1,4 +1,6 @@
-from sekoiaio.utils import user_agent
+from unittest.mock import patch
+
+from sekoiaio.utils import TTLCache, user_agent
 
 
 def test_user_agent():
@@ -7,3 +9,18 @@ def test_user_agent():
     agent, version = user_agent_orig.split("/", 1)
     assert agent == "symphony-module-sekoia.io"
     assert version != "unknown"
+
+
+def test_ttl_cache():
+    cache = TTLCache(maxsize=2, ttl=5)
+
+    with patch("sekoiaio.utils.time.monotonic", return_value=100.0):
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.set("c", 3)
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+        assert len(cache) == 2
+
+    with patch("sekoiaio.utils.time.monotonic", return_value=105.0):
+        assert cache.get("c") is None
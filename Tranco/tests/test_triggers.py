@@ -1,4 +1,7 @@
+import io
+import zipfile
 from pathlib import Path
+
 import pytest
 import requests_mock
 
@@ -45,3 +48,42 @@ def test_run(trigger, mock):
         trigger._run()
         # 1 download of the zip, and 3 send events because chunk size = 5 and the zip has 13 domains
         assert mock.call_count == 4
+
+
+def test_run_only_sends_changes(trigger, mock):
+    with open("tests/data/top-1m.csv.zip", "rb") as mock_fp:
+        mock.get(trigger.top_domains_url, content=mock_fp.read())
+        trigger._run()
+
+    # the new list loses google.com, gains example.org and youtube.com moves to the first rank
+    trigger.configuration = {"interval": 0, "chunk_size": 5, "emit_rank_changes": True}
+    domains = [domain for domain, _ in trigger.iter_snapshot()]
+    top_domains = ["youtube.com", *[domain for domain in domains if domain not in ("google.com", "youtube.com")]]
+    top_domains.append("example.org")
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zp:
+        zp.writestr("top-1m.csv", "".join(f"{rank},{domain}\n" for rank, domain in enumerate(top_domains, 1)))
+
+    sent_events = []
+    trigger.send_event = lambda **kwargs: sent_events.append(kwargs)
+    mock.get(trigger.top_domains_url, content=archive.getvalue())
+    trigger._run()
+
+    assert {event["event"]["change"] for event in sent_events} == {"added", "removed", "rank_changed"}
+    assert [event["event_name"] for event in sent_events if event["event"]["change"] == "added"] == [
+        "Tranco List Chunk 0-1"
+    ]
+    assert {domain for domain, _ in trigger.iter_snapshot()} == set(top_domains)
+
+
+def test_run_merges_sorted_runs(trigger, mock):
+    trigger.sort_run_size = 4
+    with open("tests/data/top-1m.csv.zip", "rb") as mock_fp:
+        mock.get(trigger.top_domains_url, content=mock_fp.read())
+        trigger._run()
+
+    # the domains are sorted in several files, merged in the snapshot
+    snapshot = list(trigger.iter_snapshot())
+    assert snapshot == sorted(snapshot)
+    assert len(snapshot) == len(trigger.get_top_domains())
+    assert not trigger.pending_snapshot_path.exists()
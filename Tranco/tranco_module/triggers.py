@@ -1,7 +1,13 @@
+import heapq
+import shutil
+import tempfile
 import time
 import uuid
 import zipfile
-from io import BytesIO
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack
+from pathlib import Path
+from typing import BinaryIO
 
 import orjson
 import requests
@@ -10,6 +16,14 @@ from sekoia_automation.trigger import Trigger
 
 class FetchTrancoListTrigger(Trigger):
     top_domains_url = "https://tranco-list.eu/top-1m.csv.zip"
+    snapshot_file_name = "tranco_snapshot.tsv"
+    # number of domains sorted in memory at once, before being merged from disk
+    sort_run_size = 100000
+    chunk_event_names = {
+        "added": "Tranco List Chunk",
+        "removed": "Tranco List Removed Chunk",
+        "rank_changed": "Tranco List Rank Changes Chunk",
+    }
 
     @property
     def chunk_size(self):
@@ -19,6 +33,18 @@ class FetchTrancoListTrigger(Trigger):
     def interval(self):
         return self.configuration.get("interval", 24) * 3600
 
+    @property
+    def emit_rank_changes(self) -> bool:
+        return self.configuration.get("emit_rank_changes", False)
+
+    @property
+    def snapshot_path(self) -> Path:
+        return self._data_path.joinpath(self.snapshot_file_name)
+
+    @property
+    def pending_snapshot_path(self) -> Path:
+        return self.snapshot_path.with_suffix(".tmp")
+
     def run(self):
         self.log("Trigger starting")
         try:
@@ -29,18 +55,37 @@ class FetchTrancoListTrigger(Trigger):
 
     def _run(self):
         self.log("Starting run")
-        domains = self.get_top_domains()
-        if not domains:
+        archive_path = self.download_list()
+        if archive_path is None:
             return
-        created_events = 0
-        for chunk, offset in self.domain_chunks(domains):
-            self.create_event_for_chunk(chunk, offset)
-            created_events += 1
-        self.log(f"Pushed {created_events} chunk events")
+
+        with tempfile.TemporaryDirectory(dir=self._data_path) as directory:
+            try:
+                # sort the new list by domain, as the snapshot of the previous list, to compare them in one pass
+                runs = self.write_sorted_runs(self.iter_top_domains(archive_path), Path(directory))
+            finally:
+                archive_path.unlink(missing_ok=True)
+
+            if not runs:
+                return
+
+            created_events = 0
+            with ExitStack() as stack:
+                entries = heapq.merge(*(stack.enter_context(run.open("rb")) for run in runs))
+                snapshot = stack.enter_context(self.pending_snapshot_path.open("wb"))
+
+                for chunk, offset, change in self.change_chunks(self.diff_domains(entries, snapshot)):
+                    self.create_event_for_chunk(chunk, offset, change)
+                    created_events += 1
+            self.log(f"Pushed {created_events} chunk events")
+
+        # the snapshot is replaced once all the changes were sent
+        self.commit_snapshot()
+
         self.log(f"Sleeping for {self.interval} seconds", level="debug")
         time.sleep(self.interval)
 
-    def create_event_for_chunk(self, chunk, offset):
+    def create_event_for_chunk(self, chunk, offset, change: str = "added"):
         chunk_size = min(self.chunk_size, len(chunk))
         work_dir = self._data_path.joinpath("tranco_chunks").joinpath(str(uuid.uuid4()))
         chunk_path = work_dir.joinpath("observables.json")
@@ -51,22 +96,150 @@ class FetchTrancoListTrigger(Trigger):
         directory = str(work_dir.relative_to(self._data_path))
         file_path = str(chunk_path.relative_to(work_dir))
         self.send_event(
-            event_name=f"Tranco List Chunk {offset}-{offset+chunk_size}",
-            event=dict(file_path=file_path, chunk_offset=offset, chunk_size=chunk_size),
+            event_name=f"{self.chunk_event_names[change]} {offset}-{offset+chunk_size}",
+            event=dict(file_path=file_path, chunk_offset=offset, chunk_size=chunk_size, change=change),
             directory=directory,
             remove_directory=True,
         )
 
-    def get_top_domains(self) -> list:
+    def download_list(self) -> Path | None:
+        """
+        Download the archive of the list on disk, without holding it in memory
+        """
         response = requests.get(self.top_domains_url, stream=True)
-        if not response.ok:
-            self.log(f"Server answered with {response.status_code}", level="error")
-            return []
-        with zipfile.ZipFile(BytesIO(response.content)) as zp:
+        with response:
+            if not response.ok:
+                self.log(f"Server answered with {response.status_code}", level="error")
+                return None
+
+            archive_path = self._data_path.joinpath(f"top-1m-{uuid.uuid4()}.csv.zip")
+            with archive_path.open("wb") as fp:
+                shutil.copyfileobj(response.raw, fp)
+
+        return archive_path
+
+    @staticmethod
+    def iter_top_domains(archive_path: Path) -> Iterator[tuple[str, int]]:
+        """
+        Iterate over the domains of the list, with their rank, streaming the member of the archive
+        """
+        with zipfile.ZipFile(archive_path) as zp:
             with zp.open("top-1m.csv") as fp:
-                # Can't use any generator/iterator since they are not subscriptable
-                return [line.decode("utf-8").split(",")[1].strip() for line in fp.readlines()]
+                for line in fp:
+                    rank, domain = line.decode("utf-8").strip().split(",", 1)
+                    yield domain.strip(), int(rank)
+
+    def get_top_domains(self) -> list:
+        archive_path = self.download_list()
+        if archive_path is None:
+            return []
+
+        try:
+            return [domain for domain, _ in self.iter_top_domains(archive_path)]
+        finally:
+            archive_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _snapshot_entry(domain: str, rank: int) -> bytes:
+        # the tab sorts before any character of a domain: entries sort by domain
+        return f"{domain}\t{rank}\n".encode("utf-8")
+
+    @staticmethod
+    def _parse_snapshot_entry(entry: bytes) -> tuple[str, int]:
+        domain, rank = entry.decode("utf-8").rstrip("\n").split("\t", 1)
+        return domain, int(rank)
+
+    def iter_snapshot(self) -> Iterator[tuple[str, int]]:
+        """
+        Iterate over the domains of the previous list, with their rank, sorted by domain
+        """
+        if not self.snapshot_path.exists():
+            return
+
+        with self.snapshot_path.open("rb") as fp:
+            for entry in fp:
+                yield self._parse_snapshot_entry(entry)
+
+    def write_sorted_runs(self, domains: Iterable[tuple[str, int]], directory: Path) -> list[Path]:
+        """
+        Write the entries of the domains in files of the directory, each one sorted by domain,
+        holding at most `sort_run_size` entries in memory
+        """
+        runs: list[Path] = []
+        entries: list[bytes] = []
+
+        for domain, rank in domains:
+            entries.append(self._snapshot_entry(domain, rank))
+            if len(entries) >= self.sort_run_size:
+                runs.append(self._write_sorted_run(directory, entries))
+                entries = []
+
+        if entries:
+            runs.append(self._write_sorted_run(directory, entries))
+
+        return runs
+
+    @staticmethod
+    def _write_sorted_run(directory: Path, entries: list[bytes]) -> Path:
+        entries.sort()
+        run_path = directory.joinpath(f"run-{uuid.uuid4()}")
+        with run_path.open("wb") as fp:
+            fp.writelines(entries)
+
+        return run_path
+
+    def commit_snapshot(self):
+        """
+        Replace the snapshot of the previous list with the one of the new list
+        """
+        if self.pending_snapshot_path.exists():
+            self.pending_snapshot_path.replace(self.snapshot_path)
+
+    def diff_domains(self, entries: Iterable[bytes], snapshot: BinaryIO) -> Iterator[tuple[str, dict | str]]:
+        """
+        Compare the new list with the previous one, both sorted by domain, and yield the changes
+
+        Yield the domains that entered the list, the domains that left it and,
+        if enabled, the domains whose rank changed.
+        The entries of the new list are written in the snapshot as they are compared.
+        """
+        previous_domains = self.iter_snapshot()
+        previous = next(previous_domains, None)
+
+        for entry in entries:
+            snapshot.write(entry)
+            domain, rank = self._parse_snapshot_entry(entry)
+
+            # domains only in the previous list left it
+            while previous is not None and previous[0] < domain:
+                yield "removed", previous[0]
+                previous = next(previous_domains, None)
+
+            if previous is not None and previous[0] == domain:
+                previous_rank = previous[1]
+                if self.emit_rank_changes and previous_rank != rank:
+                    yield "rank_changed", {"value": domain, "rank": rank, "previous_rank": previous_rank}
+                previous = next(previous_domains, None)
+            else:
+                yield "added", domain
+
+        while previous is not None:
+            yield "removed", previous[0]
+            previous = next(previous_domains, None)
+
+    def change_chunks(self, changes: Iterator[tuple[str, dict | str]]) -> Iterator[tuple[list, int, str]]:
+        chunks: dict[str, list] = {}
+        offsets: dict[str, int] = {}
+
+        for change, item in changes:
+            chunk = chunks.setdefault(change, [])
+            chunk.append(item)
+
+            if len(chunk) >= self.chunk_size:
+                yield chunk, offsets.get(change, 0), change
+                offsets[change] = offsets.get(change, 0) + len(chunk)
+                chunks[change] = []
 
-    def domain_chunks(self, domains):
-        for i in range(0, len(domains), self.chunk_size):
-            yield domains[i : i + self.chunk_size], i
+        for change, chunk in chunks.items():
+            if chunk:
+                yield chunk, offsets.get(change, 0), change